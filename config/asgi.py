@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+if settings.DEBUG:
+    # uvicorn, в отличие от runserver, статику не отдает: без этого админка остается без CSS и JS
+    django_application = ASGIStaticFilesHandler(django_application)
+
+# Импорт после инициализации Django: модуль бота обращается к моделям
+from tasks.webhook import TelegramWebhookApp  # noqa: E402
+
+# Обновления Telegram на TELEGRAM_WEBHOOK['PATH'] идут боту, остальное - в Django
+application = TelegramWebhookApp(django_application)
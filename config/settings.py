@@ -31,6 +31,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "tasks",
     "users",
@@ -121,6 +122,19 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# JSON через orjson (config/renderers.py); без установленного orjson - стандартный json DRF
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
@@ -133,11 +147,29 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+# HTTP-клиенты Bot API (tasks/telegram_http.py). В процессе один пул диспетчера (задачи Celery)
+# и один пул Application бота (run_bot или webhook); long polling run_bot держит еще одно соединение
+TELEGRAM_HTTP = {
+    # Адрес Bot API; для нагрузочных тестов - локальный fake_bot_api
+    "BASE_URL": os.getenv("TELEGRAM_BOT_API_URL", "https://api.telegram.org/bot"),
+    # Соединений диспетчера (tasks/dispatcher.py): не меньше потоков, одновременно вызывающих dispatcher.call
+    "POOL_SIZE": int(os.getenv("TELEGRAM_HTTP_POOL_SIZE", 8)),
+    # Соединений бота: webhook обрабатывает до TELEGRAM_WEBHOOK['MAX_CONNECTIONS'] обновлений одновременно
+    "BOT_POOL_SIZE": int(os.getenv("TELEGRAM_HTTP_BOT_POOL_SIZE", 16)),
+    "POOL_TIMEOUT": 5.0,  # Сколько секунд запрос ждет свободного соединения
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 10.0,
+    "WRITE_TIMEOUT": 10.0,
+    "KEEPALIVE_EXPIRY": 60.0,  # Секунд простоя, после которых соединение закрывается
+    "HTTP_VERSION": os.getenv("TELEGRAM_HTTP_VERSION", "1.1"),  # "2" требует пакет h2
+    "STATS_INTERVAL": 60,  # Секунд между записями статистики пулов в лог; 0 - не писать
+}
+
 # URL-адрес брокера сообщений
-CELERY_BROKER_URL = "redis://localhost:6379"
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379")
 
 # URL-адрес брокера результатов, также Redis
-CELERY_RESULT_BACKEND = "redis://localhost:6379"
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
 
 # Часовой пояс для работы Celery
 CELERY_TIMEZONE = "Europe/Moscow"
@@ -146,4 +178,98 @@ CELERY_TIMEZONE = "Europe/Moscow"
 CELERY_TASK_TRACK_STARTED = True
 
 # Максимальное время на выполнение задачи
-CELERY_TASK_TIME_LIMIT = 30 * 60
\ No newline at end of file
+CELERY_TASK_TIME_LIMIT = 30 * 60
+
+# Напоминания о сроках задач (tasks/reminders.py)
+TASK_REMINDERS = {
+    "WINDOWS": [timedelta(days=1), timedelta(hours=1)],  # За сколько до срока напоминать
+    "BATCH_SIZE": 500,  # Задач в одной транзакции и одном сообщении брокера
+    "INTERVAL": timedelta(minutes=1),  # Период запуска celery beat
+}
+
+# Outbox уведомлений (tasks/outbox.py)
+NOTIFICATION_OUTBOX = {
+    "BATCH_SIZE": 100,  # Строк, забираемых одной транзакцией
+    "DRAIN_INTERVAL": timedelta(seconds=30),  # Период запуска celery beat; обычно outbox разбирается сразу после коммита
+    "DEDUP_TTL": 24 * 60 * 60,  # Сколько секунд помнить доставленные сообщения, чтобы не отправить их повторно
+    # Секунд; больше 0 - уведомления одного чата за это время объединяются в дайджест
+    # (например, при массовом назначении задач), но и одиночные уведомления ждут столько же
+    "COALESCE_WINDOW": int(os.getenv("NOTIFICATION_COALESCE_WINDOW", 0)),
+}
+
+# Периодические задачи celery beat
+CELERY_BEAT_SCHEDULE = {
+    "drain-notification-outbox": {
+        "task": "tasks.tasks.drain_notification_outbox",
+        "schedule": NOTIFICATION_OUTBOX["DRAIN_INTERVAL"],
+        "options": {"expires": NOTIFICATION_OUTBOX["DRAIN_INTERVAL"].total_seconds()},
+    },
+    "send-task-reminders": {
+        "task": "tasks.tasks.send_task_reminders",
+        "schedule": TASK_REMINDERS["INTERVAL"],
+        # Запуски, скопившиеся в брокере при остановленных воркерах, не нужны: следующий наверстает
+        "options": {"expires": TASK_REMINDERS["INTERVAL"].total_seconds()},
+    },
+}
+
+# Лимиты Telegram Bot API для отправки уведомлений. Ведра токенов хранятся в Redis,
+# чтобы лимит был общим для всех воркеров; пустой REDIS_URL - ведра в памяти процесса
+TELEGRAM_RATE_LIMIT = {
+    "REDIS_URL": os.getenv("TELEGRAM_RATE_LIMIT_REDIS_URL", CELERY_BROKER_URL),
+    "GLOBAL_RATE": 30,  # Сообщений в секунду на бота
+    "GLOBAL_BURST": 30,
+    "CHAT_RATE": 1,  # Сообщений в секунду в один чат
+    "CHAT_BURST": 3,
+}
+
+# Кэш соответствия chat id Telegram -> пользователь в памяти процесса
+TELEGRAM_CHAT_CACHE = {
+    "MAX_SIZE": 10000,
+    # Секунд. Смену chat id другие процессы видят сразу по поколению в кэше Django (нужен
+    # общий Redis, см. CACHES); TTL ограничивает устаревание, если поколение потеряно
+    "TTL": 60,
+}
+
+# Кэш Django (в том числе ответов API задач). Для нескольких процессов нужен общий Redis,
+# иначе изменение задачи в одном процессе не сбросит кэш в остальных
+if os.getenv("CACHE_REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_REDIS_URL"),
+        }
+    }
+
+# Синхронизация задач клиентов (/task/sync/)
+TASK_SYNC = {
+    "PAGE_SIZE": 500,
+    # Срок действия токена; записи об удаленных задачах хранятся немного дольше
+    # (команда purge_task_tombstones), поэтому действующему токену их хватает
+    "TOKEN_MAX_AGE": timedelta(days=30),
+}
+
+# Прием обновлений бота через webhook (вместо polling в run_bot). Маршрут PATH обслуживает
+# ASGI-приложение (config/asgi.py); Telegram присылает SECRET_TOKEN в заголовке каждого запроса
+TELEGRAM_WEBHOOK = {
+    "URL": os.getenv("TELEGRAM_WEBHOOK_URL"),  # Публичный https-адрес, оканчивающийся на PATH
+    "PATH": "/telegram/webhook/",
+    "SECRET_TOKEN": os.getenv("TELEGRAM_WEBHOOK_SECRET"),  # 1-256 символов: A-Z, a-z, 0-9, _ и -
+    "MAX_BODY_SIZE": 1024 * 1024,
+    "MAX_CONNECTIONS": 40,  # Одновременных запросов от Telegram
+}
+
+# Состояние сценариев бота (например, ожидание доказательства выполнения), общее для всех
+# процессов бота. Пустой REDIS_URL - состояние в памяти процесса
+TELEGRAM_PERSISTENCE = {
+    "REDIS_URL": os.getenv("TELEGRAM_PERSISTENCE_REDIS_URL", CELERY_BROKER_URL),
+    "TTL": 24 * 60 * 60,  # Брошенный сценарий забывается через сутки после последнего изменения
+    "UPDATE_INTERVAL": 1,  # Секунд между записями накопленных изменений
+}
+
+# Повторы отправки уведомлений
+TELEGRAM_DELIVERY = {
+    "MAX_ATTEMPTS": 5,  # После этого сообщение попадает в NotificationDeadLetter
+    "BACKOFF_BASE": 2,  # Задержка перед повтором: до BACKOFF_BASE ** попытка секунд
+    "BACKOFF_MAX": 300,
+    "MAX_INLINE_WAIT": 1.0,  # Ожидание токена до стольких секунд - внутри задачи, дольше - через брокер
+}
@@ -1,13 +1,18 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 
-from .models import Task
+from .cache import invalidate_assignee_cache, invalidate_owner_cache
+from .models import NotificationDeadLetter, Task
+from .search import search_tasks
+from .tasks import send_telegram_message
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ["uuid", "name", "description"]
     list_filter = ["owner"]
-    search_fields = ["name", "owner__username"]
+    search_fields = ["name", "owner__username"]  # Поиск выполняет get_search_results
     readonly_fields = ["created_at", "owner", "uuid"]
 
     # ИСКЛЮЧАЕМ поле owner из формы добавления и изменения
@@ -15,3 +20,51 @@ class TaskAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related("owner")
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Поиск по индексам tasks/search.py вместо ILIKE '%...%' по таблице задач.
+
+        Задачи владельца, в username или email которого есть строка, тоже находятся: владельцы
+        ищутся в таблице пользователей, а их задачи - по индексу owner.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        owners = get_user_model().objects.filter(
+            Q(username__icontains=search_term) | Q(email__icontains=search_term)
+        )
+        return search_tasks(queryset, search_term, extra=Q(owner__in=owners.values("pk"))), False
+
+    # Изменения из админки сбрасывают кэш ответов API владельцев
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_owner_cache(obj.owner_id)
+        # Прежний исполнитель тоже перестает видеть задачу в /task/assigned/
+        previous_assignee = form.initial.get("assignee") if change else None
+        invalidate_assignee_cache(obj.assignee_id, previous_assignee)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_owner_cache(obj.owner_id)
+        invalidate_assignee_cache(obj.assignee_id)
+
+    def delete_queryset(self, request, queryset):
+        users = list(queryset.values_list("owner_id", "assignee_id").distinct())
+        super().delete_queryset(request, queryset)
+        invalidate_owner_cache(*(owner_id for owner_id, _ in users))
+        invalidate_assignee_cache(*(assignee_id for _, assignee_id in users))
+
+
+@admin.register(NotificationDeadLetter)
+class NotificationDeadLetterAdmin(admin.ModelAdmin):
+    list_display = ["chat_id", "created_at", "attempts", "error"]
+    search_fields = ["chat_id"]
+    readonly_fields = ["chat_id", "text", "payload", "error", "attempts", "created_at"]
+    actions = ["resend"]
+
+    @admin.action(description="Отправить повторно")
+    def resend(self, request, queryset):
+        for letter in queryset:
+            send_telegram_message.delay(letter.chat_id, letter.text, **letter.payload)
+        queryset.delete()
@@ -0,0 +1,53 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Поколение задач пользователя: меняется при любом изменении задач, которые он видит как
+# владелец (scope "owner") или как исполнитель ("assignee"). Ключи ответов содержат номер
+# поколения, поэтому после изменения старые ответы просто перестают читаться и вытесняются
+# кэшем по таймауту
+GENERATION_KEY = "tasks:generation:{}:{}"
+RESPONSE_KEY = "tasks:response:{}:{}:{}:{}"
+
+
+def get_generation(user_id, scope="owner"):
+    key = GENERATION_KEY.format(scope, user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Начальное значение от времени: если счетчик был вытеснен, старые номера не повторятся
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_owner_cache(*owner_ids):
+    """Сбрасывает закэшированные ответы владельцев после коммита текущей транзакции"""
+    transaction.on_commit(lambda: _bump_generations("owner", owner_ids))
+
+
+def invalidate_assignee_cache(*assignee_ids):
+    """То же для списков исполнителей (/task/assigned/); None пропускаются"""
+    assignee_ids = {assignee_id for assignee_id in assignee_ids if assignee_id is not None}
+    if assignee_ids:
+        transaction.on_commit(lambda: _bump_generations("assignee", assignee_ids))
+
+
+def _bump_generations(scope, user_ids):
+    for user_id in set(user_ids):
+        key = GENERATION_KEY.format(scope, user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def response_cache_key(user_id, url, scope="owner", media_type=""):
+    """
+    Ключ ответа на запрос url для текущего поколения задач пользователя.
+
+    media_type - формат ответа: он входит в ETag, поэтому у каждого формата своя запись.
+    """
+    digest = hashlib.md5(f"{media_type} {url}".encode()).hexdigest()
+    return RESPONSE_KEY.format(scope, user_id, get_generation(user_id, scope), digest)
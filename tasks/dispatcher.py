@@ -0,0 +1,96 @@
+import asyncio
+import atexit
+import os
+import threading
+
+from .telegram_http import build_bot
+
+
+class NotificationDispatcher:
+    """
+    Долгоживущий event loop на процесс с одним клиентом Bot для отправки из синхронного кода.
+
+    Клиент держит пул соединений по TELEGRAM_HTTP, поэтому HTTP-соединения к Telegram
+    переиспользуются между вызовами call, а не открываются заново для каждого сообщения.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._thread = None
+        self._bot = None
+        self._atexit_registered = False
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        """Запускает loop в фоновом потоке. После fork поток не наследуется - запускаем заново."""
+        with self._lock:
+            if self.running:
+                return
+            self._pid = os.getpid()
+            self._loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(ready,), name="telegram-dispatcher", daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+
+    def call(self, func, *args, **kwargs):
+        """
+        Выполняет корутинную функцию в loop диспетчера с аргументом bot=<общий Bot> и ждет результат.
+
+        Нужен синхронному коду вроде задач Celery: исключения отправки пробрасываются вызывающему.
+        """
+        self.start()
+
+        async def run():
+            return await func(*args, bot=await self._get_bot(), **kwargs)
+
+        return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+
+    def shutdown(self):
+        """Закрывает соединения клиента и останавливает loop."""
+        with self._lock:
+            if not self.running:
+                return
+            asyncio.run_coroutine_threadsafe(self._close_bot(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._bot_lock = asyncio.Lock()
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _get_bot(self):
+        async with self._bot_lock:
+            if self._bot is None:
+                bot = self._create_bot()
+                await bot.initialize()
+                self._bot = bot
+        return self._bot
+
+    async def _close_bot(self):
+        if self._bot is not None:
+            await self._bot.shutdown()
+            self._bot = None
+
+    def _create_bot(self):
+        return build_bot("dispatcher")
+
+
+# Диспетчер процесса; поток стартует при первой отправке
+dispatcher = NotificationDispatcher()
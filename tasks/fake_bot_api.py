@@ -0,0 +1,163 @@
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+# /bot<token>/<method>, как у api.telegram.org
+PATH_RE = re.compile(r"^/bot(?P<token>[^/]+)/(?P<method>\w+)$")
+
+# Методы, которые возвращают отправленное сообщение
+SEND_METHODS = {"sendMessage", "sendPhoto", "sendVideo", "sendDocument"}
+EDIT_METHODS = {"editMessageText", "editMessageReplyMarkup", "editMessageCaption"}
+
+
+class FakeBotAPI:
+    """
+    Локальная замена Bot API для нагрузочных тестов: отвечает на методы, которые вызывает бот.
+
+    Каждый ответ задерживается на latency секунд (плюс случайные до jitter), а доля
+    rate_limit_ratio запросов получает 429 с retry_after, как при превышении лимитов Telegram.
+    getUpdates отдает обновления, добавленные push_update. Сервер многопоточный и держит
+    keep-alive соединения, поэтому пул клиента работает так же, как с api.telegram.org.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, rate_limit_ratio=0.0, retry_after=1,
+                 max_poll_timeout=1.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.max_poll_timeout = max_poll_timeout
+        self.calls = Counter()
+        self.rate_limited = 0
+
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        self._updates = []
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.api = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Значение для TELEGRAM_HTTP['BASE_URL']"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-bot-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def push_update(self, update):
+        """Добавляет обновление (dict в формате Bot API) для getUpdates"""
+        with self._lock:
+            self._updates.append(update)
+
+    def handle(self, method, params):
+        """Возвращает (HTTP-статус, тело ответа) для вызова method"""
+        delay = self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay:
+            time.sleep(delay)
+
+        with self._lock:
+            self.calls[method] += 1
+            if self.rate_limit_ratio and random.random() < self.rate_limit_ratio:
+                self.rate_limited += 1
+                return 429, {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+        return 200, {"ok": True, "result": self._result(method, params)}
+
+    def _result(self, method, params):
+        if method in SEND_METHODS:
+            return self._message(params.get("chat_id"), next(self._message_ids), params)
+        if method in EDIT_METHODS:
+            if params.get("inline_message_id"):
+                return True
+            return self._message(params.get("chat_id"), params.get("message_id"), params)
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+        if method == "getFile":
+            file_id = params.get("file_id", "")
+            return {"file_id": file_id, "file_unique_id": file_id, "file_size": 1, "file_path": f"files/{file_id}"}
+        if method == "getUpdates":
+            return self._get_updates(params)
+        # answerCallbackQuery, setWebhook, deleteWebhook и прочие методы с ответом True
+        return True
+
+    def _message(self, chat_id, message_id, params):
+        message = {
+            "message_id": int(message_id or 0),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id or 0), "type": "private"},
+        }
+        if params.get("text"):
+            message["text"] = params["text"]
+        if params.get("caption"):
+            message["caption"] = params["caption"]
+        return message
+
+    def _get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        deadline = time.monotonic() + min(float(params.get("timeout") or 0), self.max_poll_timeout)
+        while True:
+            with self._lock:
+                # Подтвержденные offset обновления больше не нужны
+                self._updates = [update for update in self._updates if update["update_id"] >= offset]
+                if self._updates or time.monotonic() >= deadline:
+                    return self._updates[:limit]
+            time.sleep(0.05)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 - соединения клиента переиспользуются (keep-alive)
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._respond(self._params(body))
+
+    def do_GET(self):
+        self._respond({})
+
+    def _respond(self, params):
+        match = PATH_RE.match(self.path.split("?", 1)[0])
+        if match is None:
+            status, payload = 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+        else:
+            status, payload = self.server.api.handle(match["method"], params)
+
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _params(self, body):
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("application/json"):
+            return json.loads(body or b"{}")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            return dict(parse_qsl(body.decode()))
+        # multipart (загрузка файлов): содержимое для ответа не нужно
+        return {}
+
+    def log_message(self, format, *args):
+        pass
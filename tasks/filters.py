@@ -0,0 +1,37 @@
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .serializers import TaskFilterSerializer
+
+
+class TaskFilter(BaseFilterBackend):
+    """
+    Фильтры списка задач: `?status=` (несколько раз), `?assignee=`, `?end_from=`/`?end_to=`,
+    `?created_from=`/`?created_to=` и `?overdue=true|false`.
+
+    Каждое сочетание обслуживается индексом tasks (см. Task.Meta.indexes и
+    TaskFilterPlanTest); новый фильтр добавляется вместе с индексом и тестом плана.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = TaskFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.filter_queryset(queryset)
+
+
+class TaskOrderingFilter(OrderingFilter):
+    """
+    `?ordering=` по полям из view.ordering_fields; uuid добавляется для однозначного порядка.
+
+    TaskCursorPagination берет основное поле отсюда, поэтому keyset-пагинация работает и для
+    выбранной сортировки. Без параметра поисковая выдача (?q=) остается упорядоченной по рангу.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        primary = ordering[0]
+        return [primary, "-uuid" if primary.startswith("-") else "uuid"]
+
+    def filter_queryset(self, request, queryset, view):
+        if self.ordering_param not in request.query_params and queryset.query.order_by:
+            return queryset
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,164 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from tasks.models import OPEN_STATUSES, Task
+
+# Индексы таблицы tasks до миграции 0003 (индексы внешних ключей, созданные Django)
+BASELINE_INDEXES = {
+    "tasks_owner_id_b2c75a80": "CREATE INDEX tasks_owner_id_b2c75a80 ON tasks (owner_id)",
+    "tasks_assignee_id_7880b7f5": "CREATE INDEX tasks_assignee_id_7880b7f5 ON tasks (assignee_id)",
+}
+
+# Распределение статусов: большая часть истории - закрытые задачи
+SEED_STATUSES = ["DONE"] * 6 + ["REJECTED", "NEW", "WORK", "REVIEW"]
+
+SEED_TASKS_SQL = """
+    INSERT INTO tasks (uuid, name, description, status, owner_id, assignee_id, created_at, updated_at, end_date)
+    SELECT gen_random_uuid(),
+           'Bench task ' || g,
+           'Seeded by benchmark_task_indexes',
+           (%(statuses)s::varchar[])[1 + g %% cardinality(%(statuses)s::varchar[])],
+           (%(owners)s::bigint[])[1 + g %% cardinality(%(owners)s::bigint[])],
+           (%(assignees)s::bigint[])[1 + (g * 7) %% cardinality(%(assignees)s::bigint[])],
+           now() - g * interval '1 second',
+           now() - g * interval '1 second',
+           now() + ((g %% 720) - 360) * interval '1 hour'
+    FROM generate_series(1, %(rows)s) AS g
+"""
+
+EXECUTION_TIME_RE = re.compile(r"Execution Time: ([\d.]+) ms")
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет tasks синтетическими данными и сравнивает планы и время запросов "
+        "до и после индексов Task.Meta.indexes. Все изменения откатываются, поэтому VACUUM "
+        "не выполняется и index-only scan оценивается пессимистично."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2_000_000, help="Количество задач")
+        parser.add_argument("--owners", type=int, default=20, help="Количество владельцев")
+        parser.add_argument("--assignees", type=int, default=1000, help="Количество исполнителей")
+        parser.add_argument("--repeat", type=int, default=3, help="Повторов каждого запроса")
+        parser.add_argument("--plans", action="store_true", help="Печатать планы целиком")
+
+    def handle(self, *args, **options):
+        self.options = options
+        results = {}
+
+        with transaction.atomic():
+            self.stdout.write(f"Заполнение tasks: {options['rows']} строк...")
+            params = self._seed(options["rows"], options["owners"], options["assignees"])
+
+            for phase, apply_indexes in (("до", self._use_baseline_indexes), ("после", self._use_task_indexes)):
+                apply_indexes()
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE tasks")
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\nИндексы {phase} миграции"))
+                for title, queryset in self._cases(**params):
+                    results.setdefault(title, {})[phase] = self._measure(title, queryset)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nИтог, мс (лучшее из повторов)"))
+        for title, timings in results.items():
+            self.stdout.write(f"{timings['до']:>10.2f} -> {timings['после']:>8.2f}  {title}")
+
+    def _seed(self, rows, owners, assignees):
+        User = get_user_model()
+        users = User.objects.bulk_create(
+            User(email=f"bench-{i}@example.com", telegram_chat_id=f"bench-{i}")
+            for i in range(owners + assignees)
+        )
+        owner_ids = [user.pk for user in users[:owners]]
+        assignee_ids = [user.pk for user in users[owners:]]
+
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_TASKS_SQL, {
+                "statuses": SEED_STATUSES,
+                "owners": owner_ids,
+                "assignees": assignee_ids,
+                "rows": rows,
+            })
+            # Внешние ключи DEFERRABLE: проверяем их сразу, иначе CREATE INDEX в этой транзакции запрещен
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        owner_id = owner_ids[0]
+        sample = (
+            Task.objects.filter(status="NEW", assignee__isnull=False)
+            .values("uuid", "assignee_id", "assignee__telegram_chat_id").first()
+        )
+        deep = (
+            Task.objects.filter(owner_id=owner_id).order_by("-created_at", "-uuid")
+            .values("created_at", "uuid")[rows // owners // 2]
+        )
+        return {"owner_id": owner_id, "sample": sample, "deep": deep}
+
+    def _cases(self, owner_id, sample, deep):
+        own = Task.objects.filter(owner_id=owner_id)
+        page = own.order_by("-created_at", "-uuid")
+        keyset = Q(created_at__lte=deep["created_at"]) & (
+            Q(created_at__lt=deep["created_at"]) | Q(uuid__lt=deep["uuid"])
+        )
+        middle = own.count() // 2
+        return [
+            ("Первая страница задач владельца", page[:11]),
+            ("COUNT(*) для постраничной пагинации", own.order_by().values("owner_id").annotate(n=Count("*"))),
+            ("Глубокая страница через OFFSET", page[middle:middle + 11]),
+            ("Глубокая страница через keyset-курсор", page.filter(keyset)[:11]),
+            (
+                "Задачи исполнителя в статусе WORK",
+                Task.objects.filter(assignee_id=sample["assignee_id"], status="WORK").order_by(),
+            ),
+            (
+                "Кнопка бота: задача исполнителя по uuid",
+                Task.objects.filter(uuid=sample["uuid"], assignee__telegram_chat_id=sample["assignee__telegram_chat_id"],
+                                    status="NEW"),
+            ),
+            (
+                "Незакрытые задачи владельца по сроку",
+                own.filter(status__in=OPEN_STATUSES).order_by("end_date")[:10],
+            ),
+        ]
+
+    def _measure(self, title, queryset):
+        sql, params = queryset.query.sql_with_params()
+        best, plan = None, ""
+        with connection.cursor() as cursor:
+            for _ in range(max(self.options["repeat"], 1)):
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                elapsed = float(EXECUTION_TIME_RE.search(plan).group(1))
+                best = elapsed if best is None else min(best, elapsed)
+
+        self.stdout.write(f"{best:>10.2f} мс  {title}")
+        if self.options["plans"]:
+            self.stdout.write(plan + "\n")
+        else:
+            # Достаточно узлов, которые читают таблицу или её индексы
+            for line in plan.splitlines():
+                if "Scan" in line:
+                    self.stdout.write(f"             {line.strip().lstrip('-> ')}")
+        return best
+
+    def _use_baseline_indexes(self):
+        with connection.schema_editor() as editor:
+            for index in Task._meta.indexes:
+                editor.remove_index(Task, index)
+        with connection.cursor() as cursor:
+            for name, create_sql in BASELINE_INDEXES.items():
+                cursor.execute(f"DROP INDEX IF EXISTS {name}")
+                cursor.execute(create_sql)
+
+    def _use_task_indexes(self):
+        with connection.cursor() as cursor:
+            for name in BASELINE_INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        with connection.schema_editor() as editor:
+            for index in Task._meta.indexes:
+                editor.add_index(Task, index)
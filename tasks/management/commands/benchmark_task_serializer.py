@@ -0,0 +1,86 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from tasks.models import Task
+from tasks.serializers import TaskSerializer, ValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время вывода страницы задач через TaskSerializer и через ValuesSerializer "
+        "(запрос, сериализация и JSON) и проверяет, что ответы совпадают побайтно. "
+        "Данные создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Задач на странице")
+        parser.add_argument("--repeat", type=int, default=5, help="Повторов каждого варианта")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        with transaction.atomic():
+            owner = self._seed(rows)
+            queryset = Task.objects.filter(owner=owner).order_by("-created_at", "-uuid")
+            renderer = JSONRenderer()
+
+            def drf():
+                return renderer.render(TaskSerializer(queryset[:rows], many=True).data)
+
+            def drf_select_related():
+                return renderer.render(TaskSerializer(queryset.select_related("owner")[:rows], many=True).data)
+
+            def values():
+                values_serializer = ValuesSerializer(TaskSerializer)
+                return renderer.render(values_serializer.to_representation(values_serializer.values(queryset)[:rows]))
+
+            expected = drf()
+            if drf_select_related() != expected or values() != expected:
+                raise CommandError("Вывод ValuesSerializer отличается от TaskSerializer")
+
+            timings = [
+                ("TaskSerializer (как в TaskViewSet раньше)", self._measure(drf, options["repeat"])),
+                ("TaskSerializer + select_related('owner')", self._measure(drf_select_related, options["repeat"])),
+                ("ValuesSerializer", self._measure(values, options["repeat"])),
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Итог для {rows} задач, мс (лучшее из повторов)"))
+        baseline = timings[0][1]
+        for title, elapsed in timings:
+            self.stdout.write(f"{elapsed:>10.2f}  x{baseline / elapsed:<6.1f} {title}")
+
+    def _seed(self, rows):
+        User = get_user_model()
+        owner = User.objects.create(email="bench-serializer-owner@example.com")
+        assignee = User.objects.create(email="bench-serializer-assignee@example.com")
+        now = timezone.now()
+        Task.objects.bulk_create(
+            Task(
+                name=f"Bench task {i}",
+                description="Seeded by benchmark_task_serializer",
+                status=("NEW", "WORK", "REVIEW", "DONE")[i % 4],
+                owner=owner,
+                assignee=assignee if i % 2 else None,
+                completion_proof="Готово" if i % 4 == 3 else None,
+                completed_at=now if i % 4 == 3 else None,
+                end_date=now + timedelta(hours=i),
+            )
+            for i in range(rows)
+        )
+        return owner
+
+    @staticmethod
+    def _measure(func, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
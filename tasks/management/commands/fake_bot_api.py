@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.fake_bot_api import FakeBotAPI
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает локальную замену Telegram Bot API с задержкой ответов и ответами 429. "
+        "Процессы бота, веба и Celery направляются на нее переменной TELEGRAM_BOT_API_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8081)
+        parser.add_argument("--latency", type=float, default=50, help="Задержка каждого ответа, мс")
+        parser.add_argument("--jitter", type=float, default=0, help="Случайная добавка к задержке, до стольких мс")
+        parser.add_argument("--rate-limit-ratio", type=float, default=0, help="Доля запросов с ответом 429 (0-1)")
+        parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, секунд")
+
+    def handle(self, *args, **options):
+        api = FakeBotAPI(
+            options["host"], options["port"],
+            latency=options["latency"] / 1000,
+            jitter=options["jitter"] / 1000,
+            rate_limit_ratio=options["rate_limit_ratio"],
+            retry_after=options["retry_after"],
+        ).start()
+        self.stdout.write(f"Bot API: TELEGRAM_BOT_API_URL={api.base_url}. Нажмите Ctrl+C для остановки.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            api.stop()
+
+        for method, count in api.calls.most_common():
+            self.stdout.write(f"{count:>10}  {method}")
+        self.stdout.write(f"Ответов 429: {api.rate_limited}")
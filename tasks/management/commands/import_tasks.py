@@ -0,0 +1,257 @@
+import csv
+import io
+import json
+import sys
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError, connection, transaction
+
+from tasks.cache import invalidate_assignee_cache, invalidate_owner_cache
+from tasks.models import Task
+
+# Колонки входного файла. Обязательны name, owner_email и end_date; пустые uuid, status,
+# description и created_at заменяются значениями по умолчанию
+IMPORT_COLUMNS = [
+    "uuid", "name", "description", "status", "owner_email", "assignee_email", "created_at", "end_date",
+    "completion_proof", "completion_file_id", "completion_media_type", "completed_at",
+]
+REQUIRED_COLUMNS = {"name", "owner_email", "end_date"}
+
+# Промежуточная таблица: COPY проверяет только типы (ошибку в uuid или дате PostgreSQL
+# сообщает с номером строки файла), остальное проверяет VALIDATE_SQL. line - номер строки файла
+STAGING_SQL = """
+CREATE TEMP TABLE task_import (
+    line bigint GENERATED BY DEFAULT AS IDENTITY (START WITH 2),  -- После заголовка CSV
+    uuid uuid,
+    name text,
+    description text,
+    status text,
+    owner_email text,
+    assignee_email text,
+    created_at timestamptz,
+    end_date timestamptz,
+    completion_proof text,
+    completion_file_id text,
+    completion_media_type text,
+    completed_at timestamptz,
+    owner_id bigint,
+    assignee_id bigint
+) ON COMMIT DROP
+"""
+
+# Email владельцев и исполнителей переводятся в id одним запросом на весь файл
+RESOLVE_SQL = """
+UPDATE task_import AS s
+SET owner_id = resolved.owner_id, assignee_id = resolved.assignee_id
+FROM (
+    SELECT i.line, owner.id AS owner_id, assignee.id AS assignee_id
+    FROM task_import AS i
+    LEFT JOIN {users} AS owner ON owner.email = i.owner_email
+    LEFT JOIN {users} AS assignee ON assignee.email = NULLIF(i.assignee_email, '')
+) AS resolved
+WHERE s.line = resolved.line
+"""
+
+# Правила Task и Task.clean (end_date не раньше created_at) для всех строк сразу
+VALIDATE_SQL = """
+SELECT line, errors FROM (
+    SELECT s.line, array_remove(ARRAY[
+        CASE WHEN COALESCE(s.name, '') = '' THEN 'name: обязательное поле' END,
+        CASE WHEN length(s.name) > %(name_length)s THEN 'name: длиннее %(name_length)s символов' END,
+        CASE WHEN length(s.description) > %(description_length)s
+            THEN 'description: длиннее %(description_length)s символов' END,
+        CASE WHEN NOT (COALESCE(NULLIF(s.status, ''), 'NEW') = ANY(%(statuses)s))
+            THEN 'status: неизвестный статус ' || s.status END,
+        CASE WHEN length(s.completion_file_id) > %(file_id_length)s
+            THEN 'completion_file_id: длиннее %(file_id_length)s символов' END,
+        CASE WHEN length(s.completion_media_type) > %(media_type_length)s
+            THEN 'completion_media_type: длиннее %(media_type_length)s символов' END,
+        CASE WHEN s.end_date IS NULL THEN 'end_date: обязательное поле' END,
+        CASE WHEN s.end_date < COALESCE(s.created_at, now())
+            THEN 'end_date: дата выполнения не может быть раньше даты создания задачи' END,
+        CASE WHEN s.owner_id IS NULL THEN 'owner_email: пользователь ' || COALESCE(s.owner_email, '') || ' не найден' END,
+        CASE WHEN NULLIF(s.assignee_email, '') IS NOT NULL AND s.assignee_id IS NULL
+            THEN 'assignee_email: пользователь ' || s.assignee_email || ' не найден' END,
+        CASE WHEN s.uuid IS NOT NULL AND count(*) OVER (PARTITION BY s.uuid) > 1 THEN 'uuid: повторяется в файле' END,
+        CASE WHEN t.uuid IS NOT NULL THEN 'uuid: задача уже существует' END
+    ], NULL) AS errors
+    FROM task_import AS s
+    LEFT JOIN tasks AS t ON t.uuid = s.uuid
+) AS checked
+WHERE cardinality(errors) > 0
+ORDER BY line
+LIMIT %(limit)s
+"""
+
+INSERT_SQL = """
+INSERT INTO tasks (
+    uuid, name, description, status, owner_id, assignee_id, completion_proof, completion_file_id,
+    completion_media_type, completed_at, created_at, updated_at, end_date
+)
+SELECT COALESCE(uuid, gen_random_uuid()), name, COALESCE(description, ''), COALESCE(NULLIF(status, ''), 'NEW'),
+       owner_id, assignee_id, NULLIF(completion_proof, ''), NULLIF(completion_file_id, ''),
+       NULLIF(completion_media_type, ''), completed_at, COALESCE(created_at, now()), now(), end_date
+FROM task_import
+ORDER BY line
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает задачи из CSV (с заголовком) или NDJSON в таблицу tasks через COPY. "
+        "Строки проверяются в промежуточной таблице по правилам Task, email владельцев и "
+        "исполнителей переводятся в id одним запросом. При любой ошибке ничего не загружается. "
+        "Уведомления о загруженных задачах не отправляются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл .csv, .ndjson или .jsonl; '-' - стандартный ввод")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Формат файла, если не ясен из расширения")
+        parser.add_argument("--max-errors", type=int, default=20, help="Сколько ошибочных строк показать")
+        parser.add_argument("--dry-run", action="store_true", help="Только проверить файл")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(
+            Path(path).suffix.lower()
+        )
+        if file_format is None:
+            raise CommandError("Не удалось определить формат файла, укажите --format")
+
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                # Внутри внешней транзакции ON COMMIT DROP не срабатывает до ее конца
+                cursor.execute("DROP TABLE IF EXISTS pg_temp.task_import")
+                cursor.execute(STAGING_SQL)
+                try:
+                    with connection.wrap_database_errors:
+                        if file_format == "csv":
+                            self._copy_csv(cursor, stream)
+                        else:
+                            self._copy_ndjson(cursor, stream)
+                except DataError as exc:
+                    raise CommandError(f"Файл не загружен: {exc}")
+                # Временные таблицы не анализирует autovacuum, а без статистики план соединений хуже
+                cursor.execute("ANALYZE task_import")
+                cursor.execute(RESOLVE_SQL.format(users=connection.ops.quote_name(get_user_model()._meta.db_table)))
+                rows = cursor.rowcount
+
+                self._validate(cursor, options["max_errors"])
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+                    self.stdout.write(f"Ошибок нет, задач в файле: {rows}")
+                    return
+
+                cursor.execute("SELECT DISTINCT owner_id, assignee_id FROM task_import")
+                users = cursor.fetchall()
+                cursor.execute(INSERT_SQL)
+                invalidate_owner_cache(*(owner_id for owner_id, _ in users))
+                invalidate_assignee_cache(*(assignee_id for _, assignee_id in users))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(f"Импортировано задач: {rows}"))
+
+    def _copy_csv(self, cursor, stream):
+        header_line = stream.readline()
+        header = next(csv.reader([header_line]), [])
+        unknown = set(header) - set(IMPORT_COLUMNS)
+        if unknown:
+            raise CommandError(f"Неизвестные колонки: {', '.join(sorted(unknown))}")
+        missing = REQUIRED_COLUMNS - set(header)
+        if missing:
+            raise CommandError(f"Нет обязательных колонок: {', '.join(sorted(missing))}")
+        # Заголовок возвращается в поток, чтобы номера строк в ошибках COPY совпадали с файлом
+        source = _CopyStream(self._read_chunks(stream, header_line))
+        cursor.copy_expert(f"COPY task_import ({', '.join(header)}) FROM STDIN WITH (FORMAT csv, HEADER true)", source)
+        source.raise_error()
+
+    @staticmethod
+    def _read_chunks(stream, first, size=1024 * 1024):
+        yield first.encode()
+        while chunk := stream.read(size):
+            yield chunk.encode()
+
+    def _copy_ndjson(self, cursor, stream):
+        # COPY не разбирает JSON построчно, поэтому объекты переводятся в CSV на лету,
+        # строка в строку: номера строк в ошибках COPY совпадают с файлом
+        columns = ["line", *IMPORT_COLUMNS]
+        source = _CopyStream(self._ndjson_to_csv(stream))
+        cursor.copy_expert(f"COPY task_import ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", source)
+        source.raise_error()
+
+    @staticmethod
+    def _ndjson_to_csv(stream, batch_size=1000):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        lines = enumerate(stream, start=1)
+        while batch := list(islice(lines, batch_size)):
+            for number, line in batch:
+                if not line.strip():
+                    raise CommandError(f"Строка {number}: пустая строка")
+                try:
+                    item = json.loads(line)
+                except ValueError as exc:
+                    raise CommandError(f"Строка {number}: некорректный JSON ({exc})")
+                if not isinstance(item, dict):
+                    raise CommandError(f"Строка {number}: ожидается объект")
+                unknown = item.keys() - set(IMPORT_COLUMNS)
+                if unknown:
+                    raise CommandError(f"Строка {number}: неизвестные поля {', '.join(sorted(unknown))}")
+                writer.writerow([number, *(item.get(column) for column in IMPORT_COLUMNS)])
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    @staticmethod
+    def _validate(cursor, limit):
+        fields = {field.name: field for field in Task._meta.get_fields()}
+        cursor.execute(VALIDATE_SQL, {
+            "name_length": fields["name"].max_length,
+            "description_length": fields["description"].max_length,
+            "file_id_length": fields["completion_file_id"].max_length,
+            "media_type_length": fields["completion_media_type"].max_length,
+            "statuses": [status for status, _ in Task.CHOICES_STATUS],
+            "limit": limit,
+        })
+        errors = cursor.fetchall()
+        if errors:
+            details = "\n".join(f"Строка {line}: {'; '.join(messages)}" for line, messages in errors)
+            raise CommandError(f"Файл не загружен, первые ошибки:\n{details}")
+
+
+class _CopyStream:
+    """
+    Файлоподобная обертка над генератором байтов для copy_expert.
+
+    psycopg2 заменяет исключение из read() на QueryCanceled, поэтому ошибка генератора
+    запоминается, поток завершается, а вызывающий код поднимает ее через raise_error().
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+        self.error = None
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                chunk = next(self.chunks, None)
+            except CommandError as exc:
+                self.error = exc
+                chunk = None
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
@@ -0,0 +1,234 @@
+import asyncio
+import itertools
+import math
+import secrets
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from telegram import Update
+
+from tasks.fake_bot_api import FakeBotAPI
+from tasks.models import Task
+from tasks.telegram_bot import application
+from tasks.telegram_http import pool_stats
+
+# Chat id синтетических пользователей; у настоящих пользователей Telegram таких нет.
+# Каждый запуск берет свой диапазон, чтобы не пересечься с остатками прерванного запуска
+LOADTEST_CHAT_ID = 10 ** 12
+LOADTEST_RUN_SIZE = 10 ** 5
+LOADTEST_EMAIL = "loadtest-{run}-{i}@example.com"
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+PROOF_KINDS = ["text", "photo", "video", "document"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест обработчиков бота: прогоняет через application.process_update нажатия "
+        "кнопок (accept_, complete_, approve_, reject_) и доказательства выполнения (текст, фото, "
+        "видео, документ) и выводит пропускную способность и задержки p50/p99. Bot API заменяет "
+        "FakeBotAPI по адресу TELEGRAM_BOT_API_URL, который должен быть локальным. "
+        "Созданные командой пользователи и задачи удаляются, остальные данные не затрагиваются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=1000, help="Количество задач")
+        parser.add_argument(
+            "--concurrency", type=int, default=20,
+            help="Исполнителей, нажимающих кнопки одновременно (у каждого свои задачи)",
+        )
+        parser.add_argument("--latency", type=float, default=50, help="Задержка ответов Bot API, мс")
+        parser.add_argument("--jitter", type=float, default=0, help="Случайная добавка к задержке, до стольких мс")
+        parser.add_argument("--rate-limit-ratio", type=float, default=0, help="Доля ответов 429 (0-1)")
+        parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, секунд")
+
+    def handle(self, *args, **options):
+        # application создан при импорте, поэтому адрес берется у его клиента, а не из настроек
+        url = urlsplit(application.bot.base_url)
+        if url.hostname not in LOCAL_HOSTS:
+            raise CommandError(
+                f"Bot API бота - {url.hostname}: запустите тест с локальным "
+                f"TELEGRAM_BOT_API_URL, например http://127.0.0.1:8081/bot"
+            )
+
+        api = FakeBotAPI(
+            url.hostname, url.port or 80,
+            latency=options["latency"] / 1000,
+            jitter=options["jitter"] / 1000,
+            rate_limit_ratio=options["rate_limit_ratio"],
+            retry_after=options["retry_after"],
+        ).start()
+        user_ids = []
+        try:
+            owner_chat_id, flows = self._seed(options["tasks"], options["concurrency"], user_ids)
+            self.stdout.write(f"Обновлений: {sum(len(flow) for flow in flows)}, исполнителей: {len(flows)}...")
+            latencies, errors, elapsed = asyncio.run(self._run(flows))
+            statuses = dict(
+                Task.objects.filter(owner__telegram_chat_id=owner_chat_id)
+                .values_list("status").annotate(count=Count("*")).order_by()
+            )
+        finally:
+            api.stop()
+            # Задачи удаляются каскадом вместе с владельцем
+            get_user_model().objects.filter(pk__in=user_ids).delete()
+
+        self._report(latencies, errors, elapsed, api, statuses)
+
+    @transaction.atomic
+    def _seed(self, tasks, concurrency, user_ids):
+        """
+        Создает владельца, исполнителей и задачи, добавляя id пользователей в user_ids.
+
+        Возвращает chat id владельца и сценарии исполнителей.
+        """
+        concurrency = min(concurrency, tasks, LOADTEST_RUN_SIZE - 1)
+        run = secrets.randbelow(10 ** 6)
+        User = get_user_model()
+        users = User.objects.bulk_create(
+            User(
+                email=LOADTEST_EMAIL.format(run=run, i=i),
+                telegram_chat_id=str(LOADTEST_CHAT_ID + run * LOADTEST_RUN_SIZE + i),
+            )
+            for i in range(concurrency + 1)
+        )
+        user_ids.extend(user.pk for user in users)
+        owner, assignees = users[0], users[1:]
+        end_date = timezone.now() + timedelta(days=1)
+        seeded = Task.objects.bulk_create(
+            Task(
+                name=f"Load test task {i}",
+                description="Seeded by load_test_bot",
+                owner=owner,
+                assignee=assignees[i % len(assignees)],
+                end_date=end_date,
+            )
+            for i in range(tasks)
+        )
+
+        # Сценарии одного исполнителя выполняются по очереди: состояние completing_task у него одно
+        update_ids = itertools.count(1)
+        flows = [[] for _ in assignees]
+        for i, task in enumerate(seeded):
+            assignee_chat_id = int(assignees[i % len(assignees)].telegram_chat_id)
+            owner_chat_id = int(owner.telegram_chat_id)
+            if i % 4 == 3:
+                steps = [("reject_", callback_update(next(update_ids), owner_chat_id, f"reject_{task.uuid}"))]
+            else:
+                kind = PROOF_KINDS[i // 4 % len(PROOF_KINDS)]
+                steps = [
+                    ("accept_", callback_update(next(update_ids), assignee_chat_id, f"accept_{task.uuid}")),
+                    ("complete_", callback_update(next(update_ids), assignee_chat_id, f"complete_{task.uuid}")),
+                    (f"proof:{kind}", proof_update(next(update_ids), assignee_chat_id, kind)),
+                    ("approve_", callback_update(next(update_ids), owner_chat_id, f"approve_{task.uuid}")),
+                ]
+            flows[i % len(assignees)].extend(steps)
+        return owner.telegram_chat_id, flows
+
+    async def _run(self, flows):
+        latencies = defaultdict(list)
+        errors = Counter()
+
+        async def on_error(update, context):
+            errors[type(context.error).__name__] += 1
+
+        async def replay(flow):
+            for kind, data in flow:
+                started = time.perf_counter()
+                await application.process_update(Update.de_json(data, application.bot))
+                latencies[kind].append(time.perf_counter() - started)
+
+        application.add_error_handler(on_error)
+        await application.initialize()
+        await application.start()
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(*(replay(flow) for flow in flows))
+            elapsed = time.perf_counter() - started
+        finally:
+            await application.stop()
+            await application.shutdown()
+            application.remove_error_handler(on_error)
+            # Соединение с БД потока sync_to_async обработчиков
+            await sync_to_async(connections.close_all)()
+        return latencies, errors, elapsed
+
+    def _report(self, latencies, errors, elapsed, api, statuses):
+        total = [latency for values in latencies.values() for latency in values]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{len(total)} обновлений за {elapsed:.2f} с: {len(total) / elapsed:.1f} обновлений/с"
+        ))
+        self.stdout.write(f"{'':<16}{'кол-во':>8}{'p50, мс':>10}{'p99, мс':>10}{'макс, мс':>10}")
+        for kind, values in [*sorted(latencies.items()), ("всего", total)]:
+            values = sorted(values)
+            self.stdout.write(
+                f"{kind:<16}{len(values):>8}{percentile(values, 0.5) * 1000:>10.1f}"
+                f"{percentile(values, 0.99) * 1000:>10.1f}{values[-1] * 1000:>10.1f}"
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nВызовы Bot API"))
+        for method, count in api.calls.most_common():
+            self.stdout.write(f"{count:>10}  {method}")
+        self.stdout.write(f"Ответов 429: {api.rate_limited}")
+        self.stdout.write(f"Ошибок обработчиков: {dict(errors) or 0}")
+        if "bot" in pool_stats:
+            stats = pool_stats["bot"].snapshot()
+            self.stdout.write(
+                f"Пул bot: размер {stats['size']}, пик занятости {stats['peak_in_use']}, "
+                f"ждали соединения {stats['waited']} (максимум {stats['max_wait'] * 1000:.1f} мс), "
+                f"таймаутов {stats['pool_timeouts']}"
+            )
+        self.stdout.write(f"Задачи по статусам: {statuses}")
+
+
+def percentile(values, q):
+    """Значение с рангом q (0-1) в отсортированном списке: ближайший ранг сверху"""
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+def callback_update(update_id, chat_id, data):
+    """Нажатие inline-кнопки data в сообщении с этой кнопкой"""
+    user = {"id": chat_id, "is_bot": False, "first_name": "Load", "last_name": "Test"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": "Load test",
+                "reply_markup": {"inline_keyboard": [[{"text": "Load test", "callback_data": data}]]},
+            },
+        },
+    }
+
+
+def proof_update(update_id, chat_id, kind):
+    """Сообщение с доказательством выполнения: текст или file_id фото, видео, документа"""
+    file = {"file_id": f"loadtest-{update_id}", "file_unique_id": f"loadtest-{update_id}"}
+    media = {
+        "text": {"text": "Готово"},
+        "photo": {"photo": [{**file, "width": 1, "height": 1}]},
+        "video": {"video": {**file, "width": 1, "height": 1, "duration": 1}},
+        "document": {"document": {**file, "file_name": "proof.pdf"}},
+    }[kind]
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Load", "last_name": "Test"},
+            **media,
+        },
+    }
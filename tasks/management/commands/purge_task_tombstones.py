@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.models import TaskTombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет записи об удаленных задачах старше срока действия токена синхронизации. "
+        "Клиенты с более старым токеном все равно получают 410 и синхронизируются заново."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        # Запас на транзакции, начатые до выдачи токена и завершившиеся после
+        cutoff = timezone.now() - settings.TASK_SYNC["TOKEN_MAX_AGE"] - timedelta(days=1)
+        total = 0
+        while True:
+            ids = list(
+                TaskTombstone.objects.filter(deleted_at__lt=cutoff).values_list("id", flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            total += TaskTombstone.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(f'Удалено записей: {total}')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from tasks.stats import EXPECTED_STATS_SQL
+
+# Строки task_stats, расходящиеся с пересчетом по tasks
+DRIFT_SQL = f"""
+WITH expected AS ({EXPECTED_STATS_SQL})
+SELECT count(*)
+FROM expected
+FULL JOIN (
+    SELECT * FROM task_stats WHERE %(owner_id)s::bigint IS NULL OR owner_id = %(owner_id)s::bigint
+) AS stored USING (owner_id, status)
+WHERE (expected.count, expected.next_end_date) IS DISTINCT FROM (stored.count, stored.next_end_date)
+"""
+
+REBUILD_SQL = f"""
+DELETE FROM task_stats WHERE %(owner_id)s::bigint IS NULL OR owner_id = %(owner_id)s::bigint;
+INSERT INTO task_stats (owner_id, status, count, next_end_date) {EXPECTED_STATS_SQL};
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает task_stats по таблице tasks (например, после TRUNCATE или ручной правки "
+        "данных с отключенными триггерами). На время пересчета запись в tasks ждет, чтение - нет."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, help="Пересчитать только задачи этого владельца")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать число расхождений")
+
+    def handle(self, *args, **options):
+        params = {"owner_id": options["owner"]}
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Изменения задач во время пересчета потеряли бы свои дельты
+            cursor.execute("LOCK TABLE tasks IN SHARE MODE")
+            cursor.execute(DRIFT_SQL, params)
+            drift = cursor.fetchone()[0]
+            if not options["dry_run"]:
+                cursor.execute(REBUILD_SQL, params)
+
+        verb = "Найдено" if options["dry_run"] else "Исправлено"
+        self.stdout.write(f"{verb} расхождений: {drift}")
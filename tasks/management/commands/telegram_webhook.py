@@ -0,0 +1,58 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from telegram import Update
+
+from tasks.telegram_http import build_bot
+
+
+class Command(BaseCommand):
+    help = (
+        'Регистрирует (set), удаляет (delete) или показывает (info) webhook Telegram бота. '
+        'Пока webhook установлен, run_bot (polling) работать не будет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['set', 'delete', 'info'])
+        parser.add_argument('--url', help="Адрес webhook (по умолчанию TELEGRAM_WEBHOOK['URL'])")
+        parser.add_argument(
+            '--drop-pending-updates', action='store_true',
+            help='Удалить обновления, накопившиеся в Telegram до переключения',
+        )
+
+    def handle(self, *args, **options):
+        if options['action'] == 'set':
+            webhook = settings.TELEGRAM_WEBHOOK
+            options['url'] = options['url'] or webhook.get('URL')
+            if not options['url']:
+                raise CommandError("Не задан адрес webhook: укажите --url или TELEGRAM_WEBHOOK_URL")
+            if not webhook.get('SECRET_TOKEN'):
+                raise CommandError("Не задан TELEGRAM_WEBHOOK_SECRET: без него webhook отклоняет все запросы")
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        # Команда делает один запрос: пулу хватает одного соединения
+        async with build_bot('webhook', 1) as bot:
+            if options['action'] == 'set':
+                await self._set(bot, options)
+            elif options['action'] == 'delete':
+                await bot.delete_webhook(drop_pending_updates=options['drop_pending_updates'])
+                self.stdout.write('Webhook удален, можно запускать run_bot.')
+            else:
+                info = await bot.get_webhook_info()
+                self.stdout.write(f'URL: {info.url or "-"}')
+                self.stdout.write(f'Ожидает доставки: {info.pending_update_count}')
+                if info.last_error_message:
+                    self.stdout.write(f'Последняя ошибка: {info.last_error_date} {info.last_error_message}')
+
+    async def _set(self, bot, options):
+        webhook = settings.TELEGRAM_WEBHOOK
+        await bot.set_webhook(
+            url=options['url'],
+            secret_token=webhook['SECRET_TOKEN'],
+            max_connections=webhook['MAX_CONNECTIONS'],
+            allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY],
+            drop_pending_updates=options['drop_pending_updates'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Webhook установлен: {options['url']}"))
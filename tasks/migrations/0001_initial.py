@@ -0,0 +1,84 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:42
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Task",
+            fields=[
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, verbose_name="Название")),
+                (
+                    "description",
+                    models.CharField(max_length=255, verbose_name="Описание"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("NEW", "Новая"),
+                            ("WORK", "В работе"),
+                            ("REVIEW", "На проверке"),
+                            ("DONE", "Выполнена"),
+                            ("REJECTED", "Отклонена"),
+                        ],
+                        default="NEW",
+                        max_length=20,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "completion_proof",
+                    models.TextField(
+                        blank=True, null=True, verbose_name="Доказательство выполнения"
+                    ),
+                ),
+                (
+                    "completion_file_id",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        null=True,
+                        verbose_name="ID файла доказательства",
+                    ),
+                ),
+                (
+                    "completion_media_type",
+                    models.CharField(
+                        blank=True, max_length=10, null=True, verbose_name="Тип медиа"
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Время завершения"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("end_date", models.DateTimeField(verbose_name="Дата выполнения")),
+            ],
+            options={
+                "verbose_name": "Задача",
+                "verbose_name_plural": "Задачи",
+                "db_table": "tasks",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
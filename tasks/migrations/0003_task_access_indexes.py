@@ -0,0 +1,82 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE/DROP INDEX CONCURRENTLY не выполняются внутри транзакции,
+    # зато не блокируют запись в tasks на время построения индексов
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["owner", "-created_at", "-uuid"], name="tasks_owner_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["assignee", "status"], name="tasks_assignee_status_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("status__in", ("NEW", "WORK", "REVIEW"))),
+                fields=["owner", "end_date"],
+                name="tasks_owner_open_due_idx",
+            ),
+        ),
+        # Одиночные индексы внешних ключей стали префиксами составных - удаляем их без блокировки таблицы
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="task",
+                    name="assignee",
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="assigned_tasks",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Исполнитель",
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="task",
+                    name="owner",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        editable=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="created_tasks",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    sql="DROP INDEX CONCURRENTLY IF EXISTS tasks_assignee_id_7880b7f5;",
+                    reverse_sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_assignee_id_7880b7f5 "
+                                "ON tasks (assignee_id);",
+                ),
+                migrations.RunSQL(
+                    sql="DROP INDEX CONCURRENTLY IF EXISTS tasks_owner_id_b2c75a80;",
+                    reverse_sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_owner_id_b2c75a80 "
+                                "ON tasks (owner_id);",
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0003_task_access_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationDeadLetter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chat_id", models.CharField(max_length=50, verbose_name="Чат")),
+                ("text", models.TextField(verbose_name="Текст")),
+                (
+                    "payload",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="Параметры отправки"
+                    ),
+                ),
+                ("error", models.TextField(verbose_name="Последняя ошибка")),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="Попыток"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Недоставленное уведомление",
+                "verbose_name_plural": "Недоставленные уведомления",
+                "db_table": "notification_dead_letters",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:08
+
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+# Каждая вставка и изменение задачи записывают номер своей транзакции в change_xid
+CHANGE_XID_TRIGGER = """
+CREATE FUNCTION tasks_set_change_xid() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tasks_set_change_xid BEFORE INSERT OR UPDATE ON tasks
+FOR EACH ROW EXECUTE FUNCTION tasks_set_change_xid();
+"""
+
+# Удаленные задачи попадают в task_tombstones одной вставкой на оператор DELETE
+TOMBSTONE_TRIGGER = """
+CREATE FUNCTION tasks_write_tombstones() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO task_tombstones (task_uuid, owner_id, change_xid, deleted_at)
+    SELECT uuid, owner_id, pg_current_xact_id()::text::bigint, now() FROM deleted_tasks;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tasks_write_tombstones AFTER DELETE ON tasks
+REFERENCING OLD TABLE AS deleted_tasks
+FOR EACH STATEMENT EXECUTE FUNCTION tasks_write_tombstones();
+"""
+
+
+class Migration(migrations.Migration):
+    # Индекс по tasks строится CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0005_task_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("task_uuid", models.UUIDField()),
+                ("owner_id", models.BigIntegerField()),
+                ("change_xid", models.BigIntegerField()),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        db_default=django.db.models.functions.datetime.Now()
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "task_tombstones",
+            },
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="change_xid",
+            field=models.BigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            CHANGE_XID_TRIGGER,
+            "DROP TRIGGER tasks_set_change_xid ON tasks; DROP FUNCTION tasks_set_change_xid();",
+        ),
+        migrations.RunSQL(
+            TOMBSTONE_TRIGGER,
+            "DROP TRIGGER tasks_write_tombstones ON tasks; DROP FUNCTION tasks_write_tombstones();",
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["owner", "change_xid", "uuid"], name="tasks_owner_change_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tasktombstone",
+            index=models.Index(
+                fields=["owner_id", "change_xid", "task_uuid"],
+                name="task_tombstones_owner_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tasktombstone",
+            index=models.Index(
+                fields=["deleted_at"], name="task_tombstones_deleted_idx"
+            ),
+        ),
+    ]
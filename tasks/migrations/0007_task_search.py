@@ -0,0 +1,129 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:29
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, transaction
+
+# search_vector пересчитывается при вставке и при изменении названия или описания. Django при
+# save() пишет в столбец NULL, поэтому он тоже в списке столбцов
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION tasks_set_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian'::regconfig, coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('russian'::regconfig, coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tasks_set_search_vector BEFORE INSERT OR UPDATE OF name, description, search_vector ON tasks
+FOR EACH ROW EXECUTE FUNCTION tasks_set_search_vector();
+"""
+
+# Заполнение search_vector существующих задач - не изменение задачи для клиентов /task/sync/:
+# пакеты backfill_search_vector выставляют tasks.backfill, и change_xid остается прежним
+CHANGE_XID_FUNCTION = """
+CREATE OR REPLACE FUNCTION tasks_set_change_xid() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('tasks.backfill', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    NEW.change_xid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Как в 0006_task_sync
+CHANGE_XID_FUNCTION_0006 = """
+CREATE OR REPLACE FUNCTION tasks_set_change_xid() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Пакет задач по первичному ключу; SET name = name запускает tasks_set_search_vector
+BACKFILL_BATCH = """
+UPDATE tasks SET name = name
+WHERE uuid IN (SELECT uuid FROM tasks WHERE uuid > %s ORDER BY uuid LIMIT %s)
+RETURNING uuid
+"""
+BACKFILL_BATCH_SIZE = 5000
+
+TRIGRAM_INDEX = "CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_name_trgm_idx ON tasks USING gin (name gin_trgm_ops)"
+
+
+def backfill_search_vector(apps, schema_editor):
+    """
+    Заполняет search_vector существующих задач пакетами по BACKFILL_BATCH_SIZE.
+
+    Каждый пакет - своя короткая транзакция: блокируются только строки пакета, а не вся
+    таблица. Задачи, созданные во время заполнения, получают значение от триггера.
+    """
+    connection = schema_editor.connection
+    last_uuid = "00000000-0000-0000-0000-000000000000"
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL tasks.backfill = 'on'")
+            cursor.execute(BACKFILL_BATCH, [last_uuid, BACKFILL_BATCH_SIZE])
+            uuids = [row[0] for row in cursor.fetchall()]
+        if not uuids:
+            return
+        last_uuid = max(uuids)
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Нечеткий поиск по названию (tasks/search.py) нужен pg_trgm из contrib. Если расширение
+    на сервере не установлено, миграция его пропускает и поиск обходится полнотекстовым.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(TRIGRAM_INDEX)
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS tasks_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+    # Миграция работает без простоя: столбец добавляется без перезаписи таблицы (NULL по
+    # умолчанию), существующие задачи заполняются пакетами в отдельных транзакциях, индексы
+    # строятся CONCURRENTLY. Поэтому вне общей транзакции
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0006_task_sync"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            SEARCH_VECTOR_TRIGGER + CHANGE_XID_FUNCTION,
+            "DROP TRIGGER tasks_set_search_vector ON tasks; DROP FUNCTION tasks_set_search_vector();"
+            + CHANGE_XID_FUNCTION_0006,
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name="task",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="tasks_search_idx"
+            ),
+        ),
+        migrations.RunPython(
+            create_trigram_index,
+            drop_trigram_index,
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:34
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, не блокируя запись в tasks
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0007_task_search"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["owner", "status", "-created_at", "-uuid"],
+                name="tasks_owner_status_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["owner", "end_date", "uuid"], name="tasks_owner_end_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,146 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:38
+
+from django.db import migrations, models
+
+# Применяет изменения счетчиков к task_stats и пересчитывает ближайший срок затронутых пар
+APPLY_STATS_FUNCTION = """
+CREATE FUNCTION tasks_apply_stats(owner_ids bigint[], statuses varchar[], deltas bigint[]) RETURNS void AS $$
+BEGIN
+    -- Строки блокируются в одном порядке, поэтому параллельные транзакции не взаимоблокируются
+    INSERT INTO task_stats AS s (owner_id, status, count)
+    SELECT * FROM unnest(owner_ids, statuses, deltas)
+    ORDER BY 1, 2
+    ON CONFLICT (owner_id, status) DO UPDATE SET count = s.count + EXCLUDED.count;
+
+    -- Отдельный оператор получает новый снимок: после ожидания блокировки строки
+    -- видны и задачи, зафиксированные конкурирующей транзакцией
+    UPDATE task_stats AS s
+    SET next_end_date = (
+        SELECT min(t.end_date) FROM tasks AS t
+        WHERE t.owner_id = s.owner_id AND t.status = s.status AND t.status IN ('NEW', 'WORK', 'REVIEW')
+    )
+    FROM unnest(owner_ids, statuses) AS d(owner_id, status)
+    WHERE s.owner_id = d.owner_id AND s.status = d.status AND s.status IN ('NEW', 'WORK', 'REVIEW');
+
+    DELETE FROM task_stats AS s
+    USING unnest(owner_ids, statuses) AS d(owner_id, status)
+    WHERE s.owner_id = d.owner_id AND s.status = d.status AND s.count = 0;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Триггеры уровня оператора: изменения сворачиваются в дельты по (владелец, статус), так что
+# массовые вставки и import_tasks обновляют каждую строку task_stats один раз
+STATS_TRIGGERS = """
+CREATE FUNCTION tasks_update_stats() RETURNS trigger AS $$
+DECLARE
+    owner_ids bigint[];
+    statuses varchar[];
+    deltas bigint[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(owner_id), array_agg(status), array_agg(delta) INTO owner_ids, statuses, deltas
+        FROM (SELECT owner_id, status, count(*) AS delta FROM new_tasks GROUP BY 1, 2) AS d;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(owner_id), array_agg(status), array_agg(delta) INTO owner_ids, statuses, deltas
+        FROM (SELECT owner_id, status, -count(*) AS delta FROM old_tasks GROUP BY 1, 2) AS d;
+    ELSE
+        -- Изменения, не затрагивающие статус и срок, пропускаются
+        SELECT array_agg(owner_id), array_agg(status), array_agg(delta) INTO owner_ids, statuses, deltas
+        FROM (
+            SELECT v.owner_id, v.status, sum(v.delta) AS delta
+            FROM old_tasks AS o
+            JOIN new_tasks AS n USING (uuid)
+            CROSS JOIN LATERAL (VALUES (o.owner_id, o.status, -1), (n.owner_id, n.status, 1)) AS v(owner_id, status, delta)
+            WHERE (o.owner_id, o.status, o.end_date) IS DISTINCT FROM (n.owner_id, n.status, n.end_date)
+            GROUP BY 1, 2
+        ) AS d;
+    END IF;
+
+    IF owner_ids IS NOT NULL THEN
+        PERFORM tasks_apply_stats(owner_ids, statuses, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tasks_update_stats_insert AFTER INSERT ON tasks
+REFERENCING NEW TABLE AS new_tasks
+FOR EACH STATEMENT EXECUTE FUNCTION tasks_update_stats();
+
+CREATE TRIGGER tasks_update_stats_update AFTER UPDATE ON tasks
+REFERENCING OLD TABLE AS old_tasks NEW TABLE AS new_tasks
+FOR EACH STATEMENT EXECUTE FUNCTION tasks_update_stats();
+
+CREATE TRIGGER tasks_update_stats_delete AFTER DELETE ON tasks
+REFERENCING OLD TABLE AS old_tasks
+FOR EACH STATEMENT EXECUTE FUNCTION tasks_update_stats();
+"""
+
+DROP_STATS_TRIGGERS = """
+DROP TRIGGER tasks_update_stats_insert ON tasks;
+DROP TRIGGER tasks_update_stats_update ON tasks;
+DROP TRIGGER tasks_update_stats_delete ON tasks;
+DROP FUNCTION tasks_update_stats();
+DROP FUNCTION tasks_apply_stats(bigint[], varchar[], bigint[]);
+"""
+
+# Триггеры создаются в той же транзакции и держат блокировку tasks до ее конца,
+# поэтому начальное заполнение не пропускает параллельные изменения
+FILL_STATS = """
+INSERT INTO task_stats (owner_id, status, count, next_end_date)
+SELECT owner_id, status, count(*), min(end_date) FILTER (WHERE status IN ('NEW', 'WORK', 'REVIEW'))
+FROM tasks
+GROUP BY owner_id, status
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0008_task_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("owner_id", models.BigIntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("NEW", "Новая"),
+                            ("WORK", "В работе"),
+                            ("REVIEW", "На проверке"),
+                            ("DONE", "Выполнена"),
+                            ("REJECTED", "Отклонена"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+                ("next_end_date", models.DateTimeField(null=True)),
+            ],
+            options={
+                "db_table": "task_stats",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("owner_id", "status"),
+                        name="task_stats_owner_status_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(APPLY_STATS_FUNCTION + STATS_TRIGGERS, DROP_STATS_TRIGGERS),
+        migrations.RunSQL(FILL_STATS, migrations.RunSQL.noop),
+    ]
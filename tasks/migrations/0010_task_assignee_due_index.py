@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:42
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Новый индекс покрывает запросы старого (assignee, status), поэтому сначала строится
+    # он, а старый удаляется следом; оба шага CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0009_task_stats"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["assignee", "status", "end_date"],
+                name="tasks_assignee_status_due_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="task",
+            name="tasks_assignee_status_idx",
+        ),
+    ]
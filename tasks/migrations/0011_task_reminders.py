@@ -0,0 +1,69 @@
+# Generated by Django 5.2.5 on 2026-10-17 09:00
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индекс по tasks строится CONCURRENTLY, не блокируя запись; task_reminders - новая таблица
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0010_task_assignee_due_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskReminder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("window", models.DurationField(verbose_name="За сколько до срока")),
+                ("end_date", models.DateTimeField()),
+                (
+                    "sent_at",
+                    models.DateTimeField(
+                        db_default=django.db.models.functions.datetime.Now()
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "task_reminders",
+            },
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("status__in", ("NEW", "WORK", "REVIEW"))),
+                fields=["end_date", "uuid"],
+                name="tasks_open_due_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="taskreminder",
+            name="task",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reminders",
+                to="tasks.task",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="taskreminder",
+            constraint=models.UniqueConstraint(
+                fields=("task", "window", "end_date"), name="task_reminders_uniq"
+            ),
+        ),
+    ]
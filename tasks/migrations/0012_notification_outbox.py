@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-17 09:13
+
+import django.db.models.functions.datetime
+import tasks.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0011_task_reminders"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dedup_key", models.CharField(max_length=255, unique=True)),
+                ("chat_id", models.CharField(max_length=50, verbose_name="Чат")),
+                ("text", models.TextField(verbose_name="Текст")),
+                (
+                    "payload",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        encoder=tasks.models.UnicodeJSONEncoder,
+                        verbose_name="Параметры отправки",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_default=django.db.models.functions.datetime.Now()
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "notification_outbox",
+            },
+        ),
+    ]
@@ -1,7 +1,14 @@
 from uuid import uuid4
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Now
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Статусы, в которых задача еще не закрыта
+OPEN_STATUSES = ('NEW', 'WORK', 'REVIEW')
 
 
 class Task(models.Model):
@@ -27,6 +34,7 @@ class Task(models.Model):
         related_name="created_tasks",
         verbose_name="Автор",
         editable=False,  # Запрещаем редактирование в формах
+        db_index=False,  # Покрывается составным индексом tasks_owner_created_idx
     )
     assignee = models.ForeignKey(
         "users.CustomUser",
@@ -35,6 +43,7 @@ class Task(models.Model):
         blank=True,
         related_name="assigned_tasks",
         verbose_name="Исполнитель",
+        db_index=False,  # Покрывается составным индексом tasks_assignee_status_due_idx
     )
 #_______________________________________________________________________________________________________________________
     completion_proof = models.TextField(blank=True, null=True, verbose_name="Доказательство выполнения")
@@ -43,13 +52,47 @@ class Task(models.Model):
     completed_at = models.DateTimeField(blank=True, null=True, verbose_name="Время завершения")
 #_______________________________________________________________________________________________________________________
     created_at = models.DateTimeField(auto_now_add=True)
+    # Обновляется при каждом сохранении; запросы в обход save() (например, transition_task) задают его явно
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменена")
     end_date = models.DateTimeField(verbose_name="Дата выполнения")
+    # Номер транзакции, последней изменившей задачу; пишет триггер tasks_set_change_xid (см. tasks/sync.py)
+    change_xid = models.BigIntegerField(db_default=0, editable=False)
+    # Полнотекстовый поиск (tasks/search.py): название весомее описания. Столбец заполняет
+    # триггер tasks_set_search_vector (миграция 0007), поэтому он верен и для записей в обход
+    # ORM (COPY, bulk_create); значение в экземпляре после save() не обновляется
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Задача"
         verbose_name_plural = "Задачи"
         db_table = "tasks"
         ordering = ["-created_at"]  # Сортировка по умолчанию
+        indexes = [
+            # Список задач владельца, новые сверху; uuid - для keyset-пагинации
+            models.Index(fields=["owner", "-created_at", "-uuid"], name="tasks_owner_created_idx"),
+            # Задачи исполнителя в нужном статусе по сроку (бот, /task/assigned/ и его сводка)
+            models.Index(fields=["assignee", "status", "end_date"], name="tasks_assignee_status_due_idx"),
+            # Фильтр ?status= с сортировкой по умолчанию
+            models.Index(fields=["owner", "status", "-created_at", "-uuid"], name="tasks_owner_status_idx"),
+            # Диапазоны ?end_from=/?end_to= и сортировка ?ordering=end_date
+            models.Index(fields=["owner", "end_date", "uuid"], name="tasks_owner_end_idx"),
+            # Незакрытые задачи владельца по сроку выполнения
+            models.Index(
+                fields=["owner", "end_date"],
+                name="tasks_owner_open_due_idx",
+                condition=models.Q(status__in=OPEN_STATUSES),
+            ),
+            # Незакрытые задачи по сроку для напоминаний (tasks/reminders.py)
+            models.Index(
+                fields=["end_date", "uuid"],
+                name="tasks_open_due_idx",
+                condition=models.Q(status__in=OPEN_STATUSES),
+            ),
+            # Изменения задач владельца для /task/sync/
+            models.Index(fields=["owner", "change_xid", "uuid"], name="tasks_owner_change_idx"),
+            # Поиск ?q= и поиск в админке
+            GinIndex(fields=["search_vector"], name="tasks_search_idx"),
+        ]
 
     def __str__(self):
         return f"Задача: {self.name}"
@@ -69,3 +112,121 @@ class Task(models.Model):
     def save(self, *args, **kwargs):
         self.full_clean()  # Вызов валидации перед сохранением
         super().save(*args, **kwargs)
+
+
+class TaskTombstone(models.Model):
+    """Удаленная задача для /task/sync/. Строки создает триггер tasks_write_tombstones"""
+    task_uuid = models.UUIDField()
+    # Без внешнего ключа: строки появляются и при каскадном удалении задач вместе с владельцем
+    owner_id = models.BigIntegerField()
+    change_xid = models.BigIntegerField()
+    deleted_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = "task_tombstones"
+        indexes = [
+            models.Index(fields=["owner_id", "change_xid", "task_uuid"], name="task_tombstones_owner_idx"),
+            models.Index(fields=["deleted_at"], name="task_tombstones_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"Удаленная задача {self.task_uuid}"
+
+
+class TaskStats(models.Model):
+    """
+    Число задач владельца в статусе и ближайший срок незакрытых задач (/task/stats/).
+
+    Строки ведут триггеры tasks_update_stats в той же транзакции, что и изменение задач,
+    включая запросы в обход ORM (transition_task, import_tasks). Починка - команда
+    rebuild_task_stats.
+    """
+    # Без внешнего ключа, как у TaskTombstone: при удалении владельца строки убирает триггер
+    owner_id = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=Task.CHOICES_STATUS)
+    count = models.BigIntegerField(default=0)
+    # Только для статусов из OPEN_STATUSES
+    next_end_date = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = "task_stats"
+        constraints = [
+            models.UniqueConstraint(fields=["owner_id", "status"], name="task_stats_owner_status_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Статистика {self.owner_id}: {self.status}"
+
+
+class TaskReminder(models.Model):
+    """Напоминание о сроке задачи, уже отправленное за окно window (tasks/reminders.py)"""
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name="reminders",
+        db_index=False,  # Покрывается task_reminders_uniq
+    )
+    window = models.DurationField(verbose_name="За сколько до срока")
+    # Срок, о котором напомнили: после его переноса напоминание придет снова
+    end_date = models.DateTimeField()
+    sent_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = "task_reminders"
+        constraints = [
+            models.UniqueConstraint(fields=["task", "window", "end_date"], name="task_reminders_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Напоминание о задаче {self.task_id} за {self.window}"
+
+
+class UnicodeJSONEncoder(DjangoJSONEncoder):
+    """
+    Пишет не-ASCII символы как есть, без \\uXXXX: кириллица и эмодзи кнопок занимают меньше
+    места, а jsonb принимает их и в базе с кодировкой сервера, отличной от UTF8.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **{**kwargs, "ensure_ascii": False})
+
+
+class NotificationOutbox(models.Model):
+    """
+    Уведомление, записанное в одной транзакции с изменением задачи (tasks/outbox.py).
+
+    Строки забирает drain_notification_outbox и удаляет, передав в send_telegram_message.
+    """
+    # Один и тот же получатель и повод: повторная запись пропускается, повторная доставка - тоже
+    dedup_key = models.CharField(max_length=255, unique=True)
+    chat_id = models.CharField(max_length=50, verbose_name="Чат")
+    text = models.TextField(verbose_name="Текст")
+    payload = models.JSONField(
+        default=dict, blank=True, encoder=UnicodeJSONEncoder, verbose_name="Параметры отправки"
+    )
+    created_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = "notification_outbox"
+
+    def __str__(self):
+        return f"Уведомление {self.dedup_key} в чат {self.chat_id}"
+
+
+class NotificationDeadLetter(models.Model):
+    """Уведомление, которое не удалось доставить в Telegram после всех попыток"""
+    chat_id = models.CharField(max_length=50, verbose_name="Чат")
+    text = models.TextField(verbose_name="Текст")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Параметры отправки")
+    error = models.TextField(verbose_name="Последняя ошибка")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Недоставленное уведомление"
+        verbose_name_plural = "Недоставленные уведомления"
+        db_table = "notification_dead_letters"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Уведомление в чат {self.chat_id}"
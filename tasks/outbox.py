@@ -0,0 +1,127 @@
+import hashlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.functions import Now
+from telegram.constants import InlineKeyboardMarkupLimit, MessageLimit
+
+from .models import NotificationOutbox
+
+
+def add_notifications(messages):
+    """
+    Записывает уведомления [(dedup_key, chat_id, text, payload), ...] в текущей транзакции.
+
+    Откат транзакции отменяет и уведомления, а закоммиченные переживут падение процесса:
+    их отправит drain_notification_outbox. Уведомление с уже ожидающим dedup_key пропускается.
+    """
+    NotificationOutbox.objects.bulk_create(
+        [
+            NotificationOutbox(dedup_key=dedup_key, chat_id=chat_id, text=text, payload=payload)
+            for dedup_key, chat_id, text, payload in messages
+        ],
+        ignore_conflicts=True,
+    )
+
+
+@transaction.atomic
+def drain_batch(send, limit, coalesce_window=0):
+    """
+    Передает send до limit старейших уведомлений и удаляет их; возвращает их число.
+
+    Строки, заблокированные другим обработчиком, пропускаются (SKIP LOCKED), поэтому
+    обработчики работают параллельно, не получая одних и тех же строк. Если транзакция
+    не закоммитится после send, строки отправятся повторно: доставка "хотя бы раз",
+    а повтор отсекает send_telegram_message по dedup_key.
+
+    С coalesce_window (секунд) уведомления выжидают это время, а накопившиеся к тому
+    моменту уведомления одного чата send получает одним дайджестом (coalesce).
+    """
+    rows = NotificationOutbox.objects.select_for_update(skip_locked=True).order_by("pk")
+    if coalesce_window:
+        rows = rows.filter(created_at__lte=Now() - timedelta(seconds=coalesce_window))
+    rows = list(rows[:limit])
+    for message in coalesce(rows) if coalesce_window else rows:
+        send(message)
+    NotificationOutbox.objects.filter(pk__in=[row.pk for row in rows]).delete()
+    return len(rows)
+
+
+def coalesce(rows):
+    """
+    Объединяет уведомления одного чата в дайджесты в пределах лимитов Telegram.
+
+    Возвращает несохраненные NotificationOutbox: дайджест нумерует уведомления, а их кнопки
+    (с тем же callback_data) собирает в одну клавиатуру, по строке на уведомление с номером
+    в подписи. Дайджест не длиннее MAX_TEXT_LENGTH и не больше TOTAL_BUTTON_NUMBER кнопок,
+    лишнее уходит следующим дайджестом.
+    """
+    chats = {}
+    for row in rows:
+        # Разный parse_mode в одном сообщении не совместить
+        chats.setdefault((row.chat_id, row.payload.get("parse_mode")), []).append(row)
+
+    messages = []
+    for chat_rows in chats.values():
+        # Заголовок с числом уведомлений не длиннее, чем для всех уведомлений чата
+        header_length = _text_length(_digest_header(len(chat_rows)))
+        digest, length, buttons = [], header_length, 0
+        for row in chat_rows:
+            row_length = _text_length(_digest_item(len(digest) + 1, row.text))
+            row_buttons = len(_row_buttons(row))
+            if digest and (
+                length + row_length > MessageLimit.MAX_TEXT_LENGTH
+                or buttons + row_buttons > InlineKeyboardMarkupLimit.TOTAL_BUTTON_NUMBER
+            ):
+                messages.append(_digest(digest))
+                digest, length, buttons = [], header_length, 0
+                row_length = _text_length(_digest_item(1, row.text))
+            digest.append(row)
+            length += row_length
+            buttons += row_buttons
+        messages.append(_digest(digest))
+    return messages
+
+
+def _digest(rows):
+    if len(rows) == 1:
+        return rows[0]
+
+    lines = [_digest_header(len(rows))]
+    keyboard = []
+    for number, row in enumerate(rows, 1):
+        lines.append(_digest_item(number, row.text))
+        buttons = [{**button, "text": f"{number}. {button['text']}"} for button in _row_buttons(row)]
+        # В строке клавиатуры не больше BUTTONS_PER_ROW кнопок
+        for start in range(0, len(buttons), InlineKeyboardMarkupLimit.BUTTONS_PER_ROW):
+            keyboard.append(buttons[start:start + InlineKeyboardMarkupLimit.BUTTONS_PER_ROW])
+
+    payload = {key: value for key, value in rows[0].payload.items() if key != "reply_markup"}
+    if keyboard:
+        payload["reply_markup"] = {"inline_keyboard": keyboard}
+    # Ключ зависит от состава дайджеста: повторная передача тех же строк не дублирует сообщение
+    keys = "\n".join(row.dedup_key for row in rows)
+    return NotificationOutbox(
+        dedup_key=f"digest:{hashlib.sha1(keys.encode()).hexdigest()}",
+        chat_id=rows[0].chat_id,
+        text="".join(lines),
+        payload=payload,
+    )
+
+
+def _digest_header(count):
+    return f"📬 *Уведомлений: {count}*"
+
+
+def _digest_item(number, text):
+    return f"\n\n*{number}.* {text}"
+
+
+def _row_buttons(row):
+    markup = row.payload.get("reply_markup") or {}
+    return [button for buttons in markup.get("inline_keyboard", []) for button in buttons]
+
+
+def _text_length(text):
+    """Длина в единицах UTF-16, как считает лимиты Telegram (эмодзи - две единицы)"""
+    return len(text.encode("utf-16-le")) // 2
@@ -1,6 +1,126 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class MyPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
+
+
+class TaskCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по паре (поле сортировки, uuid).
+
+    В отличие от MyPagination не выполняет COUNT(*) и OFFSET: каждая страница - это
+    диапазонный проход по индексу от позиции курсора, поэтому её стоимость не зависит
+    от глубины. Позиция включает uuid, так что она уникальна даже при совпадении created_at.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-uuid")
+    tiebreaker = "uuid"
+    position_separator = "|"
+
+    def get_ordering(self, request, queryset, view):
+        """Сортировка всегда дополняется uuid в том же направлении, что и основное поле."""
+        primary = super().get_ordering(request, queryset, view)[0]
+        direction = "-" if primary.startswith("-") else ""
+        return (primary, f"{direction}{self.tiebreaker}")
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None:
+            return None
+        # Смещение не используется: позиция уникальна
+        return cursor._replace(offset=0)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = bool(self.cursor and self.cursor.reverse)
+        current_position = self.cursor.position if self.cursor else None
+
+        if reverse:
+            queryset = queryset.order_by(*(self._invert(order) for order in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self._position_filter(current_position, reverse))
+
+        # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+
+        # Как и в CursorPagination, позиция следующей страницы - первая запись за её пределами:
+        # get_next_link/get_previous_link сами сдвигаются на последнюю запись страницы
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip("-")
+            values.append(instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name))
+        value, key = values
+        return f"{value.isoformat() if hasattr(value, 'isoformat') else value}{self.position_separator}{key}"
+
+    def _split_position(self, position):
+        value, separator, key = position.rpartition(self.position_separator)
+        if not separator:
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            value = self.model._meta.get_field(self.ordering[0].lstrip("-")).to_python(value)
+            key = self.model._meta.get_field(self.tiebreaker).to_python(key)
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        return value, key
+
+    def _position_filter(self, position, reverse):
+        """
+        Условие (field, uuid) < (value, key) для убывающей сортировки (и > для возрастающей).
+
+        Записано как `field <= value AND (field < value OR uuid < key)`: первое условие задает
+        границу диапазона индекса, второе отсекает только записи с совпадающим значением поля.
+        """
+        value, key = self._split_position(position)
+        field_name, tiebreaker = (order.lstrip("-") for order in self.ordering)
+        descending = self.ordering[0].startswith("-") != reverse
+        lookup = "lt" if descending else "gt"
+        return Q(**{f"{field_name}__{lookup}e": value}) & (
+            Q(**{f"{field_name}__{lookup}": value}) | Q(**{f"{tiebreaker}__{lookup}": key})
+        )
+
+    @staticmethod
+    def _invert(order):
+        return order[1:] if order.startswith("-") else f"-{order}"
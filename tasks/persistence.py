@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+
+class LocalStateStore:
+    """Хранилище состояния в памяти процесса. Подходит для тестов и единственного процесса бота."""
+
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, key):
+        value, expires = self._data.get(key, (None, 0))
+        if expires <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def write(self, items, ttl):
+        """items - {ключ: строка JSON или None для удаления}"""
+        expires = time.monotonic() + ttl
+        for key, value in items.items():
+            if value is None:
+                self._data.pop(key, None)
+            else:
+                self._data[key] = (value, expires)
+
+
+class RedisStateStore:
+    """Хранилище состояния в Redis: общее для всех процессов бота."""
+
+    prefix = "telegram:state:"
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    @property
+    def client(self):
+        # Асинхронный клиент привязан к event loop, поэтому создается в нем при первом обращении
+        if self._client is None:
+            from redis import asyncio as redis
+
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    async def get(self, key):
+        value = await self.client.get(self.prefix + key)
+        return value.decode() if value is not None else None
+
+    async def write(self, items, ttl):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                if value is None:
+                    pipe.delete(self.prefix + key)
+                else:
+                    pipe.set(self.prefix + key, value, ex=ttl)
+            await pipe.execute()
+
+
+class SharedPersistence(BasePersistence):
+    """
+    Persistence бота во внешнем хранилище, общем для нескольких процессов.
+
+    user_data и chat_data не загружаются целиком при старте: перед каждым обновлением
+    PTB вызывает refresh_*, и данные пользователя читаются из хранилища, поэтому
+    следующий шаг сценария может обработать любой процесс. Изменения копятся и
+    записываются одной пачкой (раз в UPDATE_INTERVAL секунд, см. BasePersistence).
+    Каждая запись живет TTL секунд, так что брошенные сценарии удаляются сами.
+    """
+
+    # Секунд, которые помнится синхронизированная копия записи. Она нужна, пока PTB не передаст
+    # изменения обработчика в update_* (такт UPDATE_INTERVAL), а обработчик столько не работает
+    synced_ttl = 300
+
+    def __init__(self, store, ttl, update_interval):
+        # bot_data и callback_data общие на все процессы, и их нельзя безопасно сливать по частям
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False), update_interval=update_interval
+        )
+        self.store = store
+        self.ttl = ttl
+        self._pending = {}
+        # Последняя синхронизированная с хранилищем копия недавних записей:
+        # ключ -> (JSON, время синхронизации), от давних к недавним
+        self._synced = OrderedDict()
+        self._flush_task = None
+        self._conversations = {}
+
+    # Загрузка при старте Application
+    async def get_user_data(self):
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        stored = await self._load(f"conversations:{name}")
+        self._conversations[name] = {tuple(json.loads(key)): state for key, state in stored.items()}
+        return dict(self._conversations[name])
+
+    # Чтение перед обработкой обновления
+    async def refresh_user_data(self, user_id, user_data):
+        await self._refresh(f"user:{user_id}", user_data)
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        await self._refresh(f"chat:{chat_id}", chat_data)
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    # Запись изменений
+    async def update_user_data(self, user_id, data):
+        self._write(f"user:{user_id}", data)
+
+    async def update_chat_data(self, chat_id, data):
+        self._write(f"chat:{chat_id}", data)
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name, key, new_state):
+        conversations = self._conversations.setdefault(name, {})
+        if new_state is None:
+            conversations.pop(key, None)
+        else:
+            conversations[key] = new_state
+        self._write(f"conversations:{name}", {json.dumps(list(key)): state for key, state in conversations.items()})
+
+    async def drop_user_data(self, user_id):
+        self._write(f"user:{user_id}", None)
+
+    async def drop_chat_data(self, chat_id):
+        self._write(f"chat:{chat_id}", None)
+
+    async def flush(self):
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._flush()
+
+    @staticmethod
+    def _dumps(data):
+        return json.dumps(data) if data else None
+
+    async def _load(self, key):
+        value = await self.store.get(key)
+        return json.loads(value) if value else {}
+
+    async def _refresh(self, key, data):
+        if key in self._pending:
+            # Еще не записанные изменения этого процесса новее, чем хранилище
+            return
+        if key in self._synced and self._dumps(data) != self._synced[key][0]:
+            # Обработчик изменил данные, а PTB передаст их в update_* только на следующем
+            # такте UPDATE_INTERVAL: копия в памяти новее хранилища
+            return
+        value = await self.store.get(key)
+        self._remember_synced(key, value)
+        data.clear()
+        data.update(json.loads(value) if value else {})
+
+    def _write(self, key, data):
+        # Сериализуем сразу: словарь может измениться до записи. Пустые данные просто удаляем
+        self._pending[key] = value = self._dumps(data)
+        self._remember_synced(key, value)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    def _remember_synced(self, key, value):
+        now = time.monotonic()
+        self._synced[key] = (value, now)
+        self._synced.move_to_end(key)
+        # Давние копии не нужны: их изменения уже записаны, а следующее обновление прочитает хранилище
+        while self._synced:
+            oldest_key, (_, synced_at) = next(iter(self._synced.items()))
+            if synced_at > now - self.synced_ttl:
+                break
+            del self._synced[oldest_key]
+
+    async def _flush(self):
+        # Даем остальным update_* этой пачки добавить свои изменения, чтобы записать все разом
+        await asyncio.sleep(0)
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            await self.store.write(pending, self.ttl)
+        except Exception:
+            logger.exception("Не удалось сохранить состояние бота (%s записей), повторим позже", len(pending))
+            for key, value in pending.items():
+                self._pending.setdefault(key, value)
+
+
+async def save_user_data(application, user_id, user_data):
+    """
+    Сразу записывает user_data в хранилище, не дожидаясь такта UPDATE_INTERVAL.
+
+    Нужно обработчикам, после которых сценарий продолжается: следующее обновление
+    пользователя может прийти через долю секунды и попасть в другой процесс бота.
+    """
+    persistence = application.persistence
+    if persistence is None:
+        return
+    await persistence.update_user_data(user_id, user_data)
+    await persistence.flush()
+
+
+def build_persistence():
+    """Persistence бота; с TELEGRAM_PERSISTENCE['REDIS_URL'] состояние общее для всех процессов."""
+    options = settings.TELEGRAM_PERSISTENCE
+    store = RedisStateStore(options["REDIS_URL"]) if options.get("REDIS_URL") else LocalStateStore()
+    return SharedPersistence(store, ttl=options["TTL"], update_interval=options["UPDATE_INTERVAL"])
@@ -0,0 +1,143 @@
+import threading
+import time
+
+from django.conf import settings
+
+# Атомарно проверяет блокировку и забирает по токену из каждого ведра.
+# KEYS[1] - ключ блокировки после RetryAfter, KEYS[2..] - ведра; ARGV - пары (rate, burst) для ведер.
+# Возвращает время ожидания в секундах строкой (дробные числа Lua в ответе Redis обрезаются).
+TOKEN_BUCKET_LUA = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local wait = 0
+local blocked = redis.call('PTTL', KEYS[1])
+if blocked > 0 then
+    wait = blocked / 1000
+end
+local levels = {}
+for i = 2, #KEYS do
+    local rate = tonumber(ARGV[(i - 2) * 2 + 1])
+    local burst = tonumber(ARGV[(i - 2) * 2 + 2])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local level = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    level = math.min(burst, level + math.max(0, now - ts) * rate)
+    levels[i] = level
+    if level < 1 then
+        wait = math.max(wait, (1 - level) / rate)
+    end
+end
+if wait == 0 then
+    for i = 2, #KEYS do
+        local rate = tonumber(ARGV[(i - 2) * 2 + 1])
+        local burst = tonumber(ARGV[(i - 2) * 2 + 2])
+        redis.call('HSET', KEYS[i], 'tokens', levels[i] - 1, 'ts', now)
+        redis.call('EXPIRE', KEYS[i], math.ceil(burst / rate) + 1)
+    end
+end
+return tostring(wait)
+"""
+
+
+class LocalTokenBucket:
+    """Ведра токенов в памяти процесса. Подходит для тестов и одного воркера (--pool=solo)."""
+
+    # Порог, после которого из памяти удаляются давно не использованные ведра
+    max_buckets = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._blocked_until = 0.0
+
+    def acquire(self, buckets):
+        """
+        Забирает по токену из всех ведер сразу или ни из одного.
+
+        buckets - список (key, rate, burst). Возвращает 0, если токены получены,
+        иначе количество секунд до их появления.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            levels = []
+            for key, rate, burst in buckets:
+                level, ts = self._buckets.get(key, (burst, now))
+                level = min(burst, level + (now - ts) * rate)
+                levels.append(level)
+                if level < 1:
+                    wait = max(wait, (1 - level) / rate)
+            if wait == 0:
+                for (key, _, _), level in zip(buckets, levels):
+                    self._buckets[key] = (level - 1, now)
+                if len(self._buckets) > self.max_buckets:
+                    self._prune(now)
+            return wait
+
+    def block(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _prune(self, now, idle=60):
+        self._buckets = {key: state for key, state in self._buckets.items() if now - state[1] < idle}
+
+
+class RedisTokenBucket:
+    """Ведра токенов в Redis: общий лимит для всех воркеров Celery."""
+
+    block_key = "telegram:ratelimit:blocked"
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_LUA)
+
+    def acquire(self, buckets):
+        keys = [self.block_key] + [f"telegram:ratelimit:{key}" for key, _, _ in buckets]
+        args = [value for _, rate, burst in buckets for value in (rate, burst)]
+        return float(self._script(keys=keys, args=args))
+
+    def block(self, seconds):
+        self._client.set(self.block_key, 1, px=max(int(seconds * 1000), 1))
+
+
+class TelegramRateLimiter:
+    """
+    Лимиты Bot API: общий на бота и отдельный на каждый чат.
+
+    Отправка разрешена, только если токен есть в обоих ведрах. После RetryAfter
+    отправки блокируются для всех чатов на указанное Telegram время.
+    """
+
+    def __init__(self, backend, global_rate, global_burst, chat_rate, chat_burst):
+        self.backend = backend
+        self.global_bucket = ("global", global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+
+    def acquire(self, chat_id):
+        """Возвращает 0, если сообщение в чат можно отправить сейчас, иначе сколько секунд ждать."""
+        return self.backend.acquire([self.global_bucket, (f"chat:{chat_id}", self.chat_rate, self.chat_burst)])
+
+    def block(self, seconds):
+        self.backend.block(seconds)
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    """Лимитер процесса; с TELEGRAM_RATE_LIMIT['REDIS_URL'] лимиты общие для всех воркеров."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        options = settings.TELEGRAM_RATE_LIMIT
+        backend = RedisTokenBucket(options["REDIS_URL"]) if options.get("REDIS_URL") else LocalTokenBucket()
+        _rate_limiter = TelegramRateLimiter(
+            backend,
+            global_rate=options["GLOBAL_RATE"],
+            global_burst=options["GLOBAL_BURST"],
+            chat_rate=options["CHAT_RATE"],
+            chat_burst=options["CHAT_BURST"],
+        )
+    return _rate_limiter
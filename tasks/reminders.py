@@ -0,0 +1,120 @@
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Task
+from .outbox import add_notifications
+
+logger = logging.getLogger(__name__)
+
+# Очередная пачка незакрытых задач со сроком в окне напоминания, еще без напоминания за это
+# окно. Проход по частичному индексу tasks_open_due_idx в порядке (end_date, uuid) от
+# позиции прошлой пачки, поэтому закрытые и давно просроченные задачи не читаются вовсе.
+# Строки вставляются и для больших окон: задаче, созданной за 30 минут до срока,
+# придет одно напоминание "за час", а не еще и "за сутки". Задачи, которые параллельный
+# запуск уже записал, ON CONFLICT пропускает, и RETURNING их не вернет
+CLAIM_SQL = """
+WITH due AS (
+    SELECT tasks.uuid, tasks.end_date
+    FROM tasks
+    WHERE tasks.status IN ('NEW', 'WORK', 'REVIEW')
+      AND tasks.end_date > %(now)s AND tasks.end_date <= %(horizon)s
+      AND (tasks.end_date, tasks.uuid) > (%(after_end_date)s, %(after_uuid)s)
+      AND NOT EXISTS (
+          SELECT 1 FROM task_reminders
+          WHERE task_reminders.task_id = tasks.uuid
+            AND task_reminders."window" = %(window)s
+            AND task_reminders.end_date = tasks.end_date
+      )
+    ORDER BY tasks.end_date, tasks.uuid
+    LIMIT %(limit)s
+), claimed AS (
+    INSERT INTO task_reminders (task_id, "window", end_date, sent_at)
+    SELECT due.uuid, windows."window", due.end_date, %(now)s
+    FROM due CROSS JOIN unnest(%(windows)s::interval[]) AS windows("window")
+    ON CONFLICT DO NOTHING
+    RETURNING task_id, "window"
+)
+SELECT due.uuid, due.end_date, claimed.task_id IS NOT NULL
+FROM due
+LEFT JOIN claimed ON claimed.task_id = due.uuid AND claimed."window" = %(window)s
+ORDER BY due.end_date, due.uuid
+"""
+
+
+def send_due_reminders(now=None):
+    """
+    Напоминает о задачах, до срока которых осталось меньше одного из TASK_REMINDERS['WINDOWS'].
+
+    Окна обходятся от меньшего к большему, каждое - пачками по BATCH_SIZE задач. Пачка
+    записывается в task_reminders вместе со своими сообщениями в outbox, в одной транзакции.
+    Одно напоминание на задачу, окно и срок: после переноса срока напоминания придут снова.
+    Возвращает число записанных сообщений.
+    """
+    options = settings.TASK_REMINDERS
+    now = now or timezone.now()
+    windows = sorted(options["WINDOWS"])
+    sent = 0
+    for index, window in enumerate(windows):
+        after = (now, "00000000-0000-0000-0000-000000000000")
+        while after is not None:
+            after, count = _claim_batch(now, window, windows[index:], after, options["BATCH_SIZE"])
+            sent += count
+    logger.info("[Reminders] Записано напоминаний: %s", sent)
+    return sent
+
+
+@transaction.atomic
+def _claim_batch(now, window, windows, after, limit):
+    """Записывает напоминания пачки; возвращает позицию для следующей (None - окно пройдено) и число сообщений"""
+    with connection.cursor() as cursor:
+        cursor.execute(CLAIM_SQL, {
+            "now": now,
+            "horizon": now + window,
+            "window": window,
+            "windows": windows,
+            "after_end_date": after[0],
+            "after_uuid": after[1],
+            "limit": limit,
+        })
+        rows = cursor.fetchall()
+    if not rows:
+        return None, 0
+
+    claimed = [uuid for uuid, _, is_claimed in rows if is_claimed]
+    tasks = Task.objects.filter(uuid__in=claimed).values(
+        "uuid", "name", "end_date", "assignee__telegram_chat_id", "owner__telegram_chat_id"
+    )
+    messages = []
+    for task in tasks:
+        # Исполнителю, а у задачи без исполнителя - владельцу
+        chat_id = task["assignee__telegram_chat_id"] or task["owner__telegram_chat_id"]
+        if chat_id:
+            dedup_key = f"reminder:{task['uuid']}:{int(window.total_seconds())}:{task['end_date'].isoformat()}"
+            messages.append((dedup_key, chat_id, _reminder_text(task, window), {}))
+    add_notifications(messages)
+
+    last_uuid, last_end_date, _ = rows[-1]
+    return ((last_end_date, last_uuid) if len(rows) == limit else None), len(messages)
+
+
+def _reminder_text(task, window):
+    message_lines = [
+        f"⏰ *Напоминание:* до срока осталось меньше {_format_window(window)}",
+        "",
+        f"🎯 *Задача: {task['name']}*",
+        f"🆔 ID: `{task['uuid']}`",
+        f"⏰ *Срок:* до {task['end_date'].strftime('%d.%m.%Y в %H:%M')}",
+    ]
+    return "\n".join(message_lines)
+
+
+def _format_window(window):
+    seconds = int(window.total_seconds())
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400} дн."
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} ч"
+    return f"{max(seconds // 60, 1)} мин"
@@ -0,0 +1,56 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.filters import BaseFilterBackend
+
+SEARCH_CONFIG = "russian"  # Как у Task.search_vector; латиница в нем стеммится по-английски
+MAX_WORDS = 10
+
+WORD_RE = re.compile(r"\w+")
+
+_trigram_available = {}
+
+
+def trigram_available(using):
+    """Установлено ли расширение pg_trgm (см. миграцию 0007); проверяется раз на процесс"""
+    if using not in _trigram_available:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available[using] = cursor.fetchone() is not None
+    return _trigram_available[using]
+
+
+def search_tasks(queryset, text, extra=None):
+    """
+    Задачи, подходящие под поисковую строку, по убыванию релевантности.
+
+    Каждое слово ищется как префикс в Task.search_vector (индекс tasks_search_idx), так что
+    "отч кварт" находит "Отчет за квартал". При установленном pg_trgm дополнительно
+    находятся названия с опечатками (индекс tasks_name_trgm_idx), а близость названия
+    добавляется к рангу. extra - условие (Q), подходящие под которое задачи тоже найдутся.
+    """
+    words = WORD_RE.findall(text)[:MAX_WORDS]
+    if not words:
+        return queryset.filter(extra) if extra is not None else queryset.none()
+
+    # Слова из \w не содержат кавычек и операторов tsquery, поэтому raw-запрос безопасен
+    query = SearchQuery(" & ".join(f"'{word}':*" for word in words), search_type="raw", config=SEARCH_CONFIG)
+    condition = Q(search_vector=query)
+    if extra is not None:
+        condition |= extra
+    rank = SearchRank(F("search_vector"), query)
+    if trigram_available(queryset.db):
+        condition |= Q(name__trigram_word_similar=text)
+        rank = rank + TrigramWordSimilarity(text, "name")
+    return queryset.filter(condition).annotate(search_rank=rank).order_by("-search_rank", "-created_at", "-uuid")
+
+
+class TaskSearchFilter(BaseFilterBackend):
+    """`?q=` - поиск по названию и описанию задач (search_tasks)"""
+    search_param = "q"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        return search_tasks(queryset, text) if text else queryset
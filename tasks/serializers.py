@@ -1,7 +1,10 @@
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 from django.utils import timezone
 
-from .models import Task
+from .models import OPEN_STATUSES, Task
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -9,7 +12,7 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = "__all__"
+        exclude = ["change_xid", "search_vector"]  # Служебные поля синхронизации и поиска
         read_only_fields = ["uuid", "owner", "created_at"]
 
     def validate(self, data):
@@ -27,3 +30,151 @@ class TaskSerializer(serializers.ModelSerializer):
             })
 
         return data
+
+
+class TaskBulkListSerializer(serializers.ListSerializer):
+    """
+    Массовое создание задач.
+
+    Исполнители всех элементов проверяются одним запросом (заодно читаются их chat id
+    для уведомлений), а задачи вставляются через bulk_create.
+    """
+
+    def to_internal_value(self, data):
+        # Проверка здесь, а не в validate(), чтобы ошибки остались привязаны к элементам списка
+        attrs = super().to_internal_value(data)
+        assignee_ids = {item["assignee_id"] for item in attrs if item.get("assignee_id") is not None}
+        self.assignee_chat_ids = dict(
+            get_user_model().objects.filter(pk__in=assignee_ids).values_list("pk", "telegram_chat_id")
+        )
+
+        missing = assignee_ids - self.assignee_chat_ids.keys()
+        if missing:
+            raise serializers.ValidationError([
+                {"assignee": [f"Пользователь {item['assignee_id']} не найден"]}
+                if item.get("assignee_id") in missing else {}
+                for item in attrs
+            ])
+        return attrs
+
+    def create(self, validated_data):
+        return Task.objects.bulk_create([Task(**item) for item in validated_data], batch_size=1000)
+
+
+class TaskBulkSerializer(TaskSerializer):
+    """Элемент массового создания: исполнитель передается id и проверяется сразу для всего списка"""
+    assignee = serializers.IntegerField(source="assignee_id", required=False, allow_null=True)
+
+    class Meta(TaskSerializer.Meta):
+        list_serializer_class = TaskBulkListSerializer
+
+
+class ValuesSerializer:
+    """
+    Быстрый вывод списков: строки из QuerySet.values() переводятся в тот же вывод,
+    что дает serializer_class, без объектов моделей и обхода полей DRF на каждую строку.
+
+    Для каждого поля сериализатора заранее выбирается lookup (`owner.email` ->
+    `owner__email`, то есть join вместо ленивой загрузки) и функция преобразования.
+    Поля, для которых нет быстрого преобразования, используют свой to_representation,
+    поэтому вывод совпадает с обычным сериализатором побайтно.
+    """
+
+    # Поля, значения которых из базы уже совпадают с выводом DRF
+    passthrough_fields = (
+        serializers.CharField,  # В том числе EmailField
+        serializers.ChoiceField,
+        serializers.IntegerField,
+        serializers.BooleanField,
+        serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, serializer_class, context=None):
+        self.fields = [
+            (name, "__".join(field.source_attrs), field)
+            for name, field in serializer_class(context=context).fields.items()
+            if not field.write_only
+        ]
+
+    def values(self, queryset):
+        return queryset.values(*[lookup for _, lookup, _ in self.fields])
+
+    def to_representation(self, rows):
+        return list(self.iter_representation(rows))
+
+    def iter_representation(self, rows):
+        """Ленивый вариант to_representation для потоковой выдачи"""
+        converters = [(name, lookup, self._converter(field)) for name, lookup, field in self.fields]
+        for row in rows:
+            yield {
+                name: None if row[lookup] is None else convert(row[lookup]) if convert else row[lookup]
+                for name, lookup, convert in converters
+            }
+
+    def _converter(self, field):
+        """Функция преобразования значения или None, если значение выводится как есть"""
+        if isinstance(field, serializers.ChoiceField) and field.choices:
+            return None if all(str(key) == key for key in field.choices) else field.to_representation
+        if isinstance(field, self.passthrough_fields):
+            return None
+        if isinstance(field, serializers.UUIDField) and field.uuid_format == "hex_verbose":
+            return str
+        if isinstance(field, serializers.DateTimeField):
+            return self._datetime_converter(field)
+        return field.to_representation
+
+    @staticmethod
+    def _datetime_converter(field):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+            return field.to_representation
+
+        # То же, что DateTimeField.to_representation для ISO 8601, но с часовым поясом,
+        # определенным один раз на страницу
+        def convert(value):
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+        return convert
+
+
+class TaskFilterSerializer(serializers.Serializer):
+    """
+    Параметры фильтрации списка задач (tasks/filters.py).
+
+    `status` можно передать несколько раз; диапазоны дат полуоткрытые: `*_from`
+    включительно, `*_to` - нет. `overdue` - незакрытые задачи с прошедшим сроком.
+    """
+    status = serializers.ListField(child=serializers.ChoiceField(choices=Task.CHOICES_STATUS), required=False)
+    assignee = serializers.IntegerField(required=False)
+    created_from = serializers.DateTimeField(required=False)
+    created_to = serializers.DateTimeField(required=False)
+    end_from = serializers.DateTimeField(required=False)
+    end_to = serializers.DateTimeField(required=False)
+    overdue = serializers.BooleanField(required=False, allow_null=True)
+
+    lookups = {
+        "status": "status__in",
+        "assignee": "assignee_id",
+        "created_from": "created_at__gte",
+        "created_to": "created_at__lt",
+        "end_from": "end_date__gte",
+        "end_to": "end_date__lt",
+    }
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        queryset = queryset.filter(**{
+            lookup: data[name] for name, lookup in self.lookups.items() if data.get(name) is not None
+        })
+        if data.get("overdue") is not None:
+            # Условие совпадает с частичным индексом tasks_owner_open_due_idx
+            overdue = Q(status__in=OPEN_STATUSES, end_date__lt=timezone.now())
+            queryset = queryset.filter(overdue if data["overdue"] else ~overdue)
+        return queryset
+
+
+class TaskExportFilterSerializer(TaskFilterSerializer):
+    """Параметры /task/export/: формат выгрузки и фильтры списка задач"""
+    output = serializers.ChoiceField(choices=["ndjson", "csv"], default="ndjson")
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.utils import timezone
+
+from users.cache import get_user_id_by_chat_id
+
+from .cache import invalidate_assignee_cache, invalidate_owner_cache
+from .models import OPEN_STATUSES, Task
+
+# Переход меняет задачу одним запросом: условие по статусу и участнику стоит в WHERE,
+# поэтому два одновременных нажатия не перезапишут друг друга, а второе просто не найдет строку.
+# Chat id обоих участников и email исполнителя возвращаются тем же запросом.
+TRANSITION_SQL = """
+WITH updated AS (
+    UPDATE {tasks} AS t SET {assignments}
+    WHERE t.uuid = %s AND t.{role}_id = %s AND t.status IN ({statuses})
+    RETURNING t.*
+)
+SELECT updated.*,
+       owner.telegram_chat_id AS owner_chat_id,
+       assignee.telegram_chat_id AS assignee_chat_id,
+       assignee.email AS assignee_email
+FROM updated
+LEFT JOIN {users} AS owner ON owner.id = updated.owner_id
+LEFT JOIN {users} AS assignee ON assignee.id = updated.assignee_id
+"""
+
+# Действие бота: кто его выполняет, из каких статусов и в какой статус переводит задачу
+TRANSITIONS = {
+    'accept': ('assignee', ('NEW',), 'WORK'),
+    'reject': ('owner', OPEN_STATUSES, 'REJECTED'),
+    'review': ('assignee', ('WORK',), 'REVIEW'),
+    'proof': ('assignee', ('REVIEW',), 'REVIEW'),
+    'done': ('owner', ('REVIEW',), 'DONE'),
+}
+
+
+def transition_task(action, task_uuid, chat_id, **fields):
+    """
+    Выполняет действие бота над задачей одним UPDATE ... RETURNING.
+
+    fields - дополнительные поля задачи для записи (например, доказательство выполнения).
+    Возвращает обновленную задачу с атрибутами owner_chat_id, assignee_chat_id и
+    assignee_email или None, если задачи нет, статус не подходит или у chat_id нет прав.
+    """
+    role, from_statuses, to_status = TRANSITIONS[action]
+    # Пользователь берется из кэша, и задача фильтруется по owner_id/assignee_id без join
+    user_id = get_user_id_by_chat_id(chat_id)
+    if user_id is None:
+        return None
+
+    quote = connection.ops.quote_name
+    values = {'status': to_status, 'updated_at': timezone.now(), **fields}
+    assignments = ', '.join(f'{quote(Task._meta.get_field(name).column)} = %s' for name in values)
+
+    sql = TRANSITION_SQL.format(
+        tasks=quote(Task._meta.db_table),
+        users=quote(Task._meta.get_field('owner').related_model._meta.db_table),
+        assignments=assignments,
+        role=role,
+        statuses=', '.join(['%s'] * len(from_statuses)),
+    )
+    params = [*values.values(), str(task_uuid), user_id, *from_statuses]
+    task = next(iter(Task.objects.raw(sql, params)), None)
+    if task is not None:
+        invalidate_owner_cache(task.owner_id)
+        invalidate_assignee_cache(task.assignee_id)
+    return task
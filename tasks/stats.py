@@ -0,0 +1,80 @@
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import OPEN_STATUSES, Task, TaskStats
+
+# Счетчики по задачам; используется командой rebuild_task_stats
+EXPECTED_STATS_SQL = """
+SELECT owner_id, status, count(*) AS count,
+       min(end_date) FILTER (WHERE status IN ('NEW', 'WORK', 'REVIEW')) AS next_end_date
+FROM tasks
+WHERE %(owner_id)s::bigint IS NULL OR owner_id = %(owner_id)s::bigint
+GROUP BY owner_id, status
+"""
+
+
+def get_owner_stats(owner_id):
+    """
+    Сводка по задачам владельца из task_stats: не более одной строки на статус.
+
+    Просрочка зависит от текущего времени, а не от изменений задач, поэтому в task_stats
+    не хранится. Если ближайший срок незакрытых задач еще не наступил, просроченных нет;
+    иначе они считаются по частичному индексу tasks_owner_open_due_idx, и запрос
+    проходит только по самим просроченным задачам.
+    """
+    by_status = {status: 0 for status, _ in Task.CHOICES_STATUS}
+    next_end_date = None
+    for status, count, status_next_end_date in TaskStats.objects.filter(owner_id=owner_id).values_list(
+        "status", "count", "next_end_date"
+    ):
+        by_status[status] = count
+        if status_next_end_date is not None and (next_end_date is None or status_next_end_date < next_end_date):
+            next_end_date = status_next_end_date
+
+    now = timezone.now()
+    overdue = 0
+    if next_end_date is not None and next_end_date < now:
+        overdue = Task.objects.filter(owner_id=owner_id, status__in=OPEN_STATUSES, end_date__lt=now).count()
+
+    return {
+        "total": sum(by_status.values()),
+        "open": sum(by_status[status] for status in OPEN_STATUSES),
+        "overdue": overdue,
+        "next_end_date": next_end_date,
+        "by_status": by_status,
+    }
+
+
+def get_assignee_stats(assignee_id):
+    """
+    Та же сводка для задач исполнителя.
+
+    task_stats ведется по владельцам, поэтому здесь группировка по индексу
+    tasks_assignee_status_due_idx (assignee, status, end_date): index-only scan по задачам
+    исполнителя без чтения таблицы, одним запросом.
+    """
+    now = timezone.now()
+    rows = (
+        Task.objects.filter(assignee_id=assignee_id).order_by().values("status")
+        .annotate(
+            count=Count("*"),
+            next_end_date=Min("end_date", filter=Q(status__in=OPEN_STATUSES)),
+            overdue=Count("end_date", filter=Q(status__in=OPEN_STATUSES, end_date__lt=now)),
+        )
+    )
+    by_status = {status: 0 for status, _ in Task.CHOICES_STATUS}
+    next_end_dates = []
+    overdue = 0
+    for row in rows:
+        by_status[row["status"]] = row["count"]
+        overdue += row["overdue"]
+        if row["next_end_date"] is not None:
+            next_end_dates.append(row["next_end_date"])
+
+    return {
+        "total": sum(by_status.values()),
+        "open": sum(by_status[status] for status in OPEN_STATUSES),
+        "overdue": overdue,
+        "next_end_date": min(next_end_dates, default=None),
+        "by_status": by_status,
+    }
@@ -0,0 +1,106 @@
+from uuid import UUID
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Task
+
+# Изменения упорядочены по номеру транзакции (change_xid) и uuid. Номер последовательности,
+# выданный при записи, для этого не годится: транзакции фиксируются не в порядке номеров, и
+# клиент, уже получивший номер 10, пропустил бы номер 9 из более долгой транзакции. Вместо
+# этого раунд синхронизации запоминает xmin своего снимка - все транзакции с меньшим номером
+# уже завершены - и следующий раунд читает изменения начиная с него. Часть строк может прийти
+# повторно, но ни одна не теряется.
+#
+# Снимок и выборка берутся одним запросом: актуальный клиент стоит одного обращения к базе
+# (по индексу tasks_owner_change_idx и task_tombstones_owner_idx).
+CHANGES_SQL = """
+SELECT snapshot.xmin, changes.uuid, changes.change_xid, changes.deleted
+FROM (SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint AS xmin) AS snapshot
+LEFT JOIN LATERAL (
+    (
+        SELECT uuid, change_xid, false AS deleted FROM tasks
+        WHERE owner_id = %(owner_id)s AND change_xid >= %(low)s
+          AND (change_xid, uuid) > (%(after_xid)s, %(after_uuid)s)
+        ORDER BY change_xid, uuid
+        LIMIT %(limit)s
+    )
+    UNION ALL
+    (
+        SELECT task_uuid, change_xid, true FROM task_tombstones
+        WHERE %(with_deleted)s AND owner_id = %(owner_id)s AND change_xid >= %(low)s
+          AND (change_xid, task_uuid) > (%(after_xid)s, %(after_uuid)s)
+        ORDER BY change_xid, task_uuid
+        LIMIT %(limit)s
+    )
+    ORDER BY change_xid, uuid
+    LIMIT %(limit)s
+) AS changes ON true
+"""
+
+TOKEN_SALT = "tasks.sync"
+MIN_UUID = UUID(int=0)
+
+
+class SyncTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Токен синхронизации устарел, выполните полную синхронизацию без token."
+    default_code = "sync_token_expired"
+
+
+def get_changes(owner_id, token=None, limit=None):
+    """
+    Изменения задач владельца после token.
+
+    Возвращает (задачи, uuid удаленных задач, новый токен, есть ли еще изменения).
+    Без token отдаются все задачи владельца. Пока есть еще изменения, новый токен
+    продолжает текущий раунд с места остановки.
+    """
+    limit = limit or settings.TASK_SYNC["PAGE_SIZE"]
+    state = _read_token(token) if token else {"low": 0, "xmin": None, "after": None}
+    after_xid, after_uuid = state["after"] or (-1, str(MIN_UUID))
+
+    with connection.cursor() as cursor:
+        cursor.execute(CHANGES_SQL, {
+            "owner_id": owner_id,
+            "low": state["low"],
+            "after_xid": after_xid,
+            "after_uuid": after_uuid,
+            # При первой синхронизации у клиента нечего удалять
+            "with_deleted": state["low"] > 0,
+            "limit": limit + 1,
+        })
+        rows = cursor.fetchall()
+
+    # xmin фиксируется в начале раунда и переносится через все его страницы
+    xmin = state["xmin"] if state["xmin"] is not None else rows[0][0]
+    changes = [(UUID(str(uuid)), change_xid, deleted) for _, uuid, change_xid, deleted in rows if uuid is not None]
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    changed_uuids = [uuid for uuid, _, deleted in changes if not deleted]
+    deleted = [str(uuid) for uuid, _, is_deleted in changes if is_deleted]
+    tasks = Task.objects.filter(owner_id=owner_id, uuid__in=changed_uuids).select_related("owner")
+    # Задача, удаленная между запросами, придет в следующем раунде как удаленная
+    order = {uuid: position for position, uuid in enumerate(changed_uuids)}
+    tasks = sorted(tasks, key=lambda task: order[task.uuid]) if changed_uuids else []
+
+    if has_more:
+        last_uuid, last_xid, _ = changes[-1]
+        next_state = {"low": state["low"], "xmin": xmin, "after": [last_xid, str(last_uuid)]}
+    else:
+        next_state = {"low": xmin, "xmin": None, "after": None}
+    return tasks, deleted, signing.dumps(next_state, salt=TOKEN_SALT), has_more
+
+
+def _read_token(token):
+    max_age = settings.TASK_SYNC["TOKEN_MAX_AGE"]
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=max_age)
+    except signing.SignatureExpired:
+        raise SyncTokenExpired()
+    except signing.BadSignature:
+        raise ValidationError({"token": "Некорректный токен синхронизации."})
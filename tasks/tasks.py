@@ -1,43 +1,160 @@
+import logging
+import random
+import time
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ParseMode
-from .models import Task
+from telegram.error import BadRequest, ChatMigrated, Forbidden, InvalidToken, RetryAfter
 
+from .dispatcher import dispatcher
+from .models import NotificationDeadLetter
+from .outbox import drain_batch
+from .ratelimit import get_rate_limiter
+from .reminders import send_due_reminders
 
-async def send_telegram_notification(task_uuid, owner_id, assignee_id, message_lines_owner, message_lines_assignee):
-    try:
-        # Импортируем бота только когда нужно
-        from .telegram_bot import bot
+logger = logging.getLogger(__name__)
+
+# Ошибки, которые не исправятся повторной отправкой
+PERMANENT_ERRORS = (BadRequest, Forbidden, InvalidToken, ChatMigrated)
+
+# Отметка о доставке сообщения с dedup_key
+SENT_KEY = "telegram:sent:{}"
 
+
+def new_task_messages(task_uuid, owner_id, assignee_id, message_lines_owner, message_lines_assignee):
+    """Сообщения о новой задаче [(dedup_key, chat_id, text, payload), ...] для add_notifications"""
+    messages = []
+    if assignee_id:
         # Создаем клавиатуру с кнопками
         keyboard = [
             [InlineKeyboardButton("✅ Принять", callback_data=f"accept_{task_uuid}")],
             [InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{task_uuid}")],
         ]
+        messages.append((
+            f"task:{task_uuid}:assignee",
+            assignee_id,
+            "\n".join(message_lines_assignee),
+            {"reply_markup": InlineKeyboardMarkup(keyboard).to_dict()},
+        ))
+
+    if owner_id:
+        messages.append((f"task:{task_uuid}:owner", owner_id, "\n".join(message_lines_owner), {}))
+    return messages
+
+
+@shared_task(ignore_result=True)
+def send_task_reminders():
+    """Напоминания о приближающихся сроках задач; запускает celery beat (CELERY_BEAT_SCHEDULE)"""
+    if send_due_reminders():
+        schedule_outbox_drain()
+
+
+@shared_task(ignore_result=True)
+def drain_notification_outbox():
+    """
+    Передает уведомления из outbox в send_telegram_message пачками по NOTIFICATION_OUTBOX['BATCH_SIZE'].
+
+    Ставится после коммита записавшей уведомления транзакции и периодически запускается
+    celery beat - на случай, если процесс упал раньше. Обработчиков может быть несколько.
+    """
+    options = settings.NOTIFICATION_OUTBOX
+    while drain_batch(_send_outbox_row, options["BATCH_SIZE"], options["COALESCE_WINDOW"]) == options["BATCH_SIZE"]:
+        pass
+
+
+def schedule_outbox_drain():
+    """Ставит разбор outbox; в режиме дайджестов - на момент, когда истечет окно объединения"""
+    drain_notification_outbox.apply_async(countdown=settings.NOTIFICATION_OUTBOX["COALESCE_WINDOW"])
+
+
+def _send_outbox_row(row):
+    send_telegram_message.delay(row.chat_id, row.text, dedup_key=row.dedup_key, **row.payload)
+
+
+@shared_task(bind=True, acks_late=True, ignore_result=True, max_retries=None)
+def send_telegram_message(
+    self, chat_id, text, parse_mode=ParseMode.MARKDOWN, reply_markup=None, attempt=1, dedup_key=None
+):
+    """
+    Отправляет одно сообщение в рамках лимитов Telegram.
+
+    Сообщение с dedup_key, уже доставленное за последние NOTIFICATION_OUTBOX['DEDUP_TTL']
+    секунд (например, повторно переданное из outbox), не отправляется.
+
+    Ожидание токена откладывает задачу без расхода попыток. RetryAfter приостанавливает
+    отправку для всех чатов. Сетевые ошибки повторяются с экспоненциальной задержкой,
+    а после TELEGRAM_DELIVERY['MAX_ATTEMPTS'] попыток и при постоянных ошибках
+    сообщение сохраняется в NotificationDeadLetter.
+    """
+    options = settings.TELEGRAM_DELIVERY
+    sent_key = SENT_KEY.format(dedup_key) if dedup_key else None
+    if sent_key and cache.get(sent_key):
+        return
+    limiter = get_rate_limiter()
+
+    wait = limiter.acquire(chat_id)
+    # Короткое ожидание дешевле, чем возвращать задачу в брокер
+    while 0 < wait <= options["MAX_INLINE_WAIT"]:
+        time.sleep(wait)
+        wait = limiter.acquire(chat_id)
+    if wait:
+        raise self.retry(countdown=wait)
+
+    try:
+        dispatcher.call(_send_message, chat_id, text, parse_mode, reply_markup)
+    except RetryAfter as exc:
+        retry_after = _seconds(exc.retry_after)
+        limiter.block(retry_after)
+        raise self.retry(exc=exc, countdown=retry_after)
+    except PERMANENT_ERRORS as exc:
+        _dead_letter(chat_id, text, parse_mode, reply_markup, exc, attempt)
+    except Exception as exc:
+        if attempt >= options["MAX_ATTEMPTS"]:
+            _dead_letter(chat_id, text, parse_mode, reply_markup, exc, attempt)
+            return
+        raise self.retry(
+            exc=exc,
+            countdown=_backoff(attempt, options["BACKOFF_BASE"], options["BACKOFF_MAX"]),
+            args=(),
+            kwargs={
+                "chat_id": chat_id,
+                "text": text,
+                "parse_mode": parse_mode,
+                "reply_markup": reply_markup,
+                "attempt": attempt + 1,
+                "dedup_key": dedup_key,
+            },
+        )
+    else:
+        if sent_key:
+            cache.set(sent_key, True, settings.NOTIFICATION_OUTBOX["DEDUP_TTL"])
+
+
+async def _send_message(chat_id, text, parse_mode, reply_markup, bot):
+    markup = InlineKeyboardMarkup.de_json(reply_markup, bot) if reply_markup else None
+    await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode, reply_markup=markup)
+
+
+def _dead_letter(chat_id, text, parse_mode, reply_markup, exc, attempts):
+    logger.error("[Telegram] Уведомление в чат %s не доставлено после %s попыток: %s", chat_id, attempts, exc)
+    NotificationDeadLetter.objects.create(
+        chat_id=chat_id,
+        text=text,
+        payload={"parse_mode": parse_mode, "reply_markup": reply_markup},
+        error=str(exc),
+        attempts=attempts,
+    )
+
+
+def _backoff(attempt, base, maximum):
+    """Экспоненциальная задержка с разбросом, чтобы повторы не приходили пачкой"""
+    delay = min(maximum, base ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
 
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        message_owner= "\n".join(message_lines_owner)
-
-        if assignee_id:
-            message_assignee = "\n".join(message_lines_assignee)
-            await bot.send_message(
-                chat_id=assignee_id,
-                text=message_assignee,
-                parse_mode=ParseMode.MARKDOWN,
-                reply_markup=reply_markup
-            )
-
-            await bot.send_message(
-                chat_id=owner_id,
-                text=message_owner,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        else:
-            await bot.send_message(
-                chat_id=owner_id,
-                text=message_owner,
-                parse_mode=ParseMode.MARKDOWN
-            )
-
-    except Exception as e:
-        print(f"[Telegram] ОШИБКА: {str(e)}")
\ No newline at end of file
+def _seconds(value):
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
@@ -6,11 +6,22 @@ import asyncio
 from telegram.constants import ParseMode
 from telegram.ext import MessageHandler, filters
 from .models import Task
+from .persistence import build_persistence, save_user_data
+from .services import transition_task
+from .telegram_http import build_request
 from asgiref.sync import sync_to_async
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-# Инициализация бота
-application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+# Инициализация бота. Состояние сценариев (context.user_data) хранится вне процесса,
+# поэтому обновления может обрабатывать любой из процессов бота
+application = (
+    Application.builder().token(settings.TELEGRAM_BOT_TOKEN).persistence(build_persistence())
+    .base_url(settings.TELEGRAM_HTTP["BASE_URL"])
+    .request(build_request("bot", settings.TELEGRAM_HTTP["BOT_POOL_SIZE"]))
+    # getUpdates - long polling, держит соединение до ответа; отдельно от пула обработчиков
+    .get_updates_request(build_request("updates", 1))
+    .build()
+)
 # Получение доступа для прямых вызовов API Telegram.
 bot = application.bot
 
@@ -107,22 +118,8 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     # Кнопка - [Принять]
     if callback_data.startswith('accept_'):
         task_uuid = callback_data.replace('accept_', '')
-        try:
-            # Получаем задачу асинхронно
-            task = await sync_to_async(Task.objects.get)(uuid=task_uuid)
-
-            # Асинхронно получаем данные владельца и исполнителя
-            owner_id = await sync_to_async(_get_owner_chat_id)(task)
-            assignee_id = await sync_to_async(_get_assignee_chat_id)(task)
-
-            # Проверяем права: тот ли пользователь нажал кнопку?
-            if str(user_id) == str(assignee_id):
-                await handle_task_accepted(user_id, owner_id, task_uuid, query)
-            else:
-                await query.edit_message_text("❌ У вас нет прав для этого действия")
-
-        except Task.DoesNotExist:
-            await query.edit_message_text("❌ Задача не найдена")
+        # Права (нажал ли кнопку исполнитель) проверяются в том же запросе, что меняет статус
+        await handle_task_accepted(user_id, task_uuid, query)
 
     # Кнопка - [Отклонить]
     elif callback_data.startswith('reject_'):
@@ -145,22 +142,41 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     #     await handle_task_reject_completion_request(user_id, task_uuid, query)
 
 
-async def handle_task_accepted(user_id, owner_id, task_uuid, query):
+async def edit_task_message(query, task_uuid, **kwargs):
+    """
+    Ответ на нажатие кнопки задачи task_uuid: заменяет текст сообщения с кнопкой.
+
+    В дайджесте (tasks/outbox.py) кнопки нескольких задач, поэтому из него убираются только
+    кнопки этой задачи, а ответ приходит отдельным сообщением.
+    """
+    markup = query.message.reply_markup if query.message else None
+    keyboard = markup.inline_keyboard if markup else ()
+    other_tasks = [
+        [button for button in row if not str(button.callback_data).endswith(task_uuid)] for row in keyboard
+    ]
+    other_tasks = [row for row in other_tasks if row]
+    if not other_tasks:
+        await query.edit_message_text(**kwargs)
+        return
+
+    await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(other_tasks))
+    await query.message.reply_text(**kwargs)
+
+
+async def handle_task_accepted(user_id, task_uuid, query):
     try:
-        # Получаем задачу и данные
-        task = await sync_to_async(Task.objects.get)(uuid=task_uuid)
         assignee_name = query.from_user.first_name  # Имя исполнителя
         assignee_last_name = query.from_user.last_name  # Фамилия исполнителя
 
-        # Меняем статус задачи
-        success = await sync_to_async(_sync_handle_task_accepted)(user_id, task_uuid)
+        # Меняем статус задачи и получаем ее данные одним запросом
+        task = await sync_to_async(_sync_handle_task_accepted)(user_id, task_uuid)
 
         completion_keyboard = [
-            [InlineKeyboardButton("✅ Завершить задачу", callback_data=f"complete_{task.uuid}")]
+            [InlineKeyboardButton("✅ Завершить задачу", callback_data=f"complete_{task_uuid}")]
         ]
         completion_markup = InlineKeyboardMarkup(completion_keyboard)
 
-        if success:
+        if task:
             assignee_message = "\n".join([
                 f"✅ Вы приняли задачу \"{task.name}\"",
                 "",
@@ -175,7 +191,8 @@ async def handle_task_accepted(user_id, owner_id, task_uuid, query):
 
 
             # 1. Обновляем сообщение исполнителю
-            await query.edit_message_text(
+            await edit_task_message(
+                query, task_uuid,
                 text=assignee_message,
                 parse_mode=ParseMode.MARKDOWN,
                 reply_markup=completion_markup
@@ -194,22 +211,23 @@ async def handle_task_accepted(user_id, owner_id, task_uuid, query):
                 f"⏰ *Срок:* до {task.end_date.strftime('%d.%m.%Y в %H:%M')}"
             )
 
-            await bot.send_message(
-                chat_id=owner_id,
-                text=owner_message,
-                parse_mode=ParseMode.MARKDOWN
-            )
+            if task.owner_chat_id:
+                await bot.send_message(
+                    chat_id=task.owner_chat_id,
+                    text=owner_message,
+                    parse_mode=ParseMode.MARKDOWN
+                )
 
         else:
-            await query.edit_message_text(
+            await edit_task_message(
+                query, task_uuid,
                 text="❌ Задача не найдена или у вас нет прав",
                 reply_markup=completion_markup
             )
 
-    except Task.DoesNotExist:
-        await query.edit_message_text("❌ Задача не найдена")
     except Exception as e:
-        await query.edit_message_text(
+        await edit_task_message(
+            query, task_uuid,
             text=f"❌ Ошибка: {str(e)}",
             reply_markup=None
         )
@@ -220,19 +238,22 @@ async def handle_task_rejection(user_id, task_uuid, query):
         success = await sync_to_async(_sync_handle_task_rejection)(user_id, task_uuid)
 
         if success:
-            await query.edit_message_text(
+            await edit_task_message(
+                query, task_uuid,
                 text=f"❌ Задача {task_uuid} отклонена",
                 parse_mode=ParseMode.MARKDOWN,
                 reply_markup=None
             )
         else:
-            await query.edit_message_text(
+            await edit_task_message(
+                query, task_uuid,
                 text="❌ Задача не найдена или у вас нет прав для её отклонения",
                 reply_markup=None
             )
 
     except Exception as e:
-        await query.edit_message_text(
+        await edit_task_message(
+            query, task_uuid,
             text=f"❌ Произошла ошибка при обработке запроса: {str(e)}",
             reply_markup=None
         )
@@ -246,6 +267,8 @@ async def handle_task_completion_request(user_id, task_uuid, query, context):
         if success:
             # Сохраняем task_uuid в context для последующей обработки
             context.user_data['completing_task'] = task_uuid
+            # Доказательство может прийти сразу и в другой процесс бота
+            await save_user_data(context.application, user_id, context.user_data)
 
             await query.edit_message_text(
                 text="📨 *Отправьте доказательство выполнения*\n\n"
@@ -279,11 +302,12 @@ async def handle_task_approve_request(user_id, task_uuid, query):
             )
 
             # Уведомляем исполнителя
-            await bot.send_message(
-                chat_id=task.assignee.telegram_chat_id,
-                text=f"🎉 Ваша задача \"{task.name}\" утверждена владельцем!",
-                parse_mode=ParseMode.MARKDOWN
-            )
+            if task.assignee_chat_id:
+                await bot.send_message(
+                    chat_id=task.assignee_chat_id,
+                    text=f"🎉 Ваша задача \"{task.name}\" утверждена владельцем!",
+                    parse_mode=ParseMode.MARKDOWN
+                )
         else:
             await query.edit_message_text(
                 text="❌ Данная задача больше не существует!",
@@ -300,25 +324,22 @@ async def handle_task_approve_request(user_id, task_uuid, query):
 async def process_completion_proof(update, context, user_id, task_uuid, **kwargs):
     """Общая функция обработки доказательств выполнения"""
     try:
-        task = await sync_to_async(Task.objects.select_related('owner', 'assignee').get)(
-            uuid=task_uuid,
-            assignee__telegram_chat_id=str(user_id),
-            status='REVIEW'
-        )
-
         # Сохраняем доказательство в базу
         if kwargs.get('text'):
-            task.completion_proof = kwargs['text']
+            proof = {'completion_proof': kwargs['text']}
         elif kwargs.get('file_id'):
-            task.completion_file_id = kwargs['file_id']
-            task.completion_media_type = kwargs['media_type']
+            proof = {'completion_file_id': kwargs['file_id'], 'completion_media_type': kwargs['media_type']}
+        else:
+            proof = {}
 
-        task.completed_at = timezone.now()
-        task.status = 'REVIEW'  # Статус "На проверке"
-        await sync_to_async(task.save)()
+        # Задача остается в статусе "На проверке"
+        task = await sync_to_async(_sync_save_completion_proof)(user_id, task_uuid, proof)
+        if task is None:
+            raise Task.DoesNotExist
 
         # Очищаем контекст
         context.user_data.pop('completing_task', None)
+        await save_user_data(context.application, user_id, context.user_data)
 
         # Уведомляем исполнителя
         await update.message.reply_text(
@@ -332,6 +353,7 @@ async def process_completion_proof(update, context, user_id, task_uuid, **kwargs
     except Task.DoesNotExist:
         await update.message.reply_text("❌ Задача не найдена")
         context.user_data.pop('completing_task', None)
+        await save_user_data(context.application, user_id, context.user_data)
 
 
 async def notify_owner_about_completion(task, **kwargs):
@@ -340,7 +362,7 @@ async def notify_owner_about_completion(task, **kwargs):
         f"🎉 *Задача выполнена!*\n\n",
         f"📋 *Задача:* {task.name}",
         f"🆔 *ID:* `{task.uuid}`",
-        f"👤 *Исполнитель:* {task.assignee.email}",
+        f"👤 *Исполнитель:* {task.assignee_email}",
         f"⏰ *Срок:* до {task.end_date.strftime('%d.%m.%Y в %H:%M')}",
         f"",
         f"📨 *Доказательство выполнения:*"
@@ -351,7 +373,7 @@ async def notify_owner_about_completion(task, **kwargs):
 
     # Отправляем основное сообщение
     await bot.send_message(
-        chat_id=task.owner.telegram_chat_id,
+        chat_id=task.owner_chat_id,
         text="\n".join(owner_message),
         parse_mode=ParseMode.MARKDOWN
     )
@@ -363,19 +385,19 @@ async def notify_owner_about_completion(task, **kwargs):
 
         if media_type == 'photo':
             await bot.send_photo(
-                chat_id=task.owner.telegram_chat_id,
+                chat_id=task.owner_chat_id,
                 photo=file_id,
                 caption="📷 Фото доказательство"
             )
         elif media_type == 'video':
             await bot.send_video(
-                chat_id=task.owner.telegram_chat_id,
+                chat_id=task.owner_chat_id,
                 video=file_id,
                 caption="🎥 Видео доказательство"
             )
         elif media_type == 'document':
             await bot.send_document(
-                chat_id=task.owner.telegram_chat_id,
+                chat_id=task.owner_chat_id,
                 document=file_id,
                 caption=f"📄 Документ: {kwargs.get('file_name', '')}"
             )
@@ -388,7 +410,7 @@ async def notify_owner_about_completion(task, **kwargs):
     review_markup = InlineKeyboardMarkup(review_keyboard)
 
     await bot.send_message(
-        chat_id=task.owner.telegram_chat_id,
+        chat_id=task.owner_chat_id,
         text="Проверьте доказательство и выберите действие:",
         reply_markup=review_markup,
         parse_mode=ParseMode.MARKDOWN
@@ -398,63 +420,28 @@ async def notify_owner_about_completion(task, **kwargs):
 # Синхронные функции для работы с ORM
 #_______________________________________________________________________________________________________________________
 def _sync_handle_task_accepted(user_id, task_uuid):
-    """Синхронная обработка принятия задачи"""
-    try:
-        task = Task.objects.get(uuid=task_uuid, assignee__telegram_chat_id=user_id)
-        task.status = 'WORK'  # Меняем статус на "В работе"
-        task.save()
-        return True
-    except Task.DoesNotExist:
-        return False
+    """Синхронная обработка принятия задачи: "Новая" -> "В работе" """
+    return transition_task('accept', task_uuid, user_id)
 
 
 def _sync_handle_task_rejection(user_id, task_uuid):
     """Синхронная обработка отклонения задачи"""
-    try:
-        task = Task.objects.get(uuid=task_uuid, owner__telegram_chat_id=user_id)
-        task.status = 'REJECTED'
-        task.save()
-        return True
-    except Task.DoesNotExist:
-        return False
+    return transition_task('reject', task_uuid, user_id)
 
 
 def _sync_handle_task_review(user_id, task_uuid):
-    """Синхронная обработка задачи на проверке"""
-    try:
-        task = Task.objects.get(uuid=task_uuid, assignee__telegram_chat_id=user_id, status='WORK')
-        task.status = 'REVIEW'  # Меняем статус на "На проверке"
-        task.save()
-        return True
-    except Task.DoesNotExist:
-        return False
+    """Синхронная обработка задачи на проверке: "В работе" -> "На проверке" """
+    return transition_task('review', task_uuid, user_id)
 
 
 def _sync_handle_task_done(user_id, task_uuid):
-    """Синхронная обработка утверждения задачи"""
-    try:
-        # Используем select_related, чтобы избежать дополнительных запросов
-        task = Task.objects.select_related('assignee').get(
-            uuid=task_uuid,
-            owner__telegram_chat_id=user_id,
-            status='REVIEW'
-        )
-        task.status = 'DONE'  # Меняем статус на "Выполнена"
-        task.save()
-        return task
-    except Task.DoesNotExist:
-        return False
-
-
-# Вспомогательные синхронные функции для получения telegram_chat_id
-def _get_owner_chat_id(task):
-    """Синхронная функция для получения chat_id владельца"""
-    return task.owner.telegram_chat_id if task.owner else None
+    """Синхронная обработка утверждения задачи: "На проверке" -> "Выполнена" """
+    return transition_task('done', task_uuid, user_id)
 
 
-def _get_assignee_chat_id(task):
-    """Синхронная функция для получения chat_id исполнителя"""
-    return task.assignee.telegram_chat_id if task.assignee else None
+def _sync_save_completion_proof(user_id, task_uuid, proof):
+    """Синхронное сохранение доказательства выполнения для задачи на проверке"""
+    return transition_task('proof', task_uuid, user_id, completed_at=timezone.now(), **proof)
 #_______________________________________________________________________________________________________________________
 
 
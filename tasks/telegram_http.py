@@ -0,0 +1,158 @@
+import asyncio
+import importlib.util
+import logging
+import time
+
+import httpx
+from django.conf import settings
+from telegram import Bot
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Статистика пулов процесса по имени (build_request); читается и из других потоков
+pool_stats = {}
+
+
+class PoolStats:
+    """
+    Занятость пула соединений к Bot API и ожидание свободного соединения.
+
+    Счетчики с начала работы процесса, кроме пиковой занятости и максимального ожидания -
+    они за интервал с прошлой записи в лог (TELEGRAM_HTTP['STATS_INTERVAL']).
+    """
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.in_use = 0
+        self.requests = 0
+        self.waited = 0  # Запросов, которым не хватило свободного соединения
+        self.wait_time = 0.0
+        self.pool_timeouts = 0
+        self.peak_in_use = 0
+        self.max_wait = 0.0
+        self._logged_at = time.monotonic()
+
+    def acquired(self, wait):
+        self.in_use += 1
+        self.requests += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        if wait:
+            self.waited += 1
+            self.wait_time += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def released(self):
+        self.in_use -= 1
+        interval = settings.TELEGRAM_HTTP["STATS_INTERVAL"]
+        if interval and time.monotonic() - self._logged_at >= interval:
+            self.log()
+
+    def snapshot(self):
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "requests": self.requests,
+            "waited": self.waited,
+            "wait_time": self.wait_time,
+            "max_wait": self.max_wait,
+            "pool_timeouts": self.pool_timeouts,
+        }
+
+    def log(self):
+        logger.info(
+            "[Telegram] Пул %s: занято %s/%s (пик %s), запросов %s, ждали соединения %s "
+            "(всего %.3f с, максимум %.3f с), таймаутов пула %s",
+            self.name, self.in_use, self.size, self.peak_in_use, self.requests, self.waited,
+            self.wait_time, self.max_wait, self.pool_timeouts,
+        )
+        self.peak_in_use = self.in_use
+        self.max_wait = 0.0
+        self._logged_at = time.monotonic()
+
+
+class InstrumentedHTTPXRequest(HTTPXRequest):
+    """
+    HTTPXRequest, который сам выдает запросам места в пуле и ведет PoolStats.
+
+    Одновременных запросов не больше размера пула, поэтому ожидание httpx внутри пула
+    не возникает, а время ожидания места видно в статистике. Не дождавшийся места за
+    pool_timeout запрос не отправляется и завершается TimedOut, как в HTTPXRequest.
+    """
+
+    def __init__(self, name, connection_pool_size, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+        self.stats = PoolStats(name, connection_pool_size)
+        self._slots = asyncio.Semaphore(connection_pool_size)
+
+    async def do_request(self, url, method, request_data=None, *args, pool_timeout=HTTPXRequest.DEFAULT_NONE,
+                         **kwargs):
+        if not isinstance(pool_timeout, (int, float)):
+            pool_timeout = self._client.timeout.pool
+
+        wait = 0.0
+        if self._slots.locked():
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), pool_timeout)
+            except (asyncio.TimeoutError, TimeoutError) as exc:
+                self.stats.pool_timeouts += 1
+                raise TimedOut(
+                    f"Pool timeout: все {self.stats.size} соединений пула {self.stats.name} заняты, "
+                    f"запрос не отправлен"
+                ) from exc
+            wait = time.monotonic() - started
+        else:
+            await self._slots.acquire()
+
+        self.stats.acquired(wait)
+        try:
+            return await super().do_request(url, method, request_data, *args, pool_timeout=pool_timeout, **kwargs)
+        finally:
+            self._slots.release()
+            self.stats.released()
+
+
+def build_request(name, pool_size=None):
+    """
+    Клиент Bot API по настройкам TELEGRAM_HTTP; name - имя пула в статистике (pool_stats).
+
+    HTTP/2 требует пакет h2 (python-telegram-bot[http2]); без него используется HTTP/1.1.
+    """
+    options = settings.TELEGRAM_HTTP
+    pool_size = pool_size or options["POOL_SIZE"]
+    http_version = options["HTTP_VERSION"]
+    if http_version != "1.1" and importlib.util.find_spec("h2") is None:
+        logger.warning("[Telegram] Для HTTP/2 нужен пакет h2, пул %s использует HTTP/1.1", name)
+        http_version = "1.1"
+
+    request = InstrumentedHTTPXRequest(
+        name,
+        connection_pool_size=pool_size,
+        connect_timeout=options["CONNECT_TIMEOUT"],
+        read_timeout=options["READ_TIMEOUT"],
+        write_timeout=options["WRITE_TIMEOUT"],
+        pool_timeout=options["POOL_TIMEOUT"],
+        http_version=http_version,
+        httpx_kwargs={
+            "limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=options["KEEPALIVE_EXPIRY"],
+            ),
+        },
+    )
+    pool_stats[name] = request.stats
+    return request
+
+
+def build_bot(name, pool_size=None):
+    """Клиент Bot для TELEGRAM_HTTP['BASE_URL'] с пулом build_request(name, pool_size)"""
+    return Bot(
+        token=settings.TELEGRAM_BOT_TOKEN,
+        base_url=settings.TELEGRAM_HTTP["BASE_URL"],
+        request=build_request(name, pool_size),
+    )
@@ -1,15 +1,60 @@
+import asyncio
+import base64
+import csv
+import importlib
+import itertools
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 from uuid import uuid4
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APITestCase
-
-from tasks.serializers import TaskSerializer
-
-from .models import Task
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+from telegram.request import HTTPXRequest
+from telegram.ext import Application, ExtBot, MessageHandler, filters
+
+from config import renderers
+from tasks.dispatcher import NotificationDispatcher
+from tasks.fake_bot_api import FakeBotAPI
+from tasks.outbox import add_notifications, drain_batch
+from tasks.management.commands.benchmark_task_indexes import SEED_STATUSES, SEED_TASKS_SQL
+from tasks.persistence import LocalStateStore, SharedPersistence, save_user_data
+from tasks.ratelimit import LocalTokenBucket, TelegramRateLimiter
+from tasks.reminders import CLAIM_SQL, send_due_reminders
+from tasks.services import transition_task
+from tasks.telegram_bot import application
+from tasks.stats import get_owner_stats
+from tasks.telegram_http import InstrumentedHTTPXRequest, build_request
+from tasks.tasks import (
+    drain_notification_outbox, new_task_messages, send_task_reminders, send_telegram_message,
+)
+from tasks.webhook import TelegramWebhookApp
+from users.cache import chat_user_cache
+from tasks.serializers import TaskSerializer, ValuesSerializer
+
+from .models import NotificationDeadLetter, NotificationOutbox, Task, TaskReminder, TaskStats, TaskTombstone
 from .permissions import IsOwner
+from .views import TaskViewSet
 
 User = get_user_model()
 
@@ -47,6 +92,22 @@ class TaskModelTest(TestCase):
         self.assertEqual(Task._meta.verbose_name_plural, "Задачи")
         self.assertEqual(Task._meta.db_table, "tasks")
 
+    def test_task_indexes(self):
+        """Тест индексов под основные сценарии чтения"""
+        self.assertEqual(
+            [index.name for index in Task._meta.indexes],
+            [
+                "tasks_owner_created_idx",
+                "tasks_assignee_status_due_idx",
+                "tasks_owner_status_idx",
+                "tasks_owner_end_idx",
+                "tasks_owner_open_due_idx",
+                "tasks_open_due_idx",
+                "tasks_owner_change_idx",
+                "tasks_search_idx",
+            ],
+        )
+
 
 class TaskPermissionsTest(TestCase):
     """Тесты для кастомных permissions"""
@@ -285,6 +346,7 @@ class TaskAdminTest(TestCase):
             name="Admin Test Task",
             description="Admin Test Description",
             owner=self.user,
+            end_date=timezone.now() + timedelta(days=1),
         )
 
         self.model_admin = TaskAdmin(Task, site)
@@ -301,6 +363,20 @@ class TaskAdminTest(TestCase):
         """Тест search_fields в админке"""
         self.assertEqual(self.model_admin.search_fields, ["name", "owner__username"])
 
+    def test_admin_search_by_text_and_owner(self):
+        """Поиск в админке находит задачи по тексту и по username владельца"""
+        other = User.objects.create_user(email="other@example.com", password="x", username="other_owner")
+        other_task = Task.objects.create(
+            name="Чужая задача", description="Описание", owner=other, end_date=timezone.now() + timedelta(days=1)
+        )
+        queryset = Task.objects.all()
+
+        by_text, _ = self.model_admin.get_search_results(None, queryset, "Admin Test")
+        by_owner, _ = self.model_admin.get_search_results(None, queryset, "other_own")
+
+        self.assertEqual(list(by_text), [self.task])
+        self.assertEqual(list(by_owner), [other_task])
+
     def test_admin_readonly_fields(self):
         """Тест readonly_fields в админке"""
         self.assertEqual(
@@ -338,3 +414,1865 @@ class TaskURLsTest(APITestCase):
         url = reverse("task:task-detail", kwargs={"pk": task.uuid})
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TaskCursorPaginationTest(APITestCase):
+    """Тесты keyset-пагинации списка задач"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="cursor@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        end_date = timezone.now() + timedelta(days=1)
+        for i in range(7):
+            Task.objects.create(
+                name=f"Task {i}", description=f"Description {i}", owner=self.user, end_date=end_date
+            )
+        # Часть задач с одинаковым created_at, чтобы проверить упорядочивание по uuid
+        same_moment = timezone.now()
+        Task.objects.filter(name__in=["Task 2", "Task 3", "Task 4"]).update(created_at=same_moment)
+        self.expected = [
+            str(uuid) for uuid in Task.objects.order_by("-created_at", "-uuid").values_list("uuid", flat=True)
+        ]
+        self.list_url = reverse("task:task-list")
+
+    def _walk(self, url, link):
+        uuids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            uuids.append([item["uuid"] for item in response.data["results"]])
+            url = response.data[link]
+        return uuids
+
+    def test_cursor_pages_follow_stable_order(self):
+        """Проход вперед по курсорам возвращает все задачи без пропусков и повторов"""
+        pages = self._walk(f"{self.list_url}?pagination=cursor&page_size=3", "next")
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_cursor_previous_link(self):
+        """Ссылка previous возвращает предыдущую страницу"""
+        first = self.client.get(f"{self.list_url}?pagination=cursor&page_size=3")
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(
+            [item["uuid"] for item in back.data["results"]],
+            [item["uuid"] for item in first.data["results"]],
+        )
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор возвращает 404"""
+        response = self.client.get(f"{self.list_url}?cursor=garbage")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination_is_default(self):
+        """Без параметра используется постраничная пагинация"""
+        response = self.client.get(self.list_url)
+        self.assertIn("count", response.data)
+
+
+class BenchmarkTaskIndexesCommandTest(TestCase):
+    """Тесты команды benchmark_task_indexes"""
+
+    def test_benchmark_rolls_back_seed_data(self):
+        """Команда печатает итог и не оставляет синтетических данных"""
+        out = StringIO()
+        call_command("benchmark_task_indexes", rows=200, owners=2, assignees=5, repeat=1, stdout=out)
+        self.assertIn("Итог", out.getvalue())
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(User.objects.filter(email__startswith="bench-").exists())
+
+
+class FakeBot:
+    """Заглушка telegram.Bot для тестов без сети"""
+
+    def __init__(self):
+        self.initialized = 0
+        self.shut_down = False
+        self.sent = []
+
+    async def initialize(self):
+        self.initialized += 1
+
+    async def shutdown(self):
+        self.shut_down = True
+
+    async def send_message(self, **kwargs):
+        self.sent.append(kwargs)
+
+
+class NotificationDispatcherTest(TestCase):
+    """Тесты фонового диспетчера уведомлений"""
+
+    def setUp(self):
+        self.bot = FakeBot()
+        self.dispatcher = NotificationDispatcher()
+        patcher = mock.patch.object(self.dispatcher, "_create_bot", return_value=self.bot)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.dispatcher.shutdown)
+
+    def test_calls_share_one_bot(self):
+        """Вызовы из разных потоков получают один Bot, а shutdown закрывает его"""
+        async def send(number, bot):
+            await bot.send_message(chat_id=number)
+            return bot
+
+        threads = [threading.Thread(target=self.dispatcher.call, args=(send, number)) for number in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIs(self.dispatcher.call(send, 3), self.bot)
+        self.dispatcher.shutdown()
+
+        self.assertEqual(sorted(message["chat_id"] for message in self.bot.sent), [0, 1, 2, 3])
+        self.assertEqual(self.bot.initialized, 1)
+        self.assertTrue(self.bot.shut_down)
+
+    def test_call_raises_errors(self):
+        """Исключение отправки получает вызывающий код"""
+        async def fail(bot):
+            raise NetworkError("down")
+
+        with self.assertRaises(NetworkError):
+            self.dispatcher.call(fail)
+
+
+class TelegramHTTPTest(TestCase):
+    """Тесты пулов соединений к Bot API"""
+
+    def run_requests(self, request, count, delay=0.05):
+        """Отправляет count одновременных запросов, каждый отвечает через delay секунд"""
+
+        async def fake_do_request(*args, **kwargs):
+            await asyncio.sleep(delay)
+            return 200, b'{"ok": true, "result": true}'
+
+        async def run():
+            return await asyncio.gather(
+                *(request.do_request("https://api.telegram.org/botTOKEN/getMe", "POST") for _ in range(count)),
+                return_exceptions=True,
+            )
+
+        with mock.patch.object(HTTPXRequest, "do_request", side_effect=fake_do_request):
+            return asyncio.run(run())
+
+    @override_settings(TELEGRAM_HTTP={
+        **settings.TELEGRAM_HTTP, "POOL_SIZE": 3, "POOL_TIMEOUT": 1.5, "READ_TIMEOUT": 7.0, "KEEPALIVE_EXPIRY": 12.0,
+    })
+    def test_build_request_uses_settings(self):
+        """Размер пула, таймауты и keep-alive берутся из TELEGRAM_HTTP"""
+        request = build_request("test")
+
+        self.assertIsInstance(request, InstrumentedHTTPXRequest)
+        limits = request._client_kwargs["limits"]
+        self.assertEqual((limits.max_connections, limits.keepalive_expiry), (3, 12.0))
+        self.assertEqual((request.read_timeout, request._client.timeout.pool), (7.0, 1.5))
+        self.assertEqual(request.stats.size, 3)
+
+    @override_settings(TELEGRAM_HTTP={**settings.TELEGRAM_HTTP, "HTTP_VERSION": "2"})
+    def test_http2_without_h2_falls_back(self):
+        """Без пакета h2 клиент создается с HTTP/1.1, а не падает при старте процесса"""
+        with mock.patch("tasks.telegram_http.importlib.util.find_spec", return_value=None), \
+                self.assertLogs("tasks.telegram_http", "WARNING"):
+            request = build_request("test")
+        self.assertEqual(request.http_version, "1.1")
+
+    @override_settings(TELEGRAM_HTTP={**settings.TELEGRAM_HTTP, "POOL_SIZE": 12})
+    def test_dispatcher_pool_from_settings(self):
+        """Размер пула диспетчера задает TELEGRAM_HTTP['POOL_SIZE']"""
+        bot = NotificationDispatcher()._create_bot()
+        self.assertEqual(bot.request.stats.size, 12)
+
+    def test_concurrency_limited_and_wait_measured(self):
+        """Одновременных запросов не больше размера пула, ожидание места попадает в статистику"""
+        request = InstrumentedHTTPXRequest("test", connection_pool_size=2, pool_timeout=5)
+
+        results = self.run_requests(request, 4)
+
+        self.assertEqual(results, [(200, b'{"ok": true, "result": true}')] * 4)
+        stats = request.stats.snapshot()
+        self.assertEqual((stats["requests"], stats["peak_in_use"], stats["in_use"]), (4, 2, 0))
+        self.assertEqual(stats["waited"], 2)
+        self.assertGreaterEqual(stats["max_wait"], 0.04)
+
+    def test_pool_timeout(self):
+        """Не дождавшийся соединения запрос завершается TimedOut и считается в статистике"""
+        request = InstrumentedHTTPXRequest("test", connection_pool_size=1, pool_timeout=0.01)
+
+        results = self.run_requests(request, 2)
+
+        self.assertIsInstance(results[1], TimedOut)
+        self.assertEqual((request.stats.requests, request.stats.pool_timeouts), (1, 1))
+
+    @override_settings(TELEGRAM_HTTP={**settings.TELEGRAM_HTTP, "STATS_INTERVAL": 0.01})
+    def test_stats_logged_periodically(self):
+        """Статистика пула пишется в лог раз в STATS_INTERVAL"""
+        request = InstrumentedHTTPXRequest("test", connection_pool_size=2, pool_timeout=5)
+
+        with self.assertLogs("tasks.telegram_http", "INFO") as logs:
+            self.run_requests(request, 2, delay=0.02)
+
+        self.assertIn("Пул test: занято", logs.output[0])
+
+
+class FakeBotAPITest(TestCase):
+    """Тесты локальной замены Bot API"""
+
+    def setUp(self):
+        self.api = FakeBotAPI().start()
+        self.addCleanup(self.api.stop)
+
+    def call(self, method, **kwargs):
+        async def run():
+            async with Bot(token="1:token", base_url=self.api.base_url) as bot:
+                return await getattr(bot, method)(**kwargs)
+
+        return asyncio.run(run())
+
+    def test_methods_return_bot_api_objects(self):
+        """Ответы разбираются PTB как ответы api.telegram.org"""
+        message = self.call("send_message", chat_id=42, text="Привет")
+        self.assertEqual((message.chat_id, message.text), (42, "Привет"))
+        self.assertTrue(self.call("answer_callback_query", callback_query_id="1"))
+        self.assertEqual(self.call("send_photo", chat_id=42, photo="file-id").chat_id, 42)
+        self.assertEqual(self.api.calls["sendMessage"], 1)
+
+    def test_webhook_command_uses_base_url(self):
+        """telegram_webhook обращается к Bot API по TELEGRAM_HTTP['BASE_URL'], как бот и диспетчер"""
+        with override_settings(TELEGRAM_HTTP={**settings.TELEGRAM_HTTP, "BASE_URL": self.api.base_url}):
+            call_command("telegram_webhook", "delete", stdout=StringIO())
+        self.assertEqual(self.api.calls["deleteWebhook"], 1)
+
+    def test_rate_limit_and_latency(self):
+        """Доля запросов получает 429 с retry_after, каждый ответ задерживается"""
+        self.api.rate_limit_ratio, self.api.retry_after, self.api.latency = 1, 3, 0.05
+
+        started = time.monotonic()
+        with self.assertRaises(RetryAfter) as error:
+            self.call("send_message", chat_id=42, text="x")
+
+        self.assertEqual(error.exception.retry_after, 3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(self.api.rate_limited, 1)
+
+    def test_get_updates(self):
+        """getUpdates отдает добавленные обновления, начиная с offset"""
+        for update_id in (1, 2):
+            self.api.push_update({"update_id": update_id, "message": {
+                "message_id": update_id, "date": 0, "chat": {"id": 42, "type": "private"}, "text": "x",
+            }})
+
+        updates = self.call("get_updates", offset=2, timeout=0)
+
+        self.assertEqual([update.update_id for update in updates], [2])
+
+
+class LoadTestBotCommandTest(TransactionTestCase):
+    """Тесты нагрузочного теста бота (команда load_test_bot)"""
+
+    def test_refuses_remote_bot_api(self):
+        """Без локального TELEGRAM_BOT_API_URL нагрузка на api.telegram.org не подается"""
+        with mock.patch.object(application.bot, "_base_url", "https://api.telegram.org/bot1:token"):
+            with self.assertRaises(CommandError):
+                call_command("load_test_bot", tasks=1)
+
+    def test_replays_scenarios(self):
+        """Все сценарии доходят до конца, отчет содержит задержки, удаляются только данные теста"""
+        other = User.objects.create_user(email="loadtest-keep@example.com", password="x")
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        out = StringIO()
+
+        with mock.patch.object(application.bot, "_base_url", f"http://127.0.0.1:{port}/bot1:token"), \
+                mock.patch.object(application.persistence, "store", LocalStateStore()):
+            call_command("load_test_bot", tasks=8, concurrency=2, latency=0, stdout=out)
+
+        report = out.getvalue()
+        self.assertIn("26 обновлений", report)
+        for kind in ("accept_", "complete_", "approve_", "reject_", "proof:text", "proof:photo"):
+            self.assertIn(kind, report)
+        self.assertIn("Ошибок обработчиков: 0", report)
+        self.assertIn("{'DONE': 6, 'REJECTED': 2}", report)
+        # Доказательства, присланные сразу после "Завершить", доходят до владельца
+        self.assertIn("         3  sendPhoto", report)
+        self.assertEqual(list(User.objects.filter(email__startswith="loadtest-")), [other])
+
+
+class TokenBucketTest(TestCase):
+    """Тесты ведер токенов для лимитов Telegram"""
+
+    def setUp(self):
+        self.limiter = TelegramRateLimiter(
+            LocalTokenBucket(), global_rate=30, global_burst=5, chat_rate=1, chat_burst=2
+        )
+
+    def test_chat_limit(self):
+        """После исчерпания ведра чата приходится ждать около 1/CHAT_RATE секунды"""
+        self.assertEqual([self.limiter.acquire(1) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(self.limiter.acquire(1), 1, delta=0.05)
+
+    def test_global_limit(self):
+        """Общий лимит действует на все чаты сразу"""
+        self.assertEqual([self.limiter.acquire(chat_id) for chat_id in range(5)], [0] * 5)
+        self.assertGreater(self.limiter.acquire(100), 0)
+
+    def test_block_after_retry_after(self):
+        """После RetryAfter отправка блокируется для всех чатов"""
+        self.limiter.block(10)
+        self.assertAlmostEqual(self.limiter.acquire(1), 10, delta=0.05)
+
+
+@override_settings(TELEGRAM_DELIVERY={
+    "MAX_ATTEMPTS": 3, "BACKOFF_BASE": 2, "BACKOFF_MAX": 300, "MAX_INLINE_WAIT": 1.0,
+})
+class SendTelegramMessageTaskTest(TestCase):
+    """Тесты задачи Celery send_telegram_message"""
+
+    def setUp(self):
+        self.limiter = TelegramRateLimiter(
+            LocalTokenBucket(), global_rate=1000, global_burst=1000, chat_rate=1000, chat_burst=1000
+        )
+        patcher = mock.patch("tasks.tasks.get_rate_limiter", return_value=self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("tasks.tasks.dispatcher.call")
+        self.call = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_message_sent(self):
+        """Сообщение уходит через общий loop диспетчера"""
+        send_telegram_message.apply(args=("42", "Привет"))
+        self.call.assert_called_once()
+        self.assertEqual(self.call.call_args.args[1:3], ("42", "Привет"))
+
+    def test_permanent_error_goes_to_dead_letter(self):
+        """Постоянная ошибка не повторяется, сообщение сохраняется"""
+        self.call.side_effect = BadRequest("Chat not found")
+        send_telegram_message.apply(args=("42", "Привет"))
+        self.assertEqual(self.call.call_count, 1)
+        letter = NotificationDeadLetter.objects.get()
+        self.assertEqual((letter.chat_id, letter.text, letter.attempts), ("42", "Привет", 1))
+
+    def test_transient_error_retried_then_dead_lettered(self):
+        """Сетевая ошибка повторяется MAX_ATTEMPTS раз, затем сообщение сохраняется"""
+        self.call.side_effect = NetworkError("Connection reset")
+        send_telegram_message.apply(args=("42", "Привет"))
+        self.assertEqual(self.call.call_count, 3)
+        self.assertEqual(NotificationDeadLetter.objects.get().attempts, 3)
+
+    def test_retry_after_blocks_limiter(self):
+        """RetryAfter блокирует лимитер и откладывает отправку"""
+        self.call.side_effect = [RetryAfter(5), None]
+        with mock.patch.object(self.limiter, "block") as block:
+            send_telegram_message.apply(args=("42", "Привет"))
+        block.assert_called_once_with(5.0)
+        self.assertEqual(self.call.call_count, 2)
+        self.assertFalse(NotificationDeadLetter.objects.exists())
+
+    def test_delivered_dedup_key_not_sent_again(self):
+        """Повторно переданное из outbox сообщение не дублируется в чате"""
+        cache.clear()
+        send_telegram_message.apply(args=("42", "Привет"), kwargs={"dedup_key": "task:1:owner"})
+        send_telegram_message.apply(args=("42", "Привет"), kwargs={"dedup_key": "task:1:owner"})
+        self.assertEqual(self.call.call_count, 1)
+
+    def test_notification_fans_out(self):
+        """Уведомление о задаче разбивается на сообщения исполнителю (с кнопками) и владельцу"""
+        messages = new_task_messages("uuid-1", "1", "2", ["owner"], ["assignee"])
+        self.assertEqual(
+            [message[:3] for message in messages],
+            [("task:uuid-1:assignee", "2", "assignee"), ("task:uuid-1:owner", "1", "owner")],
+        )
+        self.assertIn("reply_markup", messages[0][3])
+
+
+class TaskCreateNotificationTest(APITestCase):
+    """Уведомление о новой задаче пишется в outbox в транзакции задачи"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="notify@example.com", password="testpass123", telegram_chat_id="100"
+        )
+        self.assignee = User.objects.create_user(
+            email="notify-assignee@example.com", password="testpass123", telegram_chat_id="200"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.data = {
+            "name": "Task", "description": "Description", "end_date": timezone.now() + timedelta(days=1),
+            "assignee": self.assignee.pk,
+        }
+
+    def test_notification_written_to_outbox(self):
+        with mock.patch("tasks.views.schedule_outbox_drain") as delay:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(reverse("task:task-list"), self.data)
+            delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        delay.assert_called_once()
+        rows = NotificationOutbox.objects.order_by("pk")
+        self.assertEqual(
+            [(row.dedup_key, row.chat_id) for row in rows],
+            [(f"task:{response.data['uuid']}:assignee", "200"), (f"task:{response.data['uuid']}:owner", "100")],
+        )
+        self.assertIn("reply_markup", rows[0].payload)
+
+    def test_rollback_discards_notification(self):
+        with mock.patch("tasks.views.invalidate_assignee_cache", side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.post(reverse("task:task-list"), self.data)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+
+class TaskBulkCreateTest(APITestCase):
+    """Тесты массового создания задач"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="bulk@example.com", password="testpass123", telegram_chat_id="100"
+        )
+        self.assignee = User.objects.create_user(
+            email="bulk-assignee@example.com", password="testpass123", telegram_chat_id="200"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("task:task-bulk")
+        self.end_date = (timezone.now() + timedelta(days=1)).isoformat()
+
+    def _items(self, count, **extra):
+        return [
+            {"name": f"Bulk {i}", "description": "Description", "end_date": self.end_date, **extra}
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        """Задачи создаются одним INSERT, исполнители проверяются одним запросом"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self._items(5, assignee=self.assignee.pk), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(Task.objects.filter(owner=self.user, assignee=self.assignee).count(), 5)
+        statements = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('INSERT INTO "tasks"')]), 1)
+        self.assertEqual(len([sql for sql in statements if 'FROM "users_customuser"' in sql]), 1)
+
+    def test_unknown_assignee_rejects_whole_batch(self):
+        """Ошибка в одном элементе отклоняет весь список"""
+        items = self._items(2)
+        items[1]["assignee"] = 999999
+        response = self.client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("assignee", response.data[1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_invalid_end_date(self):
+        """Правило end_date >= created_at проверяется для каждого элемента"""
+        items = self._items(1, end_date=(timezone.now() - timedelta(days=1)).isoformat())
+        response = self.client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_notifications_written_to_outbox(self):
+        """Уведомления вставляются в outbox одним запросом, разбор ставится после коммита"""
+        with mock.patch("tasks.views.schedule_outbox_drain") as delay, \
+                self.captureOnCommitCallbacks(execute=True), \
+                CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, self._items(3, assignee=self.assignee.pk), format="json")
+
+        delay.assert_called_once()
+        self.assertEqual(
+            sorted(NotificationOutbox.objects.values_list("chat_id", flat=True)), ["100"] * 3 + ["200"] * 3
+        )
+        statements = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('INSERT INTO "notification_outbox"')]), 1)
+
+
+def run_asgi(app, path, query_string=b"", headers=(), sent=None):
+    """GET-запрос к ASGI-приложению, как от uvicorn; возвращает отправленные сообщения (sent)"""
+    scope = {
+        "type": "http", "method": "GET", "path": path, "query_string": query_string, "headers": list(headers),
+        "server": ("testserver", 80), "client": ("127.0.0.1", 1), "scheme": "http",
+    }
+    sent = [] if sent is None else sent
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # Клиент не отключается, пока не получит ответ
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+@override_settings(TELEGRAM_WEBHOOK={
+    "PATH": "/telegram/webhook/", "SECRET_TOKEN": "s3cret", "MAX_BODY_SIZE": 1024, "URL": None, "MAX_CONNECTIONS": 40,
+})
+class TelegramWebhookTest(TestCase):
+    """Прием обновлений Telegram через ASGI"""
+
+    update = b'{"update_id": 42, "callback_query": {"id": "1", "chat_instance": "1", "data": "accept_x", ' \
+             b'"from": {"id": 7, "is_bot": false, "first_name": "Ivan"}}}'
+
+    def setUp(self):
+        self.application = mock.Mock(
+            bot=None,
+            initialize=mock.AsyncMock(), start=mock.AsyncMock(), process_update=mock.AsyncMock(),
+            stop=mock.AsyncMock(), shutdown=mock.AsyncMock(),
+        )
+        self.fallback = mock.AsyncMock()
+        self.app = TelegramWebhookApp(self.fallback, application=self.application)
+
+    def _request(self, path="/telegram/webhook/", method="POST", secret=b"s3cret", body=None):
+        headers = [(b"x-telegram-bot-api-secret-token", secret)] if secret is not None else []
+        scope = {"type": "http", "path": path, "method": method, "headers": headers}
+        chunks = [{"type": "http.request", "body": body if body is not None else self.update, "more_body": False}]
+        sent = []
+
+        async def receive():
+            return chunks.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.app(scope, receive, send))
+        return sent[0]["status"] if sent else None
+
+    def test_update_processed(self):
+        self.assertEqual(self._request(), 200)
+        update = self.application.process_update.await_args.args[0]
+        self.assertEqual(update.update_id, 42)
+        self.assertEqual(update.callback_query.data, "accept_x")
+        self.application.initialize.assert_awaited_once()
+
+    def test_wrong_or_missing_secret(self):
+        self.assertEqual(self._request(secret=b"wrong"), 403)
+        self.assertEqual(self._request(secret=None), 403)
+        self.application.process_update.assert_not_awaited()
+
+    def test_invalid_requests(self):
+        self.assertEqual(self._request(method="GET"), 405)
+        self.assertEqual(self._request(body=b"not json"), 400)
+        self.assertEqual(self._request(body=b"x" * 2048), 413)
+        self.application.process_update.assert_not_awaited()
+
+    def test_json_that_is_not_an_update(self):
+        """JSON не того вида - 400, а не 500, которые Telegram доставлял бы повторно"""
+        for body in (b"[]", b"1", b'"x"', b"null"):
+            self.assertEqual(self._request(body=body), 400)
+        with self.assertLogs("tasks.webhook", "WARNING"):
+            for body in (b"{}", b'{"update_id": 1, "message": 1}', b'{"update_id": 1, "message": {"chat": 5}}'):
+                self.assertEqual(self._request(body=body), 400)
+        self.application.process_update.assert_not_awaited()
+
+    def test_other_paths_go_to_django(self):
+        self._request(path="/task/")
+        self.fallback.assert_awaited_once()
+        self.application.process_update.assert_not_awaited()
+
+    def test_static_served_in_debug(self):
+        """Под uvicorn статику админки в DEBUG отдает сам ASGI-application"""
+        import config.asgi
+
+        self.addCleanup(importlib.reload, config.asgi)
+        with override_settings(DEBUG=True):
+            importlib.reload(config.asgi)
+            sent = run_asgi(config.asgi.application, "/static/admin/css/base.css")
+        self.assertEqual(sent[0]["status"], 200)
+
+    def test_set_webhook_requires_secret(self):
+        with override_settings(TELEGRAM_WEBHOOK={"URL": "https://example.com/telegram/webhook/", "SECRET_TOKEN": None}):
+            with self.assertRaises(CommandError):
+                call_command("telegram_webhook", "set", stdout=StringIO())
+
+
+class TaskTransitionTest(TestCase):
+    """Переходы статусов из бота выполняются одним запросом"""
+
+    def setUp(self):
+        chat_user_cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123", telegram_chat_id="100")
+        self.assignee = User.objects.create_user(
+            email="assignee@example.com", password="testpass123", telegram_chat_id="200"
+        )
+        self.task = Task.objects.create(
+            name="Task", description="Description", owner=self.owner, assignee=self.assignee,
+            end_date=timezone.now() + timedelta(days=1),
+        )
+
+    def test_accept_in_one_query(self):
+        # Первый запрос пользователя по chat id попадает в кэш, дальше - только UPDATE
+        with self.assertNumQueries(2):
+            self.assertIsNone(transition_task("done", self.task.uuid, 200))
+        with self.assertNumQueries(1):
+            task = transition_task("accept", self.task.uuid, 200)
+        self.assertEqual(task.status, "WORK")
+        self.assertEqual((task.owner_chat_id, task.assignee_chat_id, task.assignee_email), ("100", "200", "assignee@example.com"))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, "WORK")
+
+    def test_wrong_user_or_status(self):
+        """Чужой chat id и неподходящий статус не меняют задачу"""
+        self.assertIsNone(transition_task("accept", self.task.uuid, 100))
+        self.assertIsNone(transition_task("done", self.task.uuid, 100))
+        self.assertIsNone(transition_task("accept", uuid4(), 200))
+        with self.assertNumQueries(1):
+            self.assertIsNone(transition_task("accept", self.task.uuid, 999))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, "NEW")
+
+    def test_second_click_does_nothing(self):
+        self.assertIsNotNone(transition_task("accept", self.task.uuid, 200))
+        self.assertIsNone(transition_task("accept", self.task.uuid, 200))
+
+    def test_completion_proof_saved(self):
+        Task.objects.filter(pk=self.task.pk).update(status="REVIEW")
+        task = transition_task("proof", self.task.uuid, 200, completion_proof="Готово", completed_at=timezone.now())
+        self.assertEqual(task.completion_proof, "Готово")
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.completion_proof), ("REVIEW", "Готово"))
+        self.assertIsNotNone(self.task.completed_at)
+
+        self.assertEqual(transition_task("done", self.task.uuid, 100).assignee_chat_id, "200")
+
+
+class SharedPersistenceTest(TestCase):
+    """Состояние сценариев бота общее для нескольких процессов"""
+
+    def setUp(self):
+        self.store = LocalStateStore()
+
+    def _persistence(self):
+        return SharedPersistence(self.store, ttl=60, update_interval=1)
+
+    def test_state_shared_between_processes(self):
+        first, second = self._persistence(), self._persistence()
+        user_data = {}
+
+        async def scenario():
+            await first.update_user_data(7, {"completing_task": "uuid"})
+            await first.flush()
+            await second.refresh_user_data(7, user_data)
+
+        asyncio.run(scenario())
+        self.assertEqual(user_data, {"completing_task": "uuid"})
+
+    def test_updates_written_in_one_batch(self):
+        persistence = self._persistence()
+        self.store.write = mock.AsyncMock()
+
+        async def scenario():
+            await asyncio.gather(*(persistence.update_user_data(user_id, {"n": user_id}) for user_id in range(3)))
+            await persistence.flush()
+
+        asyncio.run(scenario())
+        self.store.write.assert_awaited_once()
+        self.assertEqual(len(self.store.write.await_args.args[0]), 3)
+
+    def test_empty_and_expired_state_removed(self):
+        persistence = self._persistence()
+        user_data = {"completing_task": "uuid"}
+
+        async def scenario():
+            await persistence.update_user_data(7, {"completing_task": "uuid"})
+            await persistence.update_user_data(8, {"completing_task": "uuid"})
+            await persistence.flush()
+            await persistence.update_user_data(7, {})
+            await persistence.flush()
+            with mock.patch("tasks.persistence.time.monotonic", return_value=time.monotonic() + 61):
+                await persistence.refresh_user_data(8, user_data)
+
+        asyncio.run(scenario())
+        self.assertEqual(self.store._data, {})
+        self.assertEqual(user_data, {})
+
+    def test_application_reads_state_from_other_process(self):
+        """Следующий шаг сценария обрабатывает другое приложение бота"""
+        seen = []
+
+        async def remember(update, context):
+            context.user_data["completing_task"] = update.message.text
+
+        async def read(update, context):
+            seen.append(dict(context.user_data))
+
+        update = {
+            "update_id": 1,
+            "message": {
+                "message_id": 1, "date": 0, "text": "uuid", "chat": {"id": 7, "type": "private"},
+                "from": {"id": 7, "is_bot": False, "first_name": "Ivan"},
+            },
+        }
+
+        async def scenario():
+            applications = []
+            for handler in (remember, read):
+                application = Application.builder().token("1:token").persistence(self._persistence()).build()
+                application.add_handler(MessageHandler(filters.ALL, handler))
+                await application.initialize()
+                applications.append(application)
+            first, second = applications
+            await first.process_update(Update.de_json(update, first.bot))
+            await first.update_persistence()
+            await second.process_update(Update.de_json(update, second.bot))
+            for application in applications:
+                await application.shutdown()
+
+        with mock.patch.object(ExtBot, "initialize", mock.AsyncMock()), \
+                mock.patch.object(ExtBot, "shutdown", mock.AsyncMock()):
+            asyncio.run(scenario())
+        self.assertEqual(seen, [{"completing_task": "uuid"}])
+
+    def test_immediate_update_keeps_unwritten_state(self):
+        """Следующее обновление до такта UPDATE_INTERVAL видит изменения предыдущего"""
+        seen = []
+
+        async def handler(update, context):
+            seen.append(dict(context.user_data))
+            context.user_data["completing_task"] = update.message.text
+
+        async def scenario():
+            application = Application.builder().token("1:token").persistence(self._persistence()).build()
+            application.add_handler(MessageHandler(filters.ALL, handler))
+            await application.initialize()
+            for update_id, text in ((1, "first"), (2, "second")):
+                await application.process_update(Update.de_json(self._message(update_id, text), application.bot))
+            await application.shutdown()
+
+        with mock.patch.object(ExtBot, "initialize", mock.AsyncMock()), \
+                mock.patch.object(ExtBot, "shutdown", mock.AsyncMock()):
+            asyncio.run(scenario())
+        self.assertEqual(seen, [{}, {"completing_task": "first"}])
+
+    def test_save_user_data_writes_through(self):
+        """save_user_data записывает состояние сразу: его видит другой процесс"""
+        first, second = self._persistence(), self._persistence()
+        application = mock.Mock(persistence=first)
+        user_data = {}
+
+        async def scenario():
+            await save_user_data(application, 7, {"completing_task": "uuid"})
+            await second.refresh_user_data(7, user_data)
+
+        asyncio.run(scenario())
+        self.assertEqual(user_data, {"completing_task": "uuid"})
+
+    def test_synced_copies_forgotten(self):
+        """Копии записей для проверки изменений не копятся дольше synced_ttl"""
+        persistence = self._persistence()
+
+        async def scenario():
+            for user_id in range(3):
+                await persistence.refresh_user_data(user_id, {})
+            with mock.patch("tasks.persistence.time.monotonic", return_value=time.monotonic() + 301):
+                await persistence.update_user_data(7, {"completing_task": "uuid"})
+            await persistence.flush()
+
+        asyncio.run(scenario())
+        self.assertEqual(list(persistence._synced), ["user:7"])
+
+    @staticmethod
+    def _message(update_id, text):
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "date": 0, "text": text, "chat": {"id": 7, "type": "private"},
+                "from": {"id": 7, "is_bot": False, "first_name": "Ivan"},
+            },
+        }
+
+
+class TaskResponseCacheTest(APITestCase):
+    """Ответы list и retrieve кэшируются до изменения задач владельца"""
+
+    def setUp(self):
+        cache.clear()
+        chat_user_cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123", telegram_chat_id="100")
+        self.task = Task.objects.create(
+            name="Task", description="Description", owner=self.owner, end_date=timezone.now() + timedelta(days=1)
+        )
+        self.client.force_authenticate(user=self.owner)
+        self.list_url = reverse("task:task-list")
+        self.detail_url = reverse("task:task-detail", args=[self.task.uuid])
+
+    def test_repeat_reads_skip_database(self):
+        first = self.client.get(self.list_url)
+        detail = self.client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.list_url).data, first.data)
+            self.assertEqual(self.client.get(self.detail_url).data, detail.data)
+
+    def test_query_params_cached_separately(self):
+        self.client.get(self.list_url)
+        response = self.client.get(self.list_url, {"pagination": "cursor"})
+        self.assertIn("next", response.data)
+        self.assertNotIn("count", response.data)
+
+    def test_api_changes_invalidate(self):
+        self.client.get(self.list_url)
+        # Патч снаружи: on_commit-колбэки выполняются при выходе из captureOnCommitCallbacks
+        with mock.patch("tasks.views.schedule_outbox_drain") as drain, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.list_url, {
+                "name": "New", "description": "Description", "end_date": timezone.now() + timedelta(days=2),
+            })
+        drain.assert_called_once()
+        self.assertEqual(self.client.get(self.list_url).data["count"], 2)
+
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.detail_url, {"name": "Renamed"})
+        self.assertEqual(self.client.get(self.detail_url).data["name"], "Renamed")
+
+    def test_bot_transition_invalidates(self):
+        Task.objects.filter(pk=self.task.pk).update(status="REVIEW")
+        self.assertEqual(self.client.get(self.detail_url).data["status"], "REVIEW")
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_task("done", self.task.uuid, 100)
+        self.assertEqual(self.client.get(self.detail_url).data["status"], "DONE")
+
+    def test_overdue_not_cached(self):
+        """Задача, срок которой прошел, сразу попадает в ?overdue=true"""
+        self.assertEqual(self.client.get(self.list_url, {"overdue": "true"}).data["count"], 0)
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() + timedelta(days=2)):
+            response = self.client.get(self.list_url, {"overdue": "true"})
+        self.assertEqual(response.data["count"], 1)
+
+    def test_owners_do_not_share_cache(self):
+        self.client.get(self.list_url)
+        other = User.objects.create_user(email="other@example.com", password="testpass123")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.list_url).data["count"], 0)
+
+
+class TaskConditionalGetTest(APITestCase):
+    """ETag и Last-Modified для списка и отдельной задачи"""
+
+    def setUp(self):
+        cache.clear()
+        chat_user_cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123", telegram_chat_id="100")
+        self.task = Task.objects.create(
+            name="Task", description="Description", owner=self.owner, end_date=timezone.now() + timedelta(days=1)
+        )
+        self.client.force_authenticate(user=self.owner)
+        self.list_url = reverse("task:task-list")
+        self.detail_url = reverse("task:task-detail", args=[self.task.uuid])
+
+    def test_not_modified(self):
+        for url in (self.list_url, self.detail_url):
+            response = self.client.get(url)
+            self.assertIn("ETag", response)
+            self.assertIn("Last-Modified", response)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response.content, b"")
+
+    def test_validators_from_aggregate_only(self):
+        """Без кэша ответов 304 стоит одного агрегатного запроса, задачи не выбираются"""
+        etag = self.client.get(self.list_url)["ETag"]
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("MAX(", queries[0]["sql"])
+
+    def test_etag_changes_on_bot_transition(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        updated_at = Task.objects.get(pk=self.task.pk).updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=self.task.pk).update(status="REVIEW")
+            transition_task("done", self.task.uuid, 100)
+        self.assertGreater(Task.objects.get(pk=self.task.pk).updated_at, updated_at)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_on_delete(self):
+        Task.objects.create(
+            name="Second", description="Description", owner=self.owner, end_date=timezone.now() + timedelta(days=1)
+        )
+        etag = self.client.get(self.list_url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(self.detail_url)
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since_ignored_after_delete(self):
+        """Удаление не меняет Last-Modified списка, поэтому 304 выдается только по ETag"""
+        Task.objects.create(
+            name="Second", description="Description", owner=self.owner, end_date=timezone.now() + timedelta(days=1)
+        )
+        last_modified = self.client.get(self.list_url)["Last-Modified"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(self.detail_url)
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Last-Modified"], last_modified)
+
+    def test_formats_get_own_etag(self):
+        """JSON и browsable API по одному адресу не получают ETag друг друга из кэша"""
+        json_etag = self.client.get(self.list_url, HTTP_ACCEPT="application/json")["ETag"]
+        html_etag = self.client.get(self.list_url, HTTP_ACCEPT="text/html")["ETag"]
+        self.assertNotEqual(json_etag, html_etag)
+
+        response = self.client.get(self.list_url, HTTP_ACCEPT="text/html", HTTP_IF_NONE_MATCH=html_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.list_url, HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=html_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], json_etag)
+
+    def test_missing_task(self):
+        self.assertEqual(self.client.get(reverse("task:task-detail", args=[uuid4()])).status_code, 404)
+
+
+class TaskSyncTest(TransactionTestCase):
+    """
+    Синхронизация изменений задач.
+
+    TransactionTestCase: токен опирается на завершенные транзакции, а TestCase держит
+    все изменения теста в одной незавершенной транзакции.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+        self.url = reverse("task:task-sync")
+        self.tasks = [self._create(f"Task {i}") for i in range(3)]
+
+    def _create(self, name, owner=None):
+        return Task.objects.create(
+            name=name, description="Description", owner=owner or self.owner, end_date=timezone.now() + timedelta(days=1)
+        )
+
+    def _sync(self, token=None, **params):
+        if token:
+            params["token"] = token
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_full_then_delta(self):
+        self._create("Foreign", owner=User.objects.create_user(email="other@example.com", password="testpass123"))
+        data = self._sync()
+        self.assertEqual({task["name"] for task in data["changed"]}, {"Task 0", "Task 1", "Task 2"})
+        self.assertEqual(data["deleted"], [])
+        self.assertFalse(data["has_more"])
+
+        Task.objects.filter(pk=self.tasks[0].pk).update(name="Renamed")
+        deleted_uuid = str(self.tasks[1].uuid)
+        self.tasks[1].delete()
+        created = self._create("New")
+        delta = self._sync(data["token"])
+        self.assertEqual([task["name"] for task in delta["changed"]], ["Renamed", "New"])
+        self.assertEqual(delta["deleted"], [deleted_uuid])
+        self.assertEqual(delta["changed"][1]["uuid"], str(created.uuid))
+
+    def test_up_to_date_client_costs_one_query(self):
+        token = self._sync()["token"]
+        with self.assertNumQueries(1):
+            data = self._sync(token)
+        self.assertEqual((data["changed"], data["deleted"]), ([], []))
+
+    def test_pages(self):
+        data = self._sync(page_size=2)
+        self.assertTrue(data["has_more"])
+        rest = self._sync(data["token"], page_size=2)
+        self.assertFalse(rest["has_more"])
+        uuids = [task["uuid"] for task in data["changed"] + rest["changed"]]
+        self.assertCountEqual(uuids, [str(task.uuid) for task in self.tasks])
+
+    def test_tombstones_written_by_trigger(self):
+        Task.objects.filter(owner=self.owner).delete()
+        self.assertEqual(TaskTombstone.objects.filter(owner_id=self.owner.pk).count(), 3)
+
+    def test_invalid_and_expired_token(self):
+        response = self.client.get(self.url, {"token": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        token = self._sync()["token"]
+        with override_settings(TASK_SYNC={"PAGE_SIZE": 500, "TOKEN_MAX_AGE": timedelta(seconds=-1)}):
+            response = self.client.get(self.url, {"token": token})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class ValuesSerializerTest(APITestCase):
+    """Быстрый вывод списка совпадает с TaskSerializer"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        self.assignee = User.objects.create_user(email="assignee@example.com", password="testpass123")
+        Task.objects.create(
+            name="Plain", description="Description", owner=self.owner, end_date=timezone.now() + timedelta(days=1)
+        )
+        Task.objects.create(
+            name="Done", description="Описание", owner=self.owner, assignee=self.assignee, status="DONE",
+            completion_proof="Готово", completed_at=timezone.now(), end_date=timezone.now() + timedelta(days=2),
+        )
+
+    def test_output_identical(self):
+        queryset = Task.objects.order_by("-created_at")
+        values_serializer = ValuesSerializer(TaskSerializer)
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(values_serializer.to_representation(values_serializer.values(queryset))),
+            renderer.render(TaskSerializer(queryset, many=True).data),
+        )
+
+    def test_list_without_lazy_owner_queries(self):
+        self.client.force_authenticate(user=self.owner)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("task:task-list"))
+        self.assertEqual(response.data["results"], TaskSerializer(Task.objects.order_by("-created_at"), many=True).data)
+        self.assertFalse([query for query in queries if 'FROM "users_customuser"' in query["sql"]])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_task_serializer", rows=20, repeat=1, stdout=out)
+        self.assertIn("ValuesSerializer", out.getvalue())
+        self.assertFalse(User.objects.filter(email__startswith="bench-serializer").exists())
+
+
+class FastJSONTest(APITestCase):
+    """orjson-рендерер и парсер дают тот же результат, что стандартные из DRF"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        self.data = {
+            "uuid": uuid4(),
+            "created_at": timezone.now(),
+            "end_date": timezone.now().astimezone(dt_timezone(timedelta(hours=3))),
+            "amount": Decimal("12.50"),
+            "name": "Задача\u2028с разделителем",
+            "items": [1, 2.5, None, True],
+            1: "нестроковый ключ",
+        }
+
+    def test_render_matches_drf(self):
+        self.assertEqual(renderers.FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_render_indent_and_big_int_fall_back(self):
+        context = {"indent": 2}
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(self.data, "application/json", context),
+            JSONRenderer().render(self.data, "application/json", context),
+        )
+        self.assertEqual(renderers.FastJSONRenderer().render({"id": 2 ** 70}), b'{"id":1180591620717411303424}')
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(renderers.FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+            self.assertEqual(renderers.FastJSONParser().parse(BytesIO('{"a": "б"}'.encode())), {"a": "б"})
+
+    def test_parse(self):
+        body = '{"name": "Задача", "items": [1, 2.5, null]}'.encode()
+        self.assertEqual(renderers.FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+
+    def test_task_api_uses_fast_json(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.post(
+            reverse("task:task-list"),
+            json.dumps({
+                "name": "Задача", "description": "Описание", "end_date": (timezone.now() + timedelta(days=1)).isoformat()
+            }),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsInstance(response.accepted_renderer, renderers.FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+        response = self.client.post(reverse("task:task-list"), '{"name": ', content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("JSON parse error", str(response.data["detail"]))
+
+
+class TaskExportTest(APITestCase):
+    """Потоковая выгрузка задач /task/export/"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        self.other = User.objects.create_user(email="other@example.com", password="testpass123")
+        now = timezone.now()
+        self.tasks = [
+            Task.objects.create(
+                name=f"Task {i}", description="Описание, с запятой", owner=self.owner,
+                status=("NEW", "WORK", "DONE")[i % 3], end_date=now + timedelta(days=i + 1),
+            )
+            for i in range(5)
+        ]
+        Task.objects.create(name="Other", description="Description", owner=self.other, end_date=now + timedelta(days=1))
+        self.client.force_authenticate(user=self.owner)
+        self.url = reverse("task:task-export")
+
+    def _get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b"".join(response.streaming_content)
+
+    def test_ndjson(self):
+        with mock.patch.object(TaskViewSet, "export_chunk_size", 2):
+            response, content = self._get()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        expected = TaskSerializer(Task.objects.filter(owner=self.owner).order_by("-created_at", "-uuid"), many=True)
+        self.assertEqual(rows, json.loads(JSONRenderer().render(expected.data)))
+
+    def test_csv(self):
+        response, content = self._get(output="csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(StringIO(content.decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["description"], "Описание, с запятой")
+        self.assertEqual(rows[0]["assignee"], "")
+        self.assertEqual({row["uuid"] for row in rows}, {str(task.uuid) for task in self.tasks})
+
+    def test_filters(self):
+        _, content = self._get(status=["NEW", "DONE"], end_to=(self.tasks[3].end_date).isoformat())
+        uuids = {json.loads(line)["uuid"] for line in content.splitlines()}
+        self.assertEqual(uuids, {str(self.tasks[0].uuid), str(self.tasks[2].uuid)})
+
+    def test_invalid_params(self):
+        for params in ({"output": "xml"}, {"status": "UNKNOWN"}, {"end_from": "завтра"}):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskExportASGITest(TransactionTestCase):
+    """
+    Выгрузка через ASGI-приложение, как под uvicorn.
+
+    TransactionTestCase: view работает в потоке sync_to_async со своим соединением с базой.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        Task.objects.bulk_create(
+            Task(name=f"Task {i}", description="Description", owner=self.owner, end_date=timezone.now() + timedelta(days=1))
+            for i in range(5)
+        )
+
+    def test_streamed_in_chunks(self):
+        """Каждая порция задач уходит отдельным сообщением, а не всем ответом после чтения"""
+        import config.asgi
+
+        sent, read_after = [], []
+        export_chunks = TaskViewSet._export_chunks
+
+        def chunks(view, rows):
+            for chunk in export_chunks(view, rows):
+                # Сколько сообщений ушло клиенту к моменту чтения порции
+                read_after.append(len(sent))
+                yield chunk
+
+        credentials = base64.b64encode(b"owner@example.com:testpass123")
+        with mock.patch.object(TaskViewSet, "export_chunk_size", 2), \
+                mock.patch.object(TaskViewSet, "_export_chunks", chunks):
+            run_asgi(
+                config.asgi.application, reverse("task:task-export"),
+                headers=[(b"authorization", b"Basic " + credentials)], sent=sent,
+            )
+
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertEqual(read_after, [1, 2, 3])
+        bodies = [message["body"] for message in sent[1:] if message.get("body")]
+        self.assertEqual([body.count(b"\n") for body in bodies], [2, 2, 1])
+        self.assertTrue(all(message.get("more_body") for message in sent[1:-1]))
+
+
+class ImportTasksCommandTest(TestCase):
+    """Загрузка задач командой import_tasks"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        self.assignee = User.objects.create_user(email="assignee@example.com", password="testpass123")
+
+    def _write(self, suffix, content):
+        file = tempfile.NamedTemporaryFile("w", suffix=suffix, encoding="utf-8", delete=False)
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write(content)
+        return file.name
+
+    def test_csv(self):
+        path = self._write(".csv", (
+            "uuid,name,description,owner_email,assignee_email,status,created_at,end_date\n"
+            f"{uuid4()},Первая,\"Описание, с запятой\",owner@example.com,assignee@example.com,WORK,"
+            "2024-01-01T10:00:00Z,2024-01-02T10:00:00Z\n"
+            ",Вторая,,owner@example.com,,,,2099-01-01T00:00:00+03:00\n"
+        ))
+        out = StringIO()
+        call_command("import_tasks", path, stdout=out)
+
+        self.assertIn("Импортировано задач: 2", out.getvalue())
+        first = Task.objects.get(name="Первая")
+        self.assertEqual((first.owner, first.assignee, first.status), (self.owner, self.assignee, "WORK"))
+        self.assertEqual(first.description, "Описание, с запятой")
+        second = Task.objects.get(name="Вторая")
+        self.assertEqual((second.status, second.description, second.assignee), ("NEW", "", None))
+
+    def test_ndjson(self):
+        path = self._write(".ndjson", "\n".join(json.dumps(item) for item in [
+            {"name": "Первая", "owner_email": "owner@example.com", "end_date": "2099-01-01T00:00:00Z"},
+            {"name": "Вторая", "owner_email": "owner@example.com", "assignee_email": "assignee@example.com",
+             "end_date": "2099-01-01T00:00:00Z", "completion_proof": None},
+        ]) + "\n")
+        call_command("import_tasks", path, stdout=StringIO())
+        self.assertEqual(Task.objects.get(name="Вторая").assignee, self.assignee)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_validation_errors_reported_and_nothing_imported(self):
+        existing = Task.objects.create(
+            name="Existing", description="Description", owner=self.owner, end_date=timezone.now() + timedelta(days=1)
+        )
+        path = self._write(".ndjson", "\n".join(json.dumps(item) for item in [
+            {"name": "Ok", "owner_email": "owner@example.com", "end_date": "2099-01-01T00:00:00Z"},
+            {"name": "Past", "owner_email": "owner@example.com", "created_at": "2024-01-02T00:00:00Z",
+             "end_date": "2024-01-01T00:00:00Z"},
+            {"name": "Unknown", "owner_email": "nobody@example.com", "assignee_email": "ghost@example.com",
+             "status": "LOST", "end_date": "2099-01-01T00:00:00Z"},
+            {"uuid": str(existing.uuid), "name": "", "owner_email": "owner@example.com", "end_date": "2099-01-01"},
+        ]))
+        with self.assertRaises(CommandError) as error:
+            call_command("import_tasks", path, stdout=StringIO())
+
+        message = str(error.exception)
+        self.assertNotIn("Строка 1:", message)
+        self.assertIn("Строка 2: end_date", message)
+        self.assertIn("Строка 3: status: неизвестный статус LOST", message)
+        self.assertIn("nobody@example.com не найден", message)
+        self.assertIn("ghost@example.com не найден", message)
+        self.assertIn("Строка 4: name: обязательное поле; uuid: задача уже существует", message)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_format_errors(self):
+        cases = [
+            (".csv", "name,owner_email\nA,owner@example.com\n", "Нет обязательных колонок: end_date"),
+            (".csv", "name,owner_email,end_date\nA,owner@example.com,2099-01-01\nB,owner@example.com,завтра\n",
+             "line 3, column end_date"),
+            (".ndjson", '{"name": "A"}\n{oops\n', "Строка 2: некорректный JSON"),
+            (".ndjson", '{"name": "A", "priority": 1}\n', "неизвестные поля priority"),
+            (".txt", "", "укажите --format"),
+        ]
+        for suffix, content, expected in cases:
+            with self.subTest(expected=expected), self.assertRaisesMessage(CommandError, expected):
+                call_command("import_tasks", self._write(suffix, content), stdout=StringIO())
+        self.assertFalse(Task.objects.exists())
+
+    def test_dry_run(self):
+        path = self._write(".csv", "name,owner_email,end_date\nA,owner@example.com,2099-01-01\n")
+        out = StringIO()
+        call_command("import_tasks", path, dry_run=True, stdout=out)
+        self.assertIn("задач в файле: 1", out.getvalue())
+        self.assertFalse(Task.objects.exists())
+
+
+class TaskSearchTest(APITestCase):
+    """Поиск задач ?q= и в админке (латиница: тестовая база может быть не в UTF-8)"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        self.other = User.objects.create_user(email="other@example.com", password="testpass123")
+        end_date = timezone.now() + timedelta(days=1)
+        self.in_description = Task.objects.create(
+            name="Preparation", description="Collect reports for the quarter", owner=self.owner, end_date=end_date
+        )
+        self.in_name = Task.objects.create(
+            name="Quarterly report", description="For accounting", owner=self.owner, end_date=end_date
+        )
+        Task.objects.create(name="Buy milk", description="Shop", owner=self.owner, end_date=end_date)
+        Task.objects.create(name="Report for the quarter", description="Someone else's task", owner=self.other, end_date=end_date)
+        self.client.force_authenticate(user=self.owner)
+
+    def _search(self, text):
+        response = self.client.get(reverse("task:task-list"), {"q": text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task["uuid"] for task in response.data["results"]]
+
+    def test_search_by_word_prefix_and_rank(self):
+        self.assertEqual(self._search("reports"), [str(self.in_name.uuid), str(self.in_description.uuid)])
+        self.assertEqual(self._search("rep quart"), [str(self.in_name.uuid), str(self.in_description.uuid)])
+        self.assertEqual(self._search("account"), [str(self.in_name.uuid)])
+
+    def test_no_matches(self):
+        self.assertEqual(self._search("vacation"), [])
+        self.assertEqual(self._search("!!!"), [])
+        self.assertEqual(len(self._search("  ")), 3)
+
+    def test_search_vector_follows_updates(self):
+        Task.objects.filter(pk=self.in_description.pk).update(description="Vacation")
+        self.assertEqual(self._search("vacation"), [str(self.in_description.uuid)])
+
+    def test_admin_search(self):
+        admin = User.objects.create_superuser(email="admin@example.com", password="testpass123")
+        self.client.force_login(admin)
+        response = self.client.get(reverse("admin:tasks_task_changelist"), {"q": "mil"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task.name for task in response.context["cl"].result_list], ["Buy milk"])
+
+
+class TaskFilterTest(APITestCase):
+    """Фильтры и сортировка списка задач"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        self.assignee = User.objects.create_user(email="assignee@example.com", password="testpass123")
+        now = timezone.now()
+        self.overdue = Task.objects.create(
+            name="Overdue", description="Description", owner=self.owner, status="WORK", end_date=now + timedelta(hours=1)
+        )
+        Task.objects.filter(pk=self.overdue.pk).update(end_date=now - timedelta(days=1))
+        self.assigned = Task.objects.create(
+            name="Assigned", description="Description", owner=self.owner, assignee=self.assignee,
+            end_date=now + timedelta(days=2),
+        )
+        self.done = Task.objects.create(
+            name="Done", description="Description", owner=self.owner, status="DONE", end_date=now + timedelta(days=3)
+        )
+        self.client.force_authenticate(user=self.owner)
+        self.url = reverse("task:task-list")
+
+    def _names(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task["name"] for task in response.data["results"]]
+
+    def test_filters(self):
+        self.assertEqual(self._names(status=["NEW", "DONE"]), ["Done", "Assigned"])
+        self.assertEqual(self._names(assignee=self.assignee.pk), ["Assigned"])
+        self.assertEqual(self._names(overdue="true"), ["Overdue"])
+        self.assertEqual(self._names(overdue="false"), ["Done", "Assigned"])
+        self.assertEqual(
+            self._names(end_from=timezone.now().isoformat(), end_to=(timezone.now() + timedelta(days=2.5)).isoformat()),
+            ["Assigned"],
+        )
+
+    def test_ordering(self):
+        self.assertEqual(self._names(ordering="end_date"), ["Overdue", "Assigned", "Done"])
+        self.assertEqual(self._names(ordering="-end_date"), ["Done", "Assigned", "Overdue"])
+        self.assertEqual(self._names(ordering="created_at"), ["Overdue", "Assigned", "Done"])
+        # Поля вне ordering_fields игнорируются, как в OrderingFilter
+        self.assertEqual(self._names(ordering="name"), ["Done", "Assigned", "Overdue"])
+
+    def test_cursor_pagination_follows_ordering(self):
+        response = self.client.get(self.url, {"ordering": "end_date", "pagination": "cursor", "page_size": 2})
+        self.assertEqual([task["name"] for task in response.data["results"]], ["Overdue", "Assigned"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([task["name"] for task in response.data["results"]], ["Done"])
+
+    def test_invalid_params(self):
+        for params in ({"status": "LOST"}, {"assignee": "me"}, {"end_from": "завтра"}, {"overdue": "maybe"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskFilterPlanTest(APITestCase):
+    """
+    Каждое сочетание фильтров и сортировки выполняется по индексу.
+
+    Запросы списка (выборка, COUNT и агрегат для ETag) перехватываются и проверяются через
+    EXPLAIN с enable_seqscan = off: если подходящего индекса нет, план все равно содержит
+    Seq Scan.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123")
+        self.assignee = User.objects.create_user(email="assignee@example.com", password="testpass123")
+        Task.objects.create(
+            name="Report", description="Description", owner=self.owner, assignee=self.assignee,
+            end_date=timezone.now() + timedelta(days=1),
+        )
+        self.client.force_authenticate(user=self.owner)
+
+    def _plans(self, params):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("task:task-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        plans = []
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            for query in queries:
+                if '"tasks"' in query["sql"] and query["sql"].startswith("SELECT"):
+                    cursor.execute(f"EXPLAIN {query['sql']}")
+                    plans.append("\n".join(row[0] for row in cursor.fetchall()))
+        self.assertTrue(plans)
+        return plans
+
+    def test_no_seq_scan(self):
+        now = timezone.now()
+        options = {
+            "status": [None, ["NEW", "WORK"]],
+            "assignee": [None, self.assignee.pk],
+            "end": [None, (now.isoformat(), (now + timedelta(days=7)).isoformat())],
+            "overdue": [None, "true", "false"],
+            "q": [None, "report"],
+            "ordering": [None, "created_at", "end_date", "-end_date"],
+        }
+        for values in itertools.product(*options.values()):
+            combination = dict(zip(options, values))
+            params = {key: value for key, value in combination.items() if value is not None and key != "end"}
+            if combination["end"]:
+                params["end_from"], params["end_to"] = combination["end"]
+            with self.subTest(params=params):
+                for plan in self._plans(params):
+                    self.assertNotIn("Seq Scan on tasks", plan)
+
+    def test_expected_indexes(self):
+        # На объеме, близком к рабочему, планировщик выбирает самый избирательный индекс
+        owners = [self.owner.pk] + [
+            User.objects.create_user(email=f"owner{i}@example.com", password="testpass123").pk for i in range(19)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_TASKS_SQL, {
+                "statuses": SEED_STATUSES, "owners": owners, "assignees": owners, "rows": 20000,
+            })
+            cursor.execute("ANALYZE tasks")
+        now = timezone.now()
+        cases = [
+            ({}, "tasks_owner_created_idx"),
+            ({"status": "NEW"}, "tasks_owner_status_idx"),
+            ({"ordering": "end_date"}, "tasks_owner_end_idx"),
+            ({"end_from": now.isoformat(), "end_to": (now + timedelta(days=1)).isoformat()}, "tasks_owner_end_idx"),
+            ({"overdue": "true"}, "tasks_owner_open_due_idx"),
+            ({"assignee": self.assignee.pk}, "tasks_assignee_status_due_idx"),
+        ]
+        for params, index in cases:
+            with self.subTest(params=params):
+                self.assertIn(index, self._plans(params)[-1])
+
+
+class TaskStatsTest(APITestCase):
+    """Сводка task_stats обновляется вместе с задачами"""
+
+    def setUp(self):
+        cache.clear()
+        chat_user_cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123", telegram_chat_id="100")
+        self.assignee = User.objects.create_user(
+            email="assignee@example.com", password="testpass123", telegram_chat_id="200"
+        )
+        self.now = timezone.now()
+
+    def _create(self, status="NEW", days=1, **fields):
+        return Task.objects.create(
+            name="Task", description="Description", owner=self.owner, status=status,
+            end_date=self.now + timedelta(days=days), **fields,
+        )
+
+    def assertStatsConsistent(self):
+        out = StringIO()
+        call_command("rebuild_task_stats", dry_run=True, stdout=out)
+        self.assertIn("расхождений: 0", out.getvalue())
+
+    def test_create_update_delete(self):
+        first = self._create(days=3)
+        second = self._create(days=1)
+        self._create(status="DONE", days=5)
+        stats = get_owner_stats(self.owner.pk)
+        self.assertEqual(stats["by_status"], {"NEW": 2, "WORK": 0, "REVIEW": 0, "DONE": 1, "REJECTED": 0})
+        self.assertEqual((stats["total"], stats["open"], stats["overdue"]), (3, 2, 0))
+        self.assertEqual(stats["next_end_date"], second.end_date)
+
+        second.delete()
+        self.assertEqual(get_owner_stats(self.owner.pk)["next_end_date"], first.end_date)
+        first.end_date = self.now + timedelta(hours=1)
+        first.save()
+        self.assertEqual(get_owner_stats(self.owner.pk)["next_end_date"], first.end_date)
+        Task.objects.filter(pk=first.pk).update(status="DONE")
+        stats = get_owner_stats(self.owner.pk)
+        self.assertEqual((stats["by_status"]["NEW"], stats["by_status"]["DONE"], stats["next_end_date"]), (0, 2, None))
+        self.assertStatsConsistent()
+
+    def test_bulk_and_bot_transitions(self):
+        Task.objects.bulk_create([
+            Task(name=f"Task {i}", description="Description", owner=self.owner, assignee=self.assignee,
+                 end_date=self.now + timedelta(days=i + 1))
+            for i in range(5)
+        ])
+        task = Task.objects.order_by("end_date").first()
+        transition_task("accept", task.uuid, 200)
+        transition_task("review", task.uuid, 200)
+        stats = get_owner_stats(self.owner.pk)
+        self.assertEqual((stats["by_status"]["NEW"], stats["by_status"]["REVIEW"]), (4, 1))
+        transition_task("done", task.uuid, 100)
+        self.assertEqual(get_owner_stats(self.owner.pk)["by_status"]["DONE"], 1)
+        self.assertStatsConsistent()
+
+    def test_overdue(self):
+        overdue = self._create(days=1)
+        Task.objects.filter(pk=overdue.pk).update(end_date=self.now - timedelta(days=1))
+        self._create(days=2)
+        stats = get_owner_stats(self.owner.pk)
+        self.assertEqual((stats["overdue"], stats["next_end_date"]), (1, self.now - timedelta(days=1)))
+
+    def test_owner_deleted(self):
+        self._create()
+        self.owner.delete()
+        self.assertFalse(TaskStats.objects.exists())
+
+    def test_endpoint(self):
+        self._create(status="WORK")
+        self.client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("task:task-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["by_status"]["WORK"], 1)
+        self.assertEqual(response.data["open"], 1)
+
+    def test_rebuild(self):
+        task = self._create()
+        TaskStats.objects.filter(owner_id=self.owner.pk).update(count=7, next_end_date=None)
+        TaskStats.objects.create(owner_id=self.owner.pk, status="DONE", count=3)
+        out = StringIO()
+        call_command("rebuild_task_stats", owner=self.owner.pk, stdout=out)
+        self.assertIn("Исправлено расхождений: 2", out.getvalue())
+        stats = get_owner_stats(self.owner.pk)
+        self.assertEqual((stats["total"], stats["next_end_date"]), (1, task.end_date))
+        self.assertStatsConsistent()
+
+
+class TaskAssignedTest(APITestCase):
+    """Задачи исполнителя /task/assigned/"""
+
+    def setUp(self):
+        cache.clear()
+        chat_user_cache.clear()
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123", telegram_chat_id="100")
+        self.assignee = User.objects.create_user(
+            email="assignee@example.com", password="testpass123", telegram_chat_id="200"
+        )
+        self.other = User.objects.create_user(email="other@example.com", password="testpass123")
+        now = timezone.now()
+        self.later = Task.objects.create(
+            name="Later", description="Description", owner=self.owner, assignee=self.assignee,
+            end_date=now + timedelta(days=3),
+        )
+        self.sooner = Task.objects.create(
+            name="Sooner", description="Description", owner=self.owner, assignee=self.assignee,
+            end_date=now + timedelta(days=1),
+        )
+        Task.objects.create(
+            name="Other", description="Description", owner=self.owner, assignee=self.other,
+            end_date=now + timedelta(days=2),
+        )
+        self.url = reverse("task:task-assigned")
+
+    def _names(self, user=None, **params):
+        self.client.force_authenticate(user=user or self.assignee)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task["name"] for task in response.data["results"]]
+
+    def test_list(self):
+        self.assertEqual(self._names(), ["Sooner", "Later"])
+        Task.objects.filter(pk=self.later.pk).update(status="DONE")
+        cache.clear()
+        self.assertEqual(self._names(), ["Sooner"])
+        self.assertEqual(self._names(status="DONE"), ["Later"])
+        Task.objects.filter(pk=self.later.pk).update(status="NEW")
+        cache.clear()
+        self.assertEqual(self._names(ordering="-end_date"), ["Later", "Sooner"])
+        self.assertEqual(self._names(user=self.owner), [])
+        # Список владельца не изменился
+        self.client.force_authenticate(user=self.assignee)
+        self.assertEqual(self.client.get(reverse("task:task-list")).data["results"], [])
+
+    def test_cursor_pagination(self):
+        self.client.force_authenticate(user=self.assignee)
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 1})
+        self.assertEqual([task["name"] for task in response.data["results"]], ["Sooner"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([task["name"] for task in response.data["results"]], ["Later"])
+
+    def test_cache_invalidated_by_owner_and_bot(self):
+        self.assertEqual(self._names(), ["Sooner", "Later"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_authenticate(user=self.owner)
+            response = self.client.patch(
+                reverse("task:task-detail", args=[self.later.uuid]), {"assignee": self.other.pk}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._names(), ["Sooner"])
+        self.assertEqual(self._names(user=self.other), ["Other", "Later"])
+
+        self.assertEqual(self._names(status="WORK"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_task("accept", self.sooner.uuid, 200)
+        self.assertEqual(self._names(status="WORK"), ["Sooner"])
+
+    def test_stats(self):
+        Task.objects.filter(pk=self.sooner.pk).update(status="WORK", end_date=timezone.now() - timedelta(hours=1))
+        self.client.force_authenticate(user=self.assignee)
+        response = self.client.get(reverse("task:task-assigned-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["by_status"]["NEW"], 1)
+        self.assertEqual(response.data["by_status"]["WORK"], 1)
+        self.assertEqual((response.data["total"], response.data["open"], response.data["overdue"]), (2, 2, 1))
+        self.assertLess(response.data["next_end_date"], timezone.now())
+
+    def test_first_page_uses_assignee_index(self):
+        # Исполнителей много, и на каждого приходится малая доля задач, как в реальной базе
+        assignees = [self.assignee.pk] + [
+            user.pk for user in User.objects.bulk_create(User(email=f"bench-{i}@example.com") for i in range(500))
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_TASKS_SQL, {
+                "statuses": SEED_STATUSES, "owners": [self.owner.pk], "assignees": assignees, "rows": 20000,
+            })
+            cursor.execute("ANALYZE tasks")
+        self.client.force_authenticate(user=self.assignee)
+        for params in ({}, {"status": ["NEW", "WORK"]}, {"overdue": "true"}):
+            with self.subTest(params=params), CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url, params)
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN {queries[-1]['sql']}")
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+            self.assertIn("tasks_assignee_status_due_idx", plan)
+
+
+@override_settings(TASK_REMINDERS={
+    "WINDOWS": [timedelta(days=1), timedelta(hours=1)], "BATCH_SIZE": 2, "INTERVAL": timedelta(minutes=1),
+})
+class TaskReminderTest(TestCase):
+    """Напоминания о сроках задач (tasks/reminders.py)"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123", telegram_chat_id="100")
+        self.assignee = User.objects.create_user(
+            email="assignee@example.com", password="testpass123", telegram_chat_id="200"
+        )
+        self.now = timezone.now()
+
+    def _task(self, name, due_in, assignee=True, status="NEW"):
+        task = Task.objects.create(
+            name=name, description="Description", owner=self.owner,
+            assignee=self.assignee if assignee else None, end_date=self.now + due_in,
+        )
+        Task.objects.filter(pk=task.pk).update(status=status)
+        return task
+
+    def _run(self, now=None):
+        """Сообщения, записанные в outbox одним запуском"""
+        sent = send_due_reminders(now=now or self.now)
+        messages = list(NotificationOutbox.objects.order_by("pk").values_list("chat_id", "text"))
+        NotificationOutbox.objects.all().delete()
+        self.assertEqual(sent, len(messages))
+        return messages
+
+    def test_reminds_once_per_window(self):
+        task = self._task("Soon", timedelta(hours=5))
+        messages = self._run()
+        self.assertEqual(len(messages), 1)
+        chat_id, text = messages[0]
+        self.assertEqual(chat_id, "200")
+        self.assertIn("1 дн.", text)
+        self.assertIn(str(task.uuid), text)
+        self.assertEqual(self._run(), [])
+
+        messages = self._run(self.now + timedelta(hours=4, minutes=30))
+        self.assertEqual(len(messages), 1)
+        self.assertIn("1 ч", messages[0][1])
+        self.assertEqual(self._run(self.now + timedelta(hours=4, minutes=45)), [])
+
+    def test_single_reminder_inside_smallest_window(self):
+        self._task("Very soon", timedelta(minutes=30))
+        messages = self._run()
+        self.assertEqual(len(messages), 1)
+        self.assertIn("1 ч", messages[0][1])
+        self.assertEqual(TaskReminder.objects.count(), 2)
+        self.assertEqual(self._run(), [])
+
+    def test_skips_closed_overdue_and_distant(self):
+        self._task("Done", timedelta(hours=2), status="DONE")
+        self._task("Overdue", timedelta(hours=-1))
+        self._task("Distant", timedelta(days=3))
+        self._task("Unassigned", timedelta(hours=2), assignee=False)
+        self.assertEqual([chat_id for chat_id, _ in self._run()], ["100"])
+
+    def test_batches_and_moved_deadline(self):
+        tasks = [self._task(f"Task {i}", timedelta(hours=2 + i)) for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self._run()), 5)
+        claims = [query for query in queries.captured_queries if query["sql"].lstrip().startswith("WITH due AS")]
+        # Пустой проход окна "за час" и пачки 2, 2, 1 окна "за сутки"
+        self.assertEqual(len(claims), 4)
+        self.assertEqual(TaskReminder.objects.filter(window=timedelta(days=1)).count(), 5)
+
+        Task.objects.filter(pk=tasks[0].pk).update(end_date=self.now + timedelta(hours=10))
+        self.assertEqual(len(self._run()), 1)
+
+    def test_beat_task(self):
+        self._task("Soon", timedelta(hours=5))
+        with mock.patch("tasks.tasks.drain_notification_outbox.apply_async") as apply_async:
+            send_task_reminders()
+        apply_async.assert_called_once()
+        self.assertTrue(NotificationOutbox.objects.get().dedup_key.startswith("reminder:"))
+        self.assertEqual(settings.CELERY_BEAT_SCHEDULE["send-task-reminders"]["task"], send_task_reminders.name)
+
+    def test_claim_uses_open_due_index(self):
+        users = [self.owner.pk, self.assignee.pk]
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_TASKS_SQL, {
+                "statuses": SEED_STATUSES, "owners": users, "assignees": users, "rows": 20000,
+            })
+            cursor.execute("ANALYZE tasks")
+            cursor.execute(f"EXPLAIN {CLAIM_SQL}", {
+                "now": self.now, "horizon": self.now + timedelta(hours=1), "window": timedelta(hours=1),
+                "windows": [timedelta(hours=1)], "after_end_date": self.now,
+                "after_uuid": "00000000-0000-0000-0000-000000000000", "limit": 500,
+            })
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("tasks_open_due_idx", plan)
+
+
+class NotificationOutboxTest(TransactionTestCase):
+    """
+    Разбор outbox (tasks/outbox.py).
+
+    TransactionTestCase: обработчики в потоках работают в своих соединениях и должны видеть
+    закоммиченные строки.
+    """
+
+    def setUp(self):
+        add_notifications([(f"test:{i}", str(i), f"Message {i}", {}) for i in range(60)])
+
+    def test_parallel_drainers_do_not_share_rows(self):
+        sent = []
+        lock = threading.Lock()
+
+        def send(row):
+            time.sleep(0.001)
+            with lock:
+                sent.append(row.dedup_key)
+
+        def drain():
+            try:
+                while drain_batch(send, 5):
+                    pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=drain) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(sent), sorted(f"test:{i}" for i in range(60)))
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_failed_batch_stays_in_outbox(self):
+        def send(row):
+            raise ConnectionError("broker is down")
+
+        with self.assertRaises(ConnectionError):
+            drain_batch(send, 10)
+        self.assertEqual(NotificationOutbox.objects.count(), 60)
+
+    def test_pending_duplicate_skipped(self):
+        add_notifications([("test:0", "0", "Duplicate", {})])
+        self.assertEqual(NotificationOutbox.objects.get(dedup_key="test:0").text, "Message 0")
+
+    def test_drain_task(self):
+        with override_settings(NOTIFICATION_OUTBOX={**settings.NOTIFICATION_OUTBOX, "BATCH_SIZE": 7}), \
+                mock.patch("tasks.tasks.send_telegram_message.delay") as delay:
+            drain_notification_outbox()
+        self.assertEqual(delay.call_count, 60)
+        self.assertEqual(delay.call_args_list[0].args, ("0", "Message 0"))
+        self.assertEqual(delay.call_args_list[0].kwargs, {"dedup_key": "test:0"})
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+
+class NotificationDigestTest(APITestCase):
+    """Дайджесты уведомлений одного чата (NOTIFICATION_OUTBOX['COALESCE_WINDOW'])"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="testpass123", telegram_chat_id="100")
+        self.assignee = User.objects.create_user(
+            email="assignee@example.com", password="testpass123", telegram_chat_id="200"
+        )
+        self.client.force_authenticate(user=self.owner)
+        end_date = (timezone.now() + timedelta(days=1)).isoformat()
+        with mock.patch("tasks.views.schedule_outbox_drain"):
+            self.tasks = self.client.post(reverse("task:task-bulk"), [
+                {"name": f"Bulk {i}", "description": "Description", "end_date": end_date, "assignee": self.assignee.pk}
+                for i in range(50)
+            ], format="json").data
+
+    def _drain(self):
+        options = {**settings.NOTIFICATION_OUTBOX, "COALESCE_WINDOW": 5}
+        with override_settings(NOTIFICATION_OUTBOX=options), \
+                mock.patch("tasks.tasks.send_telegram_message.delay") as delay:
+            drain_notification_outbox()
+        return delay.call_args_list
+
+    def test_waits_for_window(self):
+        self.assertEqual(self._drain(), [])
+        self.assertEqual(NotificationOutbox.objects.count(), 100)
+
+    def test_bulk_assignment_coalesced(self):
+        NotificationOutbox.objects.update(created_at=timezone.now() - timedelta(seconds=10))
+        calls = self._drain()
+
+        # 100 уведомлений - не больше 10 сообщений, каждое в пределах лимитов Telegram
+        self.assertLessEqual(len(calls), 10)
+        self.assertEqual({call.args[0] for call in calls}, {"100", "200"})
+        callbacks = []
+        for call in calls:
+            self.assertLessEqual(len(call.args[1].encode("utf-16-le")) // 2, 4096)
+            keyboard = call.kwargs.get("reply_markup", {}).get("inline_keyboard", [])
+            buttons = [button for row in keyboard for button in row]
+            self.assertLessEqual(len(buttons), 100)
+            callbacks += [button["callback_data"] for button in buttons]
+        self.assertEqual(sorted(callbacks), sorted(
+            f"{action}_{task['uuid']}" for task in self.tasks for action in ("accept", "reject")
+        ))
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_single_notification_sent_as_is(self):
+        NotificationOutbox.objects.exclude(dedup_key=f"task:{self.tasks[0]['uuid']}:owner").delete()
+        NotificationOutbox.objects.update(created_at=timezone.now() - timedelta(seconds=10))
+        calls = self._drain()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0].kwargs["dedup_key"], f"task:{self.tasks[0]['uuid']}:owner")
+
+    def test_digest_button_keeps_other_tasks(self):
+        from tasks.telegram_bot import edit_task_message
+
+        first, second = self.tasks[0]["uuid"], self.tasks[1]["uuid"]
+        markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("1. ✅", callback_data=f"accept_{first}"),
+             InlineKeyboardButton("1. ❌", callback_data=f"reject_{first}")],
+            [InlineKeyboardButton("2. ✅", callback_data=f"accept_{second}")],
+        ])
+        query = mock.AsyncMock()
+        query.message = mock.Mock(reply_markup=markup, reply_text=mock.AsyncMock())
+        asyncio.run(edit_task_message(query, first, text="Принята"))
+        query.edit_message_text.assert_not_called()
+        remaining = query.edit_message_reply_markup.call_args.kwargs["reply_markup"].inline_keyboard
+        self.assertEqual([[button.callback_data for button in row] for row in remaining], [[f"accept_{second}"]])
+        query.message.reply_text.assert_called_once_with(text="Принята")
+
+        query.message.reply_markup = InlineKeyboardMarkup([remaining[0]])
+        asyncio.run(edit_task_message(query, second, text="Принята"))
+        query.edit_message_text.assert_called_once_with(text="Принята")
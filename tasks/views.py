@@ -1,55 +1,357 @@
+import csv
+import hashlib
 from datetime import datetime
+from itertools import islice
 
-from rest_framework import viewsets
-import asyncio
-import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
-from .models import Task
-from .paginators import MyPagination
+from config.renderers import FastJSONRenderer
+
+from .cache import invalidate_assignee_cache, invalidate_owner_cache, response_cache_key
+from .filters import TaskFilter, TaskOrderingFilter
+from .models import OPEN_STATUSES, Task
+from .outbox import add_notifications
+from .paginators import MyPagination, TaskCursorPagination
 from .permissions import IsOwner
-from .serializers import TaskSerializer
-from .tasks import send_telegram_notification
+from .search import TaskSearchFilter
+from .stats import get_assignee_stats, get_owner_stats
+from .serializers import TaskBulkSerializer, TaskExportFilterSerializer, TaskSerializer, ValuesSerializer
+from .sync import get_changes
+from .tasks import new_task_messages, schedule_outbox_drain
 
 
 class TaskViewSet(viewsets.ModelViewSet):
     queryset = Task.objects.all()
     pagination_class = MyPagination
+    cursor_pagination_class = TaskCursorPagination
     serializer_class = TaskSerializer
     permission_classes = [
         IsOwner,
     ]
+    filter_backends = [TaskFilter, TaskSearchFilter, TaskOrderingFilter]
+    ordering_fields = ["created_at", "end_date"]  # Только поля с индексами (owner, поле, uuid)
+    owner_ordering = ["-created_at"]
+    assignee_ordering = ["end_date"]  # Исполнителю важнее ближайшие сроки
+    assignee_actions = ("assigned", "assigned_stats")
+    bulk_max_items = 10000  # Максимум задач в одном запросе /task/bulk/
+    response_cache_timeout = 300  # Секунд; изменения задач сбрасывают кэш раньше
+    # Параметры, с которыми ответ зависит от текущего времени, а не только от изменений задач
+    time_dependent_params = ("overdue",)
+    export_chunk_size = 2000  # Строк, читаемых из серверного курсора и отправляемых клиенту за раз
 
     def get_queryset(self):
-        """Возвращает только документы, в которых пользователь числится владельцем."""
+        """
+        Возвращает только документы, в которых пользователь числится владельцем
+        (для /task/assigned/ - исполнителем).
+        """
         user = self.request.user
         queryset = super().get_queryset()
 
         if user.is_authenticated:
-            return queryset.filter(owner=user)
+            # owner нужен сериализатору для owner_email
+            if self.cache_scope == "assignee":
+                queryset = queryset.filter(assignee=user).select_related("owner")
+                # Без ?status= только незакрытые: закрытые не сортируются ради первой страницы
+                if "status" not in self.request.query_params:
+                    queryset = queryset.filter(status__in=OPEN_STATUSES)
+                return queryset
+            return queryset.filter(owner=user).select_related("owner")
         return queryset.none()
 
-    def _run_async_in_thread(
-            self, task_uuid, chat_id_owner, chat_id_assignee, message_lines_owner, message_lines_assignee):
-        """Запуск асинхронной функции в отдельном потоке"""
-        def run_async():
-            # Создаем новый event loop для этого потока
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    send_telegram_notification(
-                        task_uuid, chat_id_owner, chat_id_assignee, message_lines_owner, message_lines_assignee)
-                )
-            finally:
-                loop.close()
+    @property
+    def cache_scope(self):
+        """Чьи задачи показывает действие: владельца или исполнителя"""
+        return "assignee" if self.action in self.assignee_actions else "owner"
+
+    @property
+    def ordering(self):
+        """Сортировка по умолчанию для TaskOrderingFilter"""
+        return self.assignee_ordering if self.cache_scope == "assignee" else self.owner_ordering
+
+    @property
+    def paginator(self):
+        """
+        Пагинатор выбирается на каждый запрос: `?pagination=cursor` (или уже полученный
+        курсор в `?cursor=`) включает keyset-пагинацию, иначе используется постраничная.
+        """
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params if self.request is not None else {}
+            cursor_class = self.cursor_pagination_class
+            if params.get("pagination") == "cursor" or cursor_class.cursor_query_param in params:
+                self._paginator = cursor_class()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(self._values_list, request, *args, **kwargs)
+
+    def _values_list(self, request, *args, **kwargs):
+        """
+        Список строится из .values() без объектов Task и полей DRF на каждую строку
+        (см. ValuesSerializer); вывод совпадает с TaskSerializer.
+        """
+        values_serializer = ValuesSerializer(self.get_serializer_class(), context=self.get_serializer_context())
+        queryset = values_serializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, view, request, *args, **kwargs):
+        """
+        Отдает сохраненные данные ответа без обращения к базе и сериализатору.
+
+        Ключ включает полный адрес запроса (с параметрами и хостом - от него зависят ссылки
+        пагинации), формат ответа и поколение задач владельца, которое меняется при любом
+        их изменении.
+        Вместе с данными хранятся ETag и Last-Modified; при совпадении If-None-Match
+        клиент получает 304 без тела.
+
+        Ответы с time_dependent_params (например, `?overdue=`) не кэшируются: задача
+        становится просроченной без изменения. ETag для них считается на каждый запрос.
+        """
+        cacheable = not any(request.query_params.get(param) for param in self.time_dependent_params)
+        key = response_cache_key(
+            request.user.pk, request.build_absolute_uri(), self.cache_scope, request.accepted_media_type or ""
+        )
+        entry = cache.get(key) if cacheable else None
+        if entry is None:
+            validators = self._get_validators(request, kwargs)
+            if validators is None:
+                return view(request, *args, **kwargs)
+            if self._not_modified(request, validators[0]):
+                return self._conditional_response(Response(status=status.HTTP_304_NOT_MODIFIED), *validators)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            if cacheable:
+                cache.set(key, (response.data, *validators), self.response_cache_timeout)
+            return self._conditional_response(response, *validators)
+
+        data, etag, last_modified = entry
+        if self._not_modified(request, etag):
+            return self._conditional_response(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+        return self._conditional_response(Response(data), etag, last_modified)
+
+    def _get_validators(self, request, kwargs):
+        """
+        ETag и Last-Modified по агрегату Count/Max(updated_at) без выборки и сериализации задач.
+
+        Для списка агрегат считается по всем задачам владельца: удаление меняет количество,
+        а создание и изменение - максимальный updated_at. Параметры запроса (страница,
+        курсор) и формат ответа входят в ETag. Для несуществующей задачи возвращает None.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        try:
+            if lookup is not None:
+                queryset = queryset.filter(**{self.lookup_field: lookup})
+            aggregate = queryset.aggregate(count=Count("pk"), last_modified=Max("updated_at"))
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if lookup is not None and not aggregate["count"]:
+            return None
 
-        thread = threading.Thread(target=run_async)
-        thread.start()
+        last_modified = aggregate["last_modified"]
+        version = ":".join([
+            request.get_full_path(),
+            request.accepted_media_type or "",
+            str(aggregate["count"]),
+            last_modified.isoformat() if last_modified else "",
+        ])
+        return quote_etag(hashlib.md5(version.encode()).hexdigest()), last_modified
 
+    @staticmethod
+    def _not_modified(request, etag):
+        # If-Modified-Since не проверяется: удаление задачи не меняет Max(updated_at), и по
+        # Last-Modified клиент получил бы 304 со списком, в котором еще есть удаленная задача
+        return get_conditional_response(request, etag=etag) is not None
+
+    @staticmethod
+    def _conditional_response(response, etag, last_modified):
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        # Браузер не должен отдавать страницу из своего кэша без проверки ETag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        """Явно устанавливаем владельца перед сохранением."""
+        """
+        Явно устанавливаем владельца перед сохранением.
+
+        Уведомления пишутся в outbox в той же транзакции, что и задача: откат не оставит
+        уведомления о несуществующей задаче, а падение процесса после коммита его не потеряет.
+        """
         task = serializer.save(owner=self.request.user) # Чтобы получить uuid текущей задачи
 
+        if task.assignee and task.assignee.telegram_chat_id:
+            chat_id_assignee = task.assignee.telegram_chat_id
+            # Получаем chat id исполнителя задачи
+        else:
+            chat_id_assignee = None
+
+        add_notifications(new_task_messages(*self._notification_args(task, chat_id_assignee)))
+        transaction.on_commit(schedule_outbox_drain)
+        invalidate_owner_cache(task.owner_id)
+        invalidate_assignee_cache(task.assignee_id)
+
+    def perform_update(self, serializer):
+        previous_assignee_id = serializer.instance.assignee_id
+        task = serializer.save()
+        invalidate_owner_cache(task.owner_id)
+        invalidate_assignee_cache(previous_assignee_id, task.assignee_id)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_owner_cache(instance.owner_id)
+        invalidate_assignee_cache(instance.assignee_id)
+
+    @action(detail=False, methods=["get"], url_path="assigned")
+    def assigned(self, request):
+        """
+        Задачи, в которых пользователь - исполнитель, по умолчанию ближайшие сроки сверху.
+
+        Без `?status=` показываются только незакрытые задачи, закрытые - через
+        `?status=DONE` и т.д. Фильтры, сортировка, пагинация и кэш те же, что у списка
+        владельца; выборка идет по индексу tasks_assignee_status_due_idx.
+        """
+        return self._cached_response(self._values_list, request)
+
+    @action(detail=False, methods=["get"], url_path="assigned/stats")
+    def assigned_stats(self, request):
+        """Число задач исполнителя по статусам, просроченные и ближайший срок"""
+        return Response(get_assignee_stats(request.user.pk))
+
+    @action(detail=False, methods=["get"], url_path="sync")
+    def sync(self, request):
+        """
+        Изменения задач с момента прошлой синхронизации.
+
+        Клиент передает `?token=` из предыдущего ответа (без него отдаются все задачи) и
+        получает измененные и созданные задачи, uuid удаленных и новый токен. Пока
+        `has_more` истинно, нужно сразу запросить следующую страницу с новым токеном.
+        """
+        limit = None
+        if "page_size" in request.query_params:
+            limit = serializers.IntegerField(min_value=1, max_value=settings.TASK_SYNC["PAGE_SIZE"]).run_validation(
+                request.query_params["page_size"]
+            )
+        tasks, deleted, token, has_more = get_changes(request.user.pk, request.query_params.get("token"), limit)
+        return Response({
+            "changed": self.get_serializer(tasks, many=True).data,
+            "deleted": deleted,
+            "token": token,
+            "has_more": has_more,
+        })
+
+    @action(detail=False, methods=["get"], url_path="stats")
+    def stats(self, request):
+        """Число задач по статусам, просроченные и ближайший срок (см. get_owner_stats)"""
+        return Response(get_owner_stats(request.user.pk))
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """
+        Выгрузка всех задач владельца одним потоковым ответом.
+
+        `?output=ndjson` (по умолчанию, объект TaskSerializer на строку) или `?output=csv`;
+        фильтры те же, что у списка (TaskFilter). Задачи читаются серверным курсором
+        порциями по export_chunk_size, так что память не зависит от числа задач.
+
+        Под ASGI ответ получает асинхронный итератор: синхронный Django прочитал бы
+        целиком через sync_to_async(list) до отправки первого байта.
+        """
+        params = TaskExportFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        output = params.validated_data["output"]
+
+        values_serializer = ValuesSerializer(self.get_serializer_class(), context=self.get_serializer_context())
+        queryset = params.filter_queryset(self.get_queryset()).order_by("-created_at", "-uuid")
+        rows = values_serializer.iter_representation(
+            values_serializer.values(queryset).iterator(chunk_size=self.export_chunk_size)
+        )
+        if output == "csv":
+            fields = [name for name, _, _ in values_serializer.fields]
+            content, content_type = self._export_csv(rows, fields), "text/csv; charset=utf-8"
+        else:
+            content, content_type = self._export_ndjson(rows), "application/x-ndjson"
+
+        if isinstance(request._request, ASGIRequest):
+            content = _iterate_in_thread(content)
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="tasks.{output}"'
+        return response
+
+    def _export_chunks(self, rows):
+        while chunk := list(islice(rows, self.export_chunk_size)):
+            yield chunk
+
+    def _export_ndjson(self, rows):
+        renderer = FastJSONRenderer()
+        for chunk in self._export_chunks(rows):
+            yield b"".join(renderer.render(row) + b"\n" for row in chunk)
+
+    def _export_csv(self, rows, fields):
+        buffer = _LineBuffer()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        yield buffer.flush()
+        for chunk in self._export_chunks(rows):
+            writer.writerows(chunk)
+            yield buffer.flush()
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Массовое создание задач: список объектов в теле запроса.
+
+        Все элементы проверяются за один проход, исполнители - одним запросом, а задачи и
+        уведомления в outbox вставляются через bulk_create в одной транзакции.
+        """
+        serializer = TaskBulkSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.bulk_max_items,
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            tasks = serializer.save(owner=request.user)
+            add_notifications([
+                message
+                for task in tasks
+                for message in new_task_messages(
+                    *self._notification_args(task, serializer.assignee_chat_ids.get(task.assignee_id))
+                )
+            ])
+            transaction.on_commit(schedule_outbox_drain)
+            invalidate_owner_cache(request.user.pk)
+            invalidate_assignee_cache(*(task.assignee_id for task in tasks))
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _notification_args(self, task, chat_id_assignee):
+        """Аргументы new_task_messages для новой задачи"""
         message_lines_owner = [
             f"🎯 *Задача: {task.name}*",
             f"🆔 ID: `{task.uuid}`",
@@ -75,18 +377,38 @@ class TaskViewSet(viewsets.ModelViewSet):
             f"до {task.end_date.strftime('%d.%m.%Y в %H:%M')}"
         ]
 
-        chat_id_owner = self.request.user.telegram_chat_id
+        # Сообщения хранятся в JSON (outbox), поэтому передаем только примитивные данные
+        return [
+            str(task.uuid),
+            self.request.user.telegram_chat_id,
+            chat_id_assignee,
+            message_lines_owner,
+            message_lines_assignee,
+        ]
 
-        if task.assignee and task.assignee.telegram_chat_id:
-            chat_id_assignee = task.assignee.telegram_chat_id
-            # Получаем chat id исполнителя задачи
-        else:
-            chat_id_assignee = None
 
-        # Celery не может сериализовать объекты, поэтому передаем только примитивные данные
-        # Поэтому вместо списка, строка, а вместо объекта self.request.user, self.request.user.telegram_chat_id
-        # Так как Celery асинхронный, вместе с асинхронными задачами не используем
+async def _iterate_in_thread(iterable):
+    """
+    Асинхронный итератор по синхронному iterable: каждый элемент берется через sync_to_async.
+
+    Поток тот же, что у view (thread_sensitive), поэтому серверный курсор остается на своем
+    соединении с базой.
+    """
+    iterator = iter(iterable)
+    get_next = sync_to_async(next, thread_sensitive=True)
+    while (item := await get_next(iterator, None)) is not None:
+        yield item
+
+
+class _LineBuffer:
+    """Приемник для csv.writer: накапливает строки до отправки очередной порции"""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
 
-        # Запускаем в отдельном потоке, чтобы избежать конфликта event loop
-        self._run_async_in_thread(
-            task.uuid, chat_id_owner, chat_id_assignee, message_lines_owner, message_lines_assignee)
+    def flush(self):
+        data, self.lines = "".join(self.lines).encode(), []
+        return data
@@ -0,0 +1,129 @@
+import asyncio
+import hmac
+import json
+import logging
+
+from django.conf import settings
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+
+class TelegramWebhookApp:
+    """
+    ASGI-приложение, принимающее обновления Telegram по webhook.
+
+    Запросы на TELEGRAM_WEBHOOK['PATH'] проверяются по секретному заголовку и передаются
+    в application.process_update, все остальные уходят в Django. Так бота обслуживают
+    сами веб-реплики, и отдельный процесс с polling не нужен.
+    """
+
+    def __init__(self, fallback, application=None):
+        self.fallback = fallback
+        self._application = application
+        self._started = False
+        self._start_lock = None
+
+    @property
+    def application(self):
+        if self._application is None:
+            from .telegram_bot import application
+
+            self._application = application
+        return self._application
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http" and scope["path"] == settings.TELEGRAM_WEBHOOK["PATH"]:
+            return await self._handle(scope, receive, send)
+        return await self.fallback(scope, receive, send)
+
+    async def _handle(self, scope, receive, send):
+        if scope["method"] != "POST":
+            return await self._respond(send, 405)
+
+        secret = settings.TELEGRAM_WEBHOOK.get("SECRET_TOKEN")
+        token = dict(scope["headers"]).get(SECRET_HEADER, b"")
+        if not secret or not hmac.compare_digest(token, secret.encode()):
+            logger.warning("[Telegram] Webhook-запрос с неверным секретом от %s", scope.get("client"))
+            return await self._respond(send, 403)
+
+        body = await self._read_body(receive)
+        if body is None:
+            return await self._respond(send, 413)
+        update = self._parse_update(body)
+        if update is None:
+            return await self._respond(send, 400)
+
+        await self._ensure_started()
+        await self.application.process_update(update)
+        return await self._respond(send, 200)
+
+    def _parse_update(self, body):
+        """Update из тела запроса или None, если это не объект обновления Telegram"""
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        try:
+            return Update.de_json(data, self.application.bot)
+        except Exception:
+            # Ответ 4xx, в отличие от 500, Telegram не доставляет повторно
+            logger.warning("[Telegram] Webhook-запрос с некорректным обновлением", exc_info=True)
+            return None
+
+    async def _ensure_started(self):
+        """Приложение бота инициализируется лениво, в event loop этого процесса"""
+        if self._started:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if not self._started:
+                await self.application.initialize()
+                await self.application.start()
+                self._started = True
+
+    async def shutdown(self):
+        if self._started:
+            await self.application.stop()
+            await self.application.shutdown()
+            self._started = False
+
+    async def _lifespan(self, receive, send):
+        # Django не поддерживает lifespan, поэтому события обрабатываются здесь
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive):
+        """Тело запроса или None, если оно больше MAX_BODY_SIZE"""
+        limit = settings.TELEGRAM_WEBHOOK["MAX_BODY_SIZE"]
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > limit:
+                return None
+            more_body = message.get("more_body", False)
+        return body
+
+    @staticmethod
+    async def _respond(send, status):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain"), (b"content-length", b"0")],
+        })
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CustomUser
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш в памяти процесса с временем жизни записей.
+
+    При переполнении вытесняется запись, к которой дольше всего не обращались.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# chat id Telegram -> id пользователя (None, если чат ни к кому не привязан). Кэш свой у каждого
+# процесса; о смене chat id в другом процессе он узнает по поколению в общем кэше Django
+chat_user_cache = LRUCache(
+    max_size=settings.TELEGRAM_CHAT_CACHE["MAX_SIZE"], ttl=settings.TELEGRAM_CHAT_CACHE["TTL"]
+)
+
+# Поколение соответствий chat id: меняется при каждой смене chat id в любом процессе
+GENERATION_KEY = "users:chat-cache:generation"
+
+_MISSING = object()
+_seen_generation = None
+
+
+def get_user_id_by_chat_id(chat_id):
+    """id пользователя, привязавшего чат chat_id, или None"""
+    _sync_generation()
+    key = str(chat_id)
+    user_id = chat_user_cache.get(key, _MISSING)
+    if user_id is _MISSING:
+        user_id = CustomUser.objects.filter(telegram_chat_id=key).values_list("id", flat=True).first()
+        chat_user_cache.set(key, user_id)
+    return user_id
+
+
+def invalidate_chat_ids(*chat_ids):
+    """Сбрасывает закэшированные записи после смены chat id пользователя"""
+    for chat_id in chat_ids:
+        if chat_id:
+            chat_user_cache.delete(str(chat_id))
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def _sync_generation():
+    """
+    Очищает кэш процесса, если поколение сменилось с прошлой проверки.
+
+    Без общего Redis (CACHES) поколение у каждого процесса свое, и изменения из других
+    процессов видны только через TTL секунд.
+    """
+    global _seen_generation
+    generation = cache.get(GENERATION_KEY)
+    if generation != _seen_generation:
+        chat_user_cache.clear()
+        _seen_generation = generation
@@ -0,0 +1,146 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomUser",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("password", models.CharField(max_length=128, verbose_name="password")),
+                (
+                    "last_login",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="last login"
+                    ),
+                ),
+                (
+                    "is_superuser",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Designates that this user has all permissions without explicitly assigning them.",
+                        verbose_name="superuser status",
+                    ),
+                ),
+                (
+                    "first_name",
+                    models.CharField(
+                        blank=True, max_length=150, verbose_name="first name"
+                    ),
+                ),
+                (
+                    "last_name",
+                    models.CharField(
+                        blank=True, max_length=150, verbose_name="last name"
+                    ),
+                ),
+                (
+                    "date_joined",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="date joined"
+                    ),
+                ),
+                ("email", models.EmailField(max_length=254, unique=True)),
+                (
+                    "phone_number",
+                    models.CharField(blank=True, max_length=15, null=True),
+                ),
+                (
+                    "avatar",
+                    models.ImageField(blank=True, null=True, upload_to="users/images/"),
+                ),
+                (
+                    "city",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("Pyatigorsk", "Пятигорск"),
+                            ("Moscow", "Москва"),
+                            ("Saint Petersburg", "Санкт-Петербург"),
+                            ("Omsk", "Омск"),
+                        ],
+                        max_length=255,
+                        null=True,
+                        verbose_name="Город",
+                    ),
+                ),
+                (
+                    "confirmation_token",
+                    models.CharField(blank=True, max_length=32, null=True),
+                ),
+                (
+                    "telegram_notifications",
+                    models.BooleanField(
+                        default=False, verbose_name="Уведомления в Телеграм"
+                    ),
+                ),
+                (
+                    "telegram_chat_id",
+                    models.CharField(
+                        blank=True,
+                        help_text="Укажите телеграм chat-id",
+                        max_length=50,
+                        null=True,
+                        verbose_name="Телеграм chat-id",
+                    ),
+                ),
+                (
+                    "username",
+                    models.CharField(
+                        blank=True,
+                        max_length=150,
+                        null=True,
+                        unique=True,
+                        verbose_name="username",
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                ("is_staff", models.BooleanField(default=False)),
+                (
+                    "groups",
+                    models.ManyToManyField(
+                        blank=True,
+                        help_text="The groups this user belongs to. A user will get all permissions granted to each of their groups.",
+                        related_name="user_set",
+                        related_query_name="user",
+                        to="auth.group",
+                        verbose_name="groups",
+                    ),
+                ),
+                (
+                    "user_permissions",
+                    models.ManyToManyField(
+                        blank=True,
+                        help_text="Specific permissions for this user.",
+                        related_name="user_set",
+                        related_query_name="user",
+                        to="auth.permission",
+                        verbose_name="user permissions",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "user",
+                "verbose_name_plural": "users",
+                "abstract": False,
+            },
+        ),
+    ]
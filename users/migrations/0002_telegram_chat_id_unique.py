@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:58
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def clear_duplicate_chat_ids(apps, schema_editor):
+    """
+    Перед созданием уникального индекса: пустые chat id становятся NULL, а чат,
+    привязанный к нескольким пользователям, остается только у последнего из них.
+    """
+    CustomUser = apps.get_model("users", "CustomUser")
+    CustomUser.objects.filter(telegram_chat_id="").update(telegram_chat_id=None)
+    duplicates = (
+        CustomUser.objects.exclude(telegram_chat_id=None)
+        .values("telegram_chat_id")
+        .annotate(users=Count("id"), last_id=Max("id"))
+        .filter(users__gt=1)
+    )
+    for row in duplicates:
+        CustomUser.objects.filter(telegram_chat_id=row["telegram_chat_id"]).exclude(
+            id=row["last_id"]
+        ).update(telegram_chat_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_chat_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="customuser",
+            name="telegram_chat_id",
+            field=models.CharField(
+                blank=True,
+                help_text="Укажите телеграм chat-id",
+                max_length=50,
+                null=True,
+                unique=True,
+                verbose_name="Телеграм chat-id",
+            ),
+        ),
+    ]
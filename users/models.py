@@ -46,6 +46,7 @@ class CustomUser(AbstractUser, PermissionsMixin):
         max_length=50,
         null=True,
         blank=True,
+        unique=True,  # Бот находит пользователя по chat id в каждом обработчике
         verbose_name="Телеграм chat-id",
         help_text="Укажите телеграм chat-id",
     )
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 
+from .cache import invalidate_chat_ids
 from .models import CustomUser
 
 
@@ -68,3 +70,14 @@ class TelegramConnectSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ["telegram_chat_id"]
         extra_kwargs = {"telegram_chat_id": {"required": True}}
+
+    def validate_telegram_chat_id(self, value):
+        # Пустая строка означает отвязку чата; храним NULL, чтобы не нарушать уникальность
+        return value or None
+
+    def update(self, instance, validated_data):
+        old_chat_id = instance.telegram_chat_id
+        instance = super().update(instance, validated_data)
+        # Бот должен сразу увидеть новую привязку, а не ждать истечения кэша
+        transaction.on_commit(lambda: invalidate_chat_ids(old_chat_id, instance.telegram_chat_id))
+        return instance
@@ -1,3 +1,77 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .cache import GENERATION_KEY, LRUCache, chat_user_cache, get_user_id_by_chat_id
+from .models import CustomUser
+
+
+class LRUCacheTest(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_expired_entries(self):
+        cache = LRUCache(max_size=10, ttl=60)
+        with mock.patch("users.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with mock.patch("users.cache.time.monotonic", return_value=161.0):
+            self.assertEqual(cache.get("a", "missing"), "missing")
+        self.assertEqual(len(cache), 0)
+
+
+class TelegramChatCacheTest(APITestCase):
+    """Соответствие chat id -> пользователь кэшируется и сбрасывается при смене chat id"""
+
+    def setUp(self):
+        chat_user_cache.clear()
+        self.user = CustomUser.objects.create_user(email="user@example.com", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("users:connect-telegram")
+
+    def test_lookup_cached(self):
+        self.assertIsNone(get_user_id_by_chat_id(100))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_user_id_by_chat_id("100"))
+
+    def test_connect_invalidates_cache(self):
+        self.assertIsNone(get_user_id_by_chat_id(100))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, {"telegram_chat_id": "100"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_user_id_by_chat_id(100), self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.url, {"telegram_chat_id": "200"})
+        self.assertIsNone(get_user_id_by_chat_id(100))
+        self.assertEqual(get_user_id_by_chat_id(200), self.user.pk)
+
+    def test_change_in_other_process_invalidates_cache(self):
+        """Другой процесс меняет chat id и поколение в общем кэше; локальные записи сбрасываются"""
+        self.assertIsNone(get_user_id_by_chat_id(100))
+        CustomUser.objects.filter(pk=self.user.pk).update(telegram_chat_id="100")
+        self.assertIsNone(get_user_id_by_chat_id(100))
+
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        cache.incr(GENERATION_KEY)
+        self.assertEqual(get_user_id_by_chat_id(100), self.user.pk)
+
+    def test_chat_id_unique(self):
+        CustomUser.objects.create_user(email="other@example.com", password="testpass123", telegram_chat_id="100")
+        response = self.client.patch(self.url, {"telegram_chat_id": "100"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-# Create your tests here.
+    def test_blank_chat_id_stored_as_null(self):
+        CustomUser.objects.create_user(email="other@example.com", password="testpass123")
+        response = self.client.patch(self.url, {"telegram_chat_id": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.telegram_chat_id)